@@ -4,6 +4,16 @@ from .config import Config
 from .extensions import db, login_manager, csrf
 from .models import User
 from .commands import register_commands
+from .audit import audit_writer
+from .db_routing import init_routing
+from .assets import init_assets
+from .tasks import tasks
+from .cleanup import init_soft_delete
+from .config_cache import config_cache
+from .metrics import init_metrics
+from .slow_queries import slow_query_log
+from .search import init_search
+from .counters import init_counters
 
 def create_app():
     app = Flask(__name__, static_folder="static", template_folder="templates")
@@ -22,6 +32,19 @@ def create_app():
     db.init_app(app)
     login_manager.init_app(app)
     csrf.init_app(app)
+    audit_writer.init_app(app)
+    init_routing(app)
+    init_assets(app)
+    tasks.init_app(app)
+    init_soft_delete(app)
+    config_cache.init_app(app)
+    init_metrics(app)
+    slow_query_log.init_app(app)
+    init_search(app)
+    init_counters(app)
+
+    # readiness flags; `flask serve` clears "ready" until each worker has warmed up
+    app.extensions["lifecycle"] = {"ready": True, "draining": False}
 
     login_manager.login_view = "auth.student_login"
 
@@ -40,12 +63,14 @@ def create_app():
     from .blueprints.student.routes import bp as student_bp
     from .blueprints.supervisor.routes import bp as supervisor_bp
     from .blueprints.admin.routes import bp as admin_bp
+    from .blueprints.health.routes import bp as health_bp
 
     app.register_blueprint(main_bp)
     app.register_blueprint(auth_bp, url_prefix="/auth")
     app.register_blueprint(student_bp, url_prefix="/student")
     app.register_blueprint(supervisor_bp, url_prefix="/supervisor")
     app.register_blueprint(admin_bp, url_prefix="/admin")
+    app.register_blueprint(health_bp)
 
     register_commands(app)
     return app
@@ -0,0 +1,190 @@
+"""
+Academic-year archival (`flask archive-years`).
+
+An academic year starts on day 1 of ACADEMIC_YEAR_START_MONTH (September by default)
+and is labelled "2024/25". Once a year has ended, its rows are moved from the live
+tables into the *_archive copies in app/models.py:
+
+- activities created that year, with their targets and submissions,
+- title proposals and group members of groups created that year, unless a
+  later activity still targets the group or has a submission from it,
+- team requests sent that year.
+
+Titles approved by both admin and supervisor are promoted into `titles_archive`
+on the way, so they still count as taken. Rows move in batches of ARCHIVE_BATCH_SIZE:
+each batch is copied and deleted in one transaction, so an interrupted run is simply
+started again and carries on with what is left. Student accounts of archived members
+leave their group, and the counters are recounted at the end. Archived years stay
+readable under Admin > Archive.
+"""
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Callable
+from flask import current_app
+from sqlalchemy import select, insert, update, delete, literal, exists, func, tuple_
+
+from .extensions import db
+from .counters import recount
+from .models import (
+    Activity, ActivityTarget, Submission, TitleProposal, GroupMember, TeamRequest, Group,
+    StudentMaster, StudentAccount, TitleArchive, DeadlineReminder, UploadSession,
+    ActivityArchive, ActivityTargetArchive, SubmissionArchive, TitleProposalArchive,
+    GroupMemberArchive, TeamRequestArchive,
+)
+
+ARCHIVES = {
+    "activities": ActivityArchive,
+    "submissions": SubmissionArchive,
+    "titles": TitleProposalArchive,
+    "members": GroupMemberArchive,
+    "requests": TeamRequestArchive,
+}
+
+def start_month():
+    return int(current_app.config.get("ACADEMIC_YEAR_START_MONTH", 9))
+
+def year_of(dt):
+    """Start year of the academic year `dt` falls in."""
+    return dt.year if dt.month >= start_month() else dt.year - 1
+
+def year_label(start_year):
+    return f"{start_year}/{(start_year + 1) % 100:02d}"
+
+def year_bounds(start_year):
+    m = start_month()
+    return datetime(start_year, m, 1), datetime(start_year + 1, m, 1)
+
+def parse_year(value):
+    """Accept "2024" or "2024/25"; returns the start year."""
+    return int(str(value).split("/")[0])
+
+@dataclass
+class Step:
+    name: str
+    live: type
+    archive: type | None  # None: dependent rows that are dropped, not kept
+    where: Callable  # (start, end) -> criteria on `live`
+    before: Callable | None = None  # (ids, label, now) -> None, runs in the batch transaction
+
+def _activities_of(start, end):
+    return select(Activity.id).where(Activity.created_at >= start, Activity.created_at < end)
+
+def _groups_of(start, end):
+    """Groups created that year that no activity of another year still targets or has a submission from."""
+    return select(Group.group_code).where(
+        Group.created_at >= start, Group.created_at < end,
+        ~exists().where(ActivityTarget.group_code == Group.group_code,
+                        ~ActivityTarget.activity_id.in_(_activities_of(start, end))),
+        ~exists().where(Submission.group_code == Group.group_code,
+                        ~Submission.activity_id.in_(_activities_of(start, end))),
+    )
+
+def _promote_titles(ids, label, now):
+    department = (
+        select(func.min(StudentMaster.faculty))
+        .join(GroupMember, GroupMember.student_id == StudentMaster.student_id)
+        .where(GroupMember.group_code == TitleProposal.group_code)
+        .correlate(TitleProposal)
+        .scalar_subquery()
+    )
+    db.session.execute(insert(TitleArchive).from_select(
+        ["title", "project_type", "year", "department", "imported_at"],
+        select(TitleProposal.title, TitleProposal.project_type, literal(label), department, literal(now))
+        .where(TitleProposal.id.in_(ids), TitleProposal.status_admin == "Approved",
+               TitleProposal.status_supervisor == "Approved"),
+    ))
+
+def _leave_groups(ids, label, now):
+    members = select(GroupMember.student_id, GroupMember.group_code).where(GroupMember.id.in_(ids))
+    db.session.execute(update(StudentAccount)
+                       .where(tuple_(StudentAccount.student_id, StudentAccount.group_code).in_(members))
+                       .values(group_code=None).execution_options(synchronize_session=False))
+
+# Children before parents; titles before members (promotion reads the members' faculty).
+STEPS = [
+    Step("submissions", Submission, SubmissionArchive,
+         lambda s, e: [Submission.activity_id.in_(_activities_of(s, e))]),
+    Step("activity targets", ActivityTarget, ActivityTargetArchive,
+         lambda s, e: [ActivityTarget.activity_id.in_(_activities_of(s, e))]),
+    Step("deadline reminders", DeadlineReminder, None,
+         lambda s, e: [DeadlineReminder.activity_id.in_(_activities_of(s, e))]),
+    Step("upload sessions", UploadSession, None,
+         lambda s, e: [UploadSession.activity_id.in_(_activities_of(s, e))]),
+    Step("activities", Activity, ActivityArchive,
+         lambda s, e: [Activity.created_at >= s, Activity.created_at < e,
+                       ~exists().where(Submission.activity_id == Activity.id),
+                       ~exists().where(ActivityTarget.activity_id == Activity.id)]),
+    Step("title proposals", TitleProposal, TitleProposalArchive,
+         lambda s, e: [TitleProposal.group_code.in_(_groups_of(s, e))], before=_promote_titles),
+    Step("group members", GroupMember, GroupMemberArchive,
+         lambda s, e: [GroupMember.group_code.in_(_groups_of(s, e))], before=_leave_groups),
+    Step("team requests", TeamRequest, TeamRequestArchive,
+         lambda s, e: [TeamRequest.created_at >= s, TeamRequest.created_at < e]),
+]
+
+def _move_batch(step, criteria, label, now, batch_size):
+    pk = step.live.__mapper__.primary_key[0]
+    ids = db.session.execute(select(pk).where(*criteria).order_by(pk).limit(batch_size)).scalars().all()
+    if not ids:
+        return 0
+    if step.before:
+        step.before(ids, label, now)
+    if step.archive is not None:
+        live_cols = step.live.__table__.c
+        names = [c.name for c in step.archive.__table__.columns if c.name in live_cols]
+        db.session.execute(insert(step.archive).from_select(
+            names + ["academic_year", "archived_at"],
+            select(*[live_cols[n] for n in names], literal(label), literal(now)).where(pk.in_(ids)),
+        ))
+    db.session.execute(delete(step.live).where(pk.in_(ids)).execution_options(synchronize_session=False))
+    db.session.commit()
+    return len(ids)
+
+def pending_counts(start_year):
+    """Live rows each step would move for a year (for --dry-run)."""
+    start, end = year_bounds(start_year)
+    return {step.name: db.session.execute(select(func.count()).select_from(step.live).where(*step.where(start, end))).scalar()
+            for step in STEPS}
+
+def archive_year(start_year, batch_size=None, now=None, log=print):
+    """Move one closed academic year into the archive tables. Returns rows moved per step."""
+    now = now or datetime.utcnow()
+    start, end = year_bounds(start_year)
+    if end > now:
+        raise ValueError(f"Academic year {year_label(start_year)} has not ended yet (ends {end:%Y-%m-%d}).")
+    batch_size = batch_size or int(current_app.config.get("ARCHIVE_BATCH_SIZE", 1000))
+    label = year_label(start_year)
+    moved = {}
+    for step in STEPS:
+        criteria = step.where(start, end)
+        total = 0
+        while True:
+            n = _move_batch(step, criteria, label, now, batch_size)
+            if not n:
+                break
+            total += n
+            log(f"  {label} {step.name}: {total}")
+        moved[step.name] = total
+    if moved["group members"]:
+        recount()  # member_count of the emptied groups (Core deletes bypass the counter hooks)
+    return moved
+
+def closed_years(now=None):
+    """Start years that have ended and still have rows in the live tables, oldest first."""
+    now = now or datetime.utcnow()
+    oldest = [db.session.execute(select(func.min(col))).scalar()
+              for col in (Activity.created_at, Group.created_at, TeamRequest.created_at)]
+    oldest = [d for d in oldest if d is not None]
+    if not oldest:
+        return []
+    return [y for y in range(year_of(min(oldest)), year_of(now))
+            if year_bounds(y)[1] <= now and any(pending_counts(y).values())]
+
+def archived_years():
+    """{label: {"activities": n, "submissions": n, ...}}, newest year first."""
+    years = {}
+    for key, model in ARCHIVES.items():
+        rows = db.session.execute(select(model.academic_year, func.count()).group_by(model.academic_year)).all()
+        for label, n in rows:
+            years.setdefault(label, dict.fromkeys(ARCHIVES, 0))[key] = n
+    return dict(sorted(years.items(), reverse=True))
@@ -0,0 +1,134 @@
+"""
+Static asset pipeline (`flask assets-build`).
+
+Copies every file under app/static (except uploads) to static/dist/ with a content
+hash in its name, writes .gz/.br variants for text assets and a manifest.json mapping
+original -> fingerprinted path. Templates use asset_url() to resolve the manifest;
+fingerprinted files are served with far-future immutable caching and the best
+precompressed encoding the browser accepts.
+"""
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import posixpath
+import re
+import shutil
+from flask import current_app, request, send_from_directory, url_for
+
+try:
+    import brotli
+except ImportError:  # brotli variants are skipped without it; gzip still works
+    brotli = None
+
+DIST_DIR = "dist"
+MANIFEST_FILE = "manifest.json"
+SKIP_DIRS = {"uploads", DIST_DIR}
+COMPRESSIBLE = {".css", ".js", ".svg", ".json", ".txt", ".map", ".html", ".ico"}
+IMMUTABLE = "public, max-age=31536000, immutable"
+CSS_URL = re.compile(r"url\(\s*(['\"]?)([^'\")]+)\1\s*\)")
+
+def _source_files(static_folder):
+    for root, dirs, files in os.walk(static_folder):
+        if os.path.abspath(root) == os.path.abspath(static_folder):
+            dirs[:] = [d for d in dirs if d not in SKIP_DIRS]
+        for name in sorted(files):
+            if not name.startswith("."):
+                path = os.path.join(root, name)
+                yield os.path.relpath(path, static_folder).replace("\\", "/"), path
+
+def _rewrite_css(rel, data, manifest):
+    """Point relative url(...) references at fingerprinted files."""
+    css_dir = posixpath.dirname(rel)
+
+    def repl(m):
+        ref = m.group(2).strip()
+        if ref.startswith(("data:", "http:", "https:", "//", "/", "#")):
+            return m.group(0)
+        clean = ref.split("?")[0].split("#")[0]
+        target = posixpath.normpath(posixpath.join(css_dir, clean))
+        hashed = manifest.get(target)
+        if not hashed:
+            return m.group(0)
+        new_ref = posixpath.relpath(hashed, posixpath.join(DIST_DIR, css_dir))
+        return f"url({m.group(1)}{new_ref}{m.group(1)})"
+
+    return CSS_URL.sub(repl, data.decode("utf-8")).encode("utf-8")
+
+def build_assets(static_folder, log=print):
+    """Build static/dist from scratch and return the manifest."""
+    dist = os.path.join(static_folder, DIST_DIR)
+    if os.path.isdir(dist):
+        shutil.rmtree(dist)
+
+    # CSS last, so the files it references already have hashed names
+    sources = sorted(_source_files(static_folder), key=lambda s: s[0].endswith(".css"))
+    manifest = {}
+    raw_bytes = gz_bytes = br_bytes = 0
+    for rel, path in sources:
+        with open(path, "rb") as f:
+            data = f.read()
+        if rel.endswith(".css"):
+            data = _rewrite_css(rel, data, manifest)
+        base, ext = posixpath.splitext(rel)
+        hashed = f"{DIST_DIR}/{base}.{hashlib.sha256(data).hexdigest()[:12]}{ext}"
+        out = os.path.join(static_folder, *hashed.split("/"))
+        os.makedirs(os.path.dirname(out), exist_ok=True)
+        with open(out, "wb") as f:
+            f.write(data)
+        if ext.lower() in COMPRESSIBLE:
+            raw_bytes += len(data)
+            gz = gzip.compress(data, compresslevel=9, mtime=0)
+            with open(out + ".gz", "wb") as f:
+                f.write(gz)
+            gz_bytes += len(gz)
+            if brotli is not None:
+                br = brotli.compress(data, quality=11)
+                with open(out + ".br", "wb") as f:
+                    f.write(br)
+                br_bytes += len(br)
+        manifest[rel] = hashed
+
+    with open(os.path.join(dist, MANIFEST_FILE), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    log(f"  {len(manifest)} files fingerprinted")
+    log(f"  text assets: {raw_bytes} bytes -> gzip {gz_bytes}" + (f", brotli {br_bytes}" if brotli else " (install Brotli for .br)"))
+    return manifest
+
+def load_manifest(static_folder):
+    path = os.path.join(static_folder, DIST_DIR, MANIFEST_FILE)
+    if not os.path.exists(path):
+        return {}
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+def asset_url(filename: str) -> str:
+    """url_for('static') that prefers the fingerprinted copy when the manifest has one."""
+    manifest = current_app.extensions.get("asset_manifest") or {}
+    return url_for("static", filename=manifest.get(filename, filename))
+
+def _serve_static(filename):
+    static_folder = current_app.static_folder
+    if not filename.startswith(DIST_DIR + "/"):
+        return current_app.send_static_file(filename)
+
+    # fingerprinted: pick a precompressed variant the client accepts
+    accepted = request.headers.get("Accept-Encoding", "")
+    for encoding, suffix in (("br", ".br"), ("gzip", ".gz")):
+        if encoding in accepted and os.path.isfile(os.path.join(static_folder, filename + suffix)):
+            mimetype = mimetypes.guess_type(filename)[0] or "application/octet-stream"
+            resp = send_from_directory(static_folder, filename + suffix, mimetype=mimetype, max_age=31536000)
+            resp.headers["Content-Encoding"] = encoding
+            break
+    else:
+        resp = send_from_directory(static_folder, filename, max_age=31536000)
+    resp.headers["Cache-Control"] = IMMUTABLE
+    resp.headers["Vary"] = "Accept-Encoding"
+    return resp
+
+def init_assets(app):
+    app.extensions["asset_manifest"] = load_manifest(app.static_folder)
+    app.jinja_env.globals["asset_url"] = asset_url
+    if app.has_static_folder:
+        app.view_functions["static"] = _serve_static
@@ -0,0 +1,190 @@
+import atexit
+import glob
+import json
+import os
+import threading
+import time
+from datetime import datetime
+from flask import current_app
+from flask_login import current_user
+
+from .extensions import db
+from .models import AuditEvent
+from .metrics import AUDIT_DEPTH
+
+class AuditWriter:
+    """
+    Write-behind buffer for audit events.
+    Requests only append to an in-memory list; a background thread inserts
+    batches when AUDIT_FLUSH_SIZE events are queued or every AUDIT_FLUSH_SECONDS.
+    Batches that cannot be written (DB down, process exiting) are spooled to a
+    JSONL file and replayed on the next flush, so nothing is lost on shutdown.
+
+    Every worker process shares the spool directory, so each failed batch goes to
+    its own file (<spool>.<pid>-<ns>.jsonl, written to a temp name and renamed into
+    place). A flush claims spool files by renaming them to *.<ts>.draining, which only
+    one process can win, and deletes them once their events are inserted. Claims left
+    by a process that died mid-flush are taken over after SPOOL_CLAIM_SECONDS.
+    """
+
+    SPOOL_CLAIM_SECONDS = 600
+
+    def __init__(self, app=None):
+        self.app = None
+        self._buffer = []
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+        self._pid = None
+        self._atexit_registered = False
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.app = app
+        self.flush_size = int(app.config.get("AUDIT_FLUSH_SIZE", 50))
+        self.flush_seconds = float(app.config.get("AUDIT_FLUSH_SECONDS", 2))
+        self.spool_path = app.config.get("AUDIT_SPOOL_PATH") or os.path.join(app.instance_path, "audit_spool.jsonl")
+        app.extensions["audit_writer"] = self
+        if not self._atexit_registered:
+            atexit.register(self.close)
+            self._atexit_registered = True
+        if self._spool_files():
+            self._ensure_thread()  # replay what earlier processes spooled
+
+    def record(self, action: str, entity_type: str, entity_id, actor_user_id=None, actor_role=None, detail=None):
+        event = {
+            "actor_user_id": actor_user_id,
+            "actor_role": actor_role,
+            "action": action,
+            "entity_type": entity_type,
+            "entity_id": str(entity_id),
+            "detail": str(detail)[:255] if detail else None,
+            "created_at": datetime.utcnow(),
+        }
+        with self._lock:
+            self._buffer.append(event)
+            full = len(self._buffer) >= self.flush_size
+            AUDIT_DEPTH.set(len(self._buffer))
+        self._ensure_thread()
+        if full:
+            self._wake.set()
+
+    def pending(self) -> int:
+        with self._lock:
+            return len(self._buffer)
+
+    def _ensure_thread(self):
+        # started lazily and per process, so forked workers get their own flusher
+        if self._thread is not None and self._thread.is_alive() and self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive() and self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="audit-writer", daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._wake.wait(self.flush_seconds)
+            self._wake.clear()
+            self.flush()
+
+    def flush(self) -> int:
+        """Insert everything buffered (plus any spooled events) in one batch. Returns rows written."""
+        with self._flush_lock:
+            with self._lock:
+                batch, self._buffer = self._buffer, []
+                AUDIT_DEPTH.set(0)
+            claimed = self._claim_spools()
+            batch = self._read_spool(claimed) + batch
+            if not batch:
+                return 0
+            try:
+                with self.app.app_context():
+                    with db.engine.begin() as conn:
+                        conn.execute(AuditEvent.__table__.insert(), batch)
+            except Exception:
+                self.app.logger.exception("Audit flush failed; spooling %d events to %s", len(batch), self.spool_path)
+                self._write_spool(batch)
+            else:
+                self._clear_spool(claimed)
+                return len(batch)
+            self._clear_spool(claimed)  # their events are in the new spool file
+            return 0
+
+    def close(self):
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None and self._thread.is_alive() and self._thread is not threading.current_thread():
+            self._thread.join(timeout=self.flush_seconds + 5)
+        self.flush()
+
+    # --- spool files (fallback storage) ---
+    def _spool_files(self):
+        root, ext = os.path.splitext(self.spool_path)
+        return glob.glob(glob.escape(root) + "*" + ext) + glob.glob(glob.escape(root) + "*" + ext + ".*.draining")
+
+    def _write_spool(self, batch):
+        os.makedirs(os.path.dirname(self.spool_path) or ".", exist_ok=True)
+        root, ext = os.path.splitext(self.spool_path)
+        path = f"{root}.{os.getpid()}-{time.time_ns()}{ext}"
+        with open(path + ".tmp", "w", encoding="utf-8") as f:
+            for ev in batch:
+                f.write(json.dumps(dict(ev, created_at=ev["created_at"].isoformat())) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(path + ".tmp", path)
+
+    def _claim_spools(self):
+        """Rename spool files to *.<ts>.draining; a file another process claimed first is skipped."""
+        now = int(time.time())
+        claimed = []
+        for path in self._spool_files():
+            if path.endswith(".draining"):
+                base, ts, _ = path.rsplit(".", 2)
+                if not ts.isdigit() or now - int(ts) < self.SPOOL_CLAIM_SECONDS:
+                    continue  # another process is draining it
+            else:
+                base = path
+            target = f"{base}.{now}.draining"
+            try:
+                os.rename(path, target)
+            except OSError:
+                continue  # gone or claimed meanwhile
+            claimed.append(target)
+        return claimed
+
+    def _read_spool(self, paths):
+        events = []
+        for path in paths:
+            with open(path, encoding="utf-8") as f:
+                for line in f:
+                    if line.strip():
+                        ev = json.loads(line)
+                        ev["created_at"] = datetime.fromisoformat(ev["created_at"])
+                        events.append(ev)
+        return events
+
+    def _clear_spool(self, paths):
+        for path in paths:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+audit_writer = AuditWriter()
+
+def audit(action: str, entity_type: str, entity_id, detail=None):
+    """Queue an audit event for the logged-in user (non-blocking)."""
+    writer = current_app.extensions["audit_writer"]
+    writer.record(
+        action, entity_type, entity_id,
+        actor_user_id=current_user.id if current_user.is_authenticated else None,
+        actor_role=current_user.role if current_user.is_authenticated else None,
+        detail=detail,
+    )
@@ -0,0 +1,408 @@
+"""Per-route load benchmark used by `flask bench`."""
+import io
+import json
+import random
+import re
+import statistics
+import threading
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+from flask import url_for
+from sqlalchemy import event, select, update, func
+from sqlalchemy.engine import Engine
+
+from .extensions import db
+from .models import (
+    User, StudentAccount, StudentMaster, Activity, SupervisorAssignment, Submission, GroupMember, TitleProposal,
+    SubmissionRevision,
+)
+from . import read_models
+from .cleanup import purge_activity
+from .revisions import release_files
+from .datagen import TINY_PDF
+
+# routes that need a file on disk or are not pages
+SKIP_ENDPOINTS = {"static", "student.download_upload", "auth.logout"}
+
+class QueryCounter:
+    """Counts statements executed on any engine while active (thread-local)."""
+
+    def __init__(self):
+        self._local = threading.local()
+
+    def _on_execute(self, conn, cursor, statement, parameters, context, executemany):
+        self._local.count = getattr(self._local, "count", 0) + 1
+
+    def reset(self):
+        self._local.count = 0
+
+    @property
+    def count(self):
+        return getattr(self._local, "count", 0)
+
+    def __enter__(self):
+        event.listen(Engine, "before_cursor_execute", self._on_execute)
+        return self
+
+    def __exit__(self, *exc):
+        event.remove(Engine, "before_cursor_execute", self._on_execute)
+
+def _percentile(sorted_vals, pct):
+    if not sorted_vals:
+        return 0.0
+    k = (len(sorted_vals) - 1) * pct / 100.0
+    lo, hi = int(k), min(int(k) + 1, len(sorted_vals) - 1)
+    return sorted_vals[lo] + (sorted_vals[hi] - sorted_vals[lo]) * (k - lo)
+
+def _sample_context():
+    """Pick one user per role plus route arguments they are allowed to open."""
+    ctx = {}
+    admin = User.query.filter_by(role="admin").first()
+    sup_id = (
+        db.session.query(Activity.created_by_user_id)
+        .filter(Activity.created_by_role == "supervisor")
+        .order_by(Activity.id.desc())
+        .limit(1).scalar()
+    ) or db.session.query(SupervisorAssignment.supervisor_user_id).limit(1).scalar()
+    acc = StudentAccount.query.filter(StudentAccount.group_code.isnot(None)).first()
+
+    any_act = db.session.query(Activity.id).order_by(Activity.id.desc()).limit(1).scalar()
+    ctx["admin"] = (admin.id if admin else None, {"activity_id": any_act})
+
+    sup_act = None
+    if sup_id:
+        sup_act = db.session.query(Activity.id).filter_by(created_by_role="supervisor", created_by_user_id=sup_id) \
+            .order_by(Activity.id.desc()).limit(1).scalar()
+    ctx["supervisor"] = (sup_id, {"activity_id": sup_act})
+
+    stu_act = None
+    if acc:
+        stu_act = db.session.query(Activity.id).filter(Activity.scope_all_groups == True) \
+            .order_by(Activity.id.desc()).limit(1).scalar()
+    ctx["student"] = (acc.user_id if acc else None, {"activity_id": stu_act})
+    ctx[None] = (None, {})
+    return ctx
+
+def discover_routes(app, only=None):
+    """GET routes of every blueprint; POST handlers mutate data and are left out."""
+    routes = []
+    for rule in app.url_map.iter_rules():
+        if "GET" not in rule.methods or rule.endpoint in SKIP_ENDPOINTS:
+            continue
+        if only and not any(rule.endpoint.startswith(o) for o in only):
+            continue
+        routes.append(rule)
+    return sorted(routes, key=lambda r: r.endpoint)
+
+def run_benchmark(app, iterations=20, warmup=2, only=None, log=print):
+    """
+    Drive each GET route through the Flask test client as a user of the owning
+    blueprint's role. Returns {endpoint: {p50_ms, p95_ms, p99_ms, queries, rps, status}}.
+
+    Runs in a fresh thread: the `flask` CLI keeps an app context pushed, and requests
+    would otherwise share its `g` (and the cached login user) instead of getting their own.
+    """
+    out, errors = {}, []
+
+    def target():
+        try:
+            out.update(_run(app, iterations, warmup, only, log))
+        except Exception as e:
+            errors.append(e)
+
+    worker = threading.Thread(target=target, name="bench")
+    worker.start()
+    worker.join()
+    if errors:
+        raise errors[0]
+    return out
+
+def _run(app, iterations, warmup, only, log):
+    with app.app_context():
+        ctx = _sample_context()
+    role_for = {"admin": "admin", "supervisor": "supervisor", "student": "student"}
+    results = {}
+
+    with QueryCounter() as qc:
+        for rule in discover_routes(app, only):
+            role = role_for.get(rule.endpoint.split(".")[0])
+            user_id, args = ctx[role]
+            if role and not user_id:
+                log(f"  skip {rule.endpoint}: no {role} in dataset")
+                continue
+            if any(args.get(a) is None for a in rule.arguments):
+                log(f"  skip {rule.endpoint}: no value for {sorted(rule.arguments)}")
+                continue
+            with app.test_request_context():
+                url = url_for(rule.endpoint, **{a: args[a] for a in rule.arguments})
+
+            client = app.test_client()
+            if user_id:
+                with client.session_transaction() as sess:
+                    sess["_user_id"] = str(user_id)
+                    sess["_fresh"] = True
+
+            for _ in range(warmup):
+                client.get(url).close()
+            timings, queries, status = [], [], None
+            started = time.perf_counter()
+            for _ in range(iterations):
+                qc.reset()
+                t0 = time.perf_counter()
+                resp = client.get(url)
+                resp.close()  # file responses keep the app context alive until closed
+                timings.append((time.perf_counter() - t0) * 1000)
+                queries.append(qc.count)
+                status = resp.status_code
+            elapsed = time.perf_counter() - started
+
+            timings.sort()
+            results[rule.endpoint] = {
+                "url": url,
+                "status": status,
+                "p50_ms": round(_percentile(timings, 50), 2),
+                "p95_ms": round(_percentile(timings, 95), 2),
+                "p99_ms": round(_percentile(timings, 99), 2),
+                "queries": round(statistics.mean(queries), 1),
+                "rps": round(iterations / elapsed, 1) if elapsed else 0.0,
+            }
+    return results
+
+def format_results(results, baseline=None):
+    lines = [f"{'endpoint':40} {'status':>6} {'p50':>8} {'p95':>8} {'p99':>8} {'queries':>8} {'req/s':>8}"]
+    for ep, r in results.items():
+        line = f"{ep:40} {r['status']:>6} {r['p50_ms']:>8} {r['p95_ms']:>8} {r['p99_ms']:>8} {r['queries']:>8} {r['rps']:>8}"
+        base = (baseline or {}).get(ep)
+        if base:
+            d95 = _delta(base["p95_ms"], r["p95_ms"])
+            dq = r["queries"] - base["queries"]
+            line += f"   p95 {d95:+.0f}%  queries {dq:+g}"
+        lines.append(line)
+    return "\n".join(lines)
+
+def _delta(old, new):
+    return ((new - old) / old * 100.0) if old else 0.0
+
+def regressions(results, baseline, threshold_pct=20.0):
+    """Endpoints whose p95 grew by more than threshold_pct or that issue more queries than the baseline."""
+    out = []
+    for ep, r in results.items():
+        base = baseline.get(ep)
+        if not base:
+            continue
+        if _delta(base["p95_ms"], r["p95_ms"]) > threshold_pct or r["queries"] > base["queries"]:
+            out.append(ep)
+    return out
+
+def save_results(path, results):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"created_at": time.strftime("%Y-%m-%dT%H:%M:%S"), "routes": results}, f, indent=2)
+
+def load_results(path):
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)["routes"]
+
+# --- read models vs. ORM entities (flask bench-projections) ---
+
+def _entity_students():
+    rows = (db.session.query(StudentMaster, StudentAccount)
+            .outerjoin(StudentAccount, StudentAccount.student_id == StudentMaster.student_id)
+            .order_by(StudentMaster.student_id.asc()).limit(1000).all())
+    return [(sm.student_id, sm.name, sm.program, sm.batch, sa and sa.group_code) for sm, sa in rows]
+
+def _entity_accounts():
+    return [(u.id, u.role, u.username, u.active) for u in User.query.order_by(User.id.desc()).limit(500).all()]
+
+def _entity_submissions():
+    subs = Submission.query.order_by(Submission.submitted_at.desc()).limit(500).all()
+    return [(s.id, s.group_code, s.activity.title, s.status) for s in subs]  # as the template read it
+
+def _entity_groups(supervisor_user_id):
+    out = []
+    for a in SupervisorAssignment.query.filter_by(supervisor_user_id=supervisor_user_id).all():
+        members = (db.session.query(StudentMaster).join(GroupMember, GroupMember.student_id == StudentMaster.student_id)
+                   .filter(GroupMember.group_code == a.group_code).all())
+        title = (TitleProposal.query.filter_by(group_code=a.group_code, status_admin="Approved", status_supervisor="Approved")
+                 .order_by(TitleProposal.id.desc()).first())
+        out.append((a.group_code, [(m.student_id, m.name) for m in members], title and title.title))
+    return out
+
+def _measure(fn, iterations, qc):
+    """Median CPU ms, median peak allocated KiB, rows and queries of one call, each in a fresh session."""
+    cpu, peak, rows, queries = [], [], 0, 0
+    for _ in range(iterations):
+        db.session.remove()
+        qc.reset()
+        tracemalloc.start()
+        t0 = time.process_time()
+        rows = len(fn())
+        cpu.append((time.process_time() - t0) * 1000)
+        peak.append(tracemalloc.get_traced_memory()[1] / 1024)
+        tracemalloc.stop()
+        queries = qc.count
+    return {"cpu_ms": round(statistics.median(cpu), 2), "peak_kib": round(statistics.median(peak), 1),
+            "rows": rows, "queries": queries}
+
+def compare_projections(app, iterations=10, log=print):
+    """
+    Time the list-page queries as ORM entities (the old views) and as read-model projections
+    (app/read_models.py). CPU time is process time; memory is the tracemalloc peak of one call,
+    which includes the identity map the entities are kept in until the request ends.
+    """
+    with app.app_context():
+        sup_id = db.session.query(SupervisorAssignment.supervisor_user_id).limit(1).scalar()
+        pairs = {
+            "admin.students": (_entity_students, lambda: read_models.student_rows(limit=1000)),
+            "admin.accounts": (_entity_accounts, lambda: read_models.account_rows(limit=500)),
+            "admin.activity": (_entity_submissions, lambda: read_models.submission_rows(limit=500)),
+        }
+        if sup_id:
+            pairs["supervisor.groups"] = (lambda: _entity_groups(sup_id), lambda: read_models.supervisor_group_rows(sup_id))
+        results = {}
+        with QueryCounter() as qc:
+            for name, (entity_fn, projection_fn) in pairs.items():
+                entity_fn(), projection_fn()  # warm up compiled-statement caches
+                results[name] = {"entities": _measure(entity_fn, iterations, qc),
+                                 "projection": _measure(projection_fn, iterations, qc)}
+                log(f"  {name} done")
+        db.session.remove()
+    return results
+
+def format_projection_results(results):
+    lines = [f"{'view':20} {'rows':>6} {'entity ms':>10} {'proj ms':>8} {'cpu saved':>10} "
+             f"{'entity KiB':>11} {'proj KiB':>9} {'mem saved':>10} {'queries':>9}"]
+    for name, r in results.items():
+        e, p = r["entities"], r["projection"]
+        lines.append(
+            f"{name:20} {p['rows']:>6} {e['cpu_ms']:>10} {p['cpu_ms']:>8} {-_delta(e['cpu_ms'], p['cpu_ms']):>9.0f}% "
+            f"{e['peak_kib']:>11} {p['peak_kib']:>9} {-_delta(e['peak_kib'], p['peak_kib']):>9.0f}% "
+            f"{str(e['queries']) + '->' + str(p['queries']):>9}"
+        )
+    return "\n".join(lines)
+
+# --- deadline surge on the submit path (flask bench-surge) ---
+
+def _surge_students(groups, per_group):
+    """user_ids of up to `per_group` members of each of `groups` groups."""
+    rows = db.session.execute(
+        select(StudentAccount.group_code, StudentAccount.user_id)
+        .where(StudentAccount.group_code.isnot(None))
+        .order_by(StudentAccount.group_code, StudentAccount.user_id)
+    ).all()
+    by_group = {}
+    for code, user_id in rows:
+        members = by_group.setdefault(code, [])
+        if len(members) < per_group:
+            members.append(user_id)
+    return [uid for members in list(by_group.values())[:groups] for uid in members]
+
+def _surge_client(app, user_id, url):
+    client = app.test_client()
+    with client.session_transaction() as sess:
+        sess["_user_id"] = str(user_id)
+        sess["_fresh"] = True
+    page = client.get(url).get_data(as_text=True)
+    token = re.search(r'name="csrf_token" value="([^"]+)"', page)
+    return client, token.group(1) if token else ""
+
+def surge_submissions(app, groups=200, per_group=2, threads=16, rounds=2, log=print):
+    """
+    The last minutes before a deadline: `per_group` members of each of `groups` groups
+    POST a small PDF to student.submit_activity from `threads` threads at once, `rounds`
+    times over (members of a group race each other; later rounds are resubmissions).
+    Runs against a temporary activity that is purged afterwards.
+
+    Accepted submissions are counted from the rows (inserts + resubmission_count), and
+    the rows are checked for one submission per group and exact Activity counters.
+    """
+    with app.app_context():
+        admin_id = db.session.query(User.id).filter(User.role == "admin").limit(1).scalar()
+        user_ids = _surge_students(groups, per_group)
+        if not admin_id or not user_ids:
+            raise RuntimeError("Need an admin and students in groups (run flask gen-data first).")
+        act = Activity(created_by_role="admin", created_by_user_id=admin_id, title="Surge benchmark",
+                       require_pdf=True, scope_all_groups=True, deadline_at=datetime.utcnow() + timedelta(minutes=10))
+        db.session.add(act)
+        db.session.commit()
+        activity_id = act.id
+        with app.test_request_context():
+            url = url_for("student.submit_activity", activity_id=activity_id)
+        db.session.remove()
+
+    clients = []
+    setup = threading.Thread(target=lambda: clients.extend(_surge_client(app, uid, url) for uid in user_ids))
+    setup.start()
+    setup.join()
+    log(f"  {len(clients)} students logged in; activity {activity_id}")
+
+    timings, queries, statuses, lock = [], [], {}, threading.Lock()
+
+    def worker(jobs):
+        for client, token in jobs:
+            qc.reset()
+            t0 = time.perf_counter()
+            resp = client.post(url, data={"csrf_token": token, "file": (io.BytesIO(TINY_PDF), "report.pdf")},
+                               content_type="multipart/form-data")
+            resp.close()
+            elapsed_ms = (time.perf_counter() - t0) * 1000
+            with lock:
+                timings.append(elapsed_ms)
+                queries.append(qc.count)
+                statuses[resp.status_code] = statuses.get(resp.status_code, 0) + 1
+
+    rng = random.Random(7)
+    started = time.perf_counter()
+    with QueryCounter() as qc:
+        for n in range(rounds):
+            jobs = clients[:]
+            rng.shuffle(jobs)
+            pool = [threading.Thread(target=worker, args=(jobs[i::threads],), name=f"surge-{i}") for i in range(threads)]
+            for t in pool:
+                t.start()
+            for t in pool:
+                t.join()
+            log(f"  round {n + 1}/{rounds} done")
+    elapsed = time.perf_counter() - started
+
+    with app.app_context():
+        rows, resubmissions, distinct_groups = db.session.execute(
+            select(func.count(Submission.id), func.coalesce(func.sum(Submission.resubmission_count), 0),
+                   func.count(Submission.group_code.distinct()))
+            .where(Submission.activity_id == activity_id)
+        ).one()
+        pending = db.session.execute(select(func.count()).select_from(Submission)
+                                     .where(Submission.activity_id == activity_id, Submission.status == "Pending")).scalar()
+        counter = db.session.execute(select(Activity.pending_count).where(Activity.id == activity_id)
+                                     .execution_options(include_deleted=True)).scalar()
+        db.session.execute(update(Activity).where(Activity.id == activity_id).values(deleted_at=datetime.utcnow())
+                           .execution_options(synchronize_session=False))
+        db.session.commit()
+        blobs = db.session.execute(select(SubmissionRevision.file_path)
+                                   .where(SubmissionRevision.activity_id == activity_id)).scalars().all()
+        purge_activity(activity_id)
+        release_files(blobs, grace_seconds=0)  # nobody else is uploading these; other users of a blob keep it
+        db.session.remove()
+
+    timings.sort()
+    accepted = rows + int(resubmissions)
+    return {
+        "requests": len(timings),
+        "accepted": accepted,
+        "accepted_per_sec": round(accepted / elapsed, 1) if elapsed else 0.0,
+        "p50_ms": round(_percentile(timings, 50), 2),
+        "p95_ms": round(_percentile(timings, 95), 2),
+        "p99_ms": round(_percentile(timings, 99), 2),
+        "queries": round(statistics.mean(queries), 1) if queries else 0.0,
+        "statuses": statuses,
+        "duplicate_rows": rows - distinct_groups,
+        "counter_ok": counter == pending,
+    }
+
+def format_surge_results(r):
+    return "\n".join([
+        f"requests {r['requests']}  accepted {r['accepted']}  ({r['accepted_per_sec']} accepted/sec)",
+        f"latency p50 {r['p50_ms']} ms  p95 {r['p95_ms']} ms  p99 {r['p99_ms']} ms  queries/request {r['queries']}",
+        f"status codes {r['statuses']}",
+        f"duplicate rows {r['duplicate_rows']}  pending counter {'ok' if r['counter_ok'] else 'WRONG'}",
+    ])
@@ -1,17 +1,29 @@
-from flask import Blueprint, render_template, request, redirect, url_for, flash, send_file
+from flask import Blueprint, render_template, request, redirect, url_for, flash, send_file, jsonify
 from flask_login import login_required, current_user
 from werkzeug.security import generate_password_hash
 from datetime import datetime
 import io
 import pandas as pd
-from sqlalchemy import or_
+from sqlalchemy import func, select, update, or_
 
 from ...decorators import role_required
 from ...extensions import db
+from ...reports import completion_matrix, behind_mask
+from ...audit import audit
+from ...utils import parse_max_file_mb
+from ...cleanup import soft_delete_activity, soft_delete_user
+from ...config_cache import config_cache
+from ...slow_queries import slow_query_log
+from ...search import search, search_filter, TYPE_ORDER
+from ...counters import add_member, group_member_limit
+from ...archive import archived_years
+from ...read_models import student_rows, account_rows, submission_rows
+from ...revisions import mark_current_revision
 from ...models import (
     User, SupervisorProfile, StudentMaster, StudentAccount, Group, GroupMember,
     SupervisorAssignment, Activity, ActivityTarget, Submission,
-    TitleSelectionWindow, TitleProposal, TitleArchive
+    TitleSelectionWindow, TitleProposal, TitleArchive, AuditEvent,
+    ActivityArchive, SubmissionArchive, TitleProposalArchive, GroupMemberArchive, TeamRequestArchive
 )
 
 bp = Blueprint("admin", __name__)
@@ -26,7 +38,7 @@ def dashboard():
         "supervisors": User.query.filter_by(role="supervisor").count(),
         "groups": Group.query.count(),
         "activities": Activity.query.count(),
-        "submissions_pending": Submission.query.filter_by(status="Pending").count()
+        "submissions_pending": db.session.query(func.coalesce(func.sum(Activity.pending_count), 0)).scalar()
     }
     return render_template("admin/dashboard.html", stats=stats)
 
@@ -75,15 +87,12 @@ def registration():
         if acc and acc.group_code:
             flash("Student already in a group.", "danger")
             return redirect(url_for("admin.registration", tab="third_student"))
-        # member limit
-        current_members = GroupMember.query.filter_by(group_code=group_code).count()
-        max_members = int(request.form.get("max_members") or 3)
-        if current_members >= max_members:
-            flash("Group member limit reached.", "danger")
-            return redirect(url_for("admin.registration", tab="third_student"))
-
         if not GroupMember.query.filter_by(group_code=group_code, student_id=student_id).first():
-            db.session.add(GroupMember(group_code=group_code, student_id=student_id))
+            # takes the seat atomically, so two admins cannot both add the last member
+            if not add_member(group_code, student_id):
+                db.session.rollback()
+                flash(f"Group member limit ({group_member_limit()}) reached.", "danger")
+                return redirect(url_for("admin.registration", tab="third_student"))
         if acc:
             acc.group_code = group_code
         db.session.commit()
@@ -91,7 +100,7 @@ def registration():
         return redirect(url_for("admin.students"))
 
     groups = Group.query.order_by(Group.created_at.desc()).all()
-    return render_template("admin/registration.html", tab=tab, groups=groups)
+    return render_template("admin/registration.html", tab=tab, groups=groups, max_members=group_member_limit())
 
 @bp.get("/supervisors")
 @login_required
@@ -108,10 +117,9 @@ def delete_supervisor(user_id):
     if user.role != "supervisor":
         flash("Invalid.", "danger")
         return redirect(url_for("admin.supervisors"))
-    SupervisorProfile.query.filter_by(user_id=user.id).delete()
-    db.session.delete(user)
-    db.session.commit()
-    flash("Supervisor deleted.", "success")
+    owned = soft_delete_user(user)
+    audit("account.delete", "user", user_id, user.role)
+    flash("Supervisor deleted." + (f" {owned} of their activities are being removed in the background." if owned else ""), "success")
     return redirect(url_for("admin.supervisors"))
 
 @bp.post("/supervisors/<int:user_id>/reset")
@@ -135,19 +143,19 @@ def students():
     flt = request.args.get("filter","all")
     q = (request.args.get("q") or "").strip()
 
-    # base join
-    join_q = db.session.query(StudentMaster, StudentAccount).outerjoin(StudentAccount, StudentAccount.student_id==StudentMaster.student_id)
+    # students outer-joined with their accounts, as column projections
+    criteria = []
     if q:
-        join_q = join_q.filter(or_(StudentMaster.student_id.ilike(f"%{q}%"), StudentMaster.name.ilike(f"%{q}%")))
+        criteria.append(search_filter(q, "student", StudentMaster.student_id, [StudentMaster.student_id, StudentMaster.name]))
 
     if flt == "not_registered":
-        join_q = join_q.filter(StudentAccount.user_id.is_(None))
+        criteria.append(StudentAccount.user_id.is_(None))
     elif flt == "in_team":
-        join_q = join_q.filter(StudentAccount.group_code.isnot(None))
+        criteria.append(StudentAccount.group_code.isnot(None))
     elif flt == "no_team":
-        join_q = join_q.filter(StudentAccount.user_id.isnot(None)).filter(StudentAccount.group_code.is_(None))
+        criteria += [StudentAccount.user_id.isnot(None), StudentAccount.group_code.is_(None)]
 
-    rows = join_q.order_by(StudentMaster.student_id.asc()).limit(1000).all()
+    rows = student_rows(*criteria, limit=1000)
     return render_template("admin/students.html", rows=rows, flt=flt, q=q)
 
 @bp.get("/students/export")
@@ -194,6 +202,7 @@ def assigning():
             start_at = request.form.get("start_at")
             deadline_at = request.form.get("deadline_at")
             require_pdf = "require_pdf" in request.form
+            max_file_mb = parse_max_file_mb(request.form.get("max_file_mb"))
             scope_all = "scope_all" in request.form
             targets = request.form.getlist("targets")
 
@@ -211,6 +220,7 @@ def assigning():
                 start_at=start_at,
                 deadline_at=deadline_at,
                 require_pdf=require_pdf,
+                max_file_mb=max_file_mb,
                 scope_all_groups=scope_all,
                 created_by_role="admin",
                 created_by_user_id=created_by_user_id  # Set the logged-in admin's ID here
@@ -243,9 +253,81 @@ def assigning():
 @login_required
 @role_required("admin")
 def activity():
-    subs = Submission.query.order_by(Submission.submitted_at.desc()).limit(500).all()
+    subs = submission_rows(limit=500)
     return render_template("admin/activity.html", subs=subs)
 
+ARCHIVE_TABS = ("activities", "titles", "groups", "requests")
+
+@bp.get("/archive")
+@login_required
+@role_required("admin")
+def archive():
+    """Read-only view of the academic years moved out by `flask archive-years`."""
+    years = archived_years()
+    year = request.args.get("year") or next(iter(years), None)
+    tab = request.args.get("tab") if request.args.get("tab") in ARCHIVE_TABS else "activities"
+    activity_id = request.args.get("activity", type=int)
+    rows, act = [], None
+    if year in years:
+        if activity_id:
+            act = ActivityArchive.query.filter_by(id=activity_id, academic_year=year).first_or_404()
+            rows = (SubmissionArchive.query.filter_by(activity_id=act.id)
+                    .order_by(SubmissionArchive.submitted_at.desc()).limit(500).all())
+        elif tab == "activities":
+            rows = (ActivityArchive.query.filter_by(academic_year=year)
+                    .order_by(ActivityArchive.created_at.desc()).limit(500).all())
+        elif tab == "titles":
+            rows = (TitleProposalArchive.query.filter_by(academic_year=year)
+                    .order_by(TitleProposalArchive.group_code, TitleProposalArchive.id).limit(500).all())
+        elif tab == "groups":
+            rows = (db.session.query(GroupMemberArchive.group_code, GroupMemberArchive.student_id,
+                                     StudentMaster.name, GroupMemberArchive.joined_at)
+                    .outerjoin(StudentMaster, StudentMaster.student_id == GroupMemberArchive.student_id)
+                    .filter(GroupMemberArchive.academic_year == year)
+                    .order_by(GroupMemberArchive.group_code, GroupMemberArchive.student_id).limit(1500).all())
+        else:
+            rows = (TeamRequestArchive.query.filter_by(academic_year=year)
+                    .order_by(TeamRequestArchive.created_at.desc()).limit(500).all())
+    return render_template("admin/archive.html", years=years, year=year, tab=tab, act=act, rows=rows)
+
+@bp.get("/completion")
+@login_required
+@role_required("admin")
+def completion():
+    behind_only = request.args.get("behind") == "1"
+    page = max(request.args.get("page", 1, type=int), 1)
+    per_page = 100
+
+    matrix, acts = completion_matrix()
+    if behind_only and not matrix.empty:
+        matrix = matrix[behind_mask(matrix)]
+    total = len(matrix.index)
+    pages = max((total + per_page - 1) // per_page, 1)
+    chunk = matrix.iloc[(page - 1) * per_page: page * per_page]
+    rows = list(zip(chunk.index, chunk.to_numpy().tolist()))
+    return render_template("admin/completion.html", acts=acts, rows=rows, total=total,
+                           page=page, pages=pages, behind_only=behind_only)
+
+@bp.get("/completion/export")
+@login_required
+@role_required("admin")
+def export_completion():
+    fmt = request.args.get("format", "csv")
+    matrix, acts = completion_matrix()
+    if request.args.get("behind") == "1" and not matrix.empty:
+        matrix = matrix[behind_mask(matrix)]
+    df = matrix.rename(columns={a.id: f"{a.title} (#{a.id})" for a in acts})
+    df.index.name = "group_code"
+    out = io.BytesIO()
+    if fmt == "xlsx":
+        df.to_excel(out, sheet_name="completion")
+        out.seek(0)
+        return send_file(out, mimetype="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+                         as_attachment=True, download_name="activity_completion.xlsx")
+    df.to_csv(out)
+    out.seek(0)
+    return send_file(out, mimetype="text/csv", as_attachment=True, download_name="activity_completion.csv")
+
 @bp.post("/activity/<int:sub_id>/mark")
 @login_required
 @role_required("admin")
@@ -254,7 +336,9 @@ def mark_sub(sub_id):
     sub.status="Marked"
     sub.marked_by_user_id=current_user.id
     sub.marked_at=datetime.utcnow()
+    mark_current_revision(sub.id, sub.marked_at)
     db.session.commit()
+    audit("submission.mark", "submission", sub.id)
     flash("Marked.", "success")
     return redirect(url_for("admin.activity"))
 
@@ -267,6 +351,7 @@ def reject_sub(sub_id):
     sub.marked_by_user_id=current_user.id
     sub.marked_at=datetime.utcnow()
     db.session.commit()
+    audit("submission.reject", "submission", sub.id)
     flash("Rejected.", "warning")
     return redirect(url_for("admin.activity"))
 
@@ -295,6 +380,7 @@ def update_activity(activity_id):
     activity.title = request.form.get("title")
     activity.description = request.form.get("description")
     activity.require_pdf = True if request.form.get("require_pdf") == "on" else False
+    activity.max_file_mb = parse_max_file_mb(request.form.get("max_file_mb"))
     activity.scope_all_groups = True if request.form.get("scope_all") == "on" else False
 
     def parse_dt(v):
@@ -322,8 +408,8 @@ def update_activity(activity_id):
 def delete_activity(activity_id):
     activity = Activity.query.get_or_404(activity_id)
 
-    db.session.delete(activity)  # cascades to targets + submissions
-    db.session.commit()
+    soft_delete_activity(activity)  # hidden now; submissions and files are purged in the background
+    audit("activity.delete", "activity", activity_id, activity.title)
 
     flash("Activity deleted permanently.", "warning")
     return redirect(url_for("admin.assigning"))
@@ -339,11 +425,14 @@ def title_control():
         win = TitleSelectionWindow(is_open=is_open, scope_all_groups=scope_all, created_by=current_user.id)
         db.session.add(win)
         db.session.commit()
+        config_cache.invalidate("title_window")
+        audit("title_window.update", "title_window", win.id, f"open={is_open} scope_all={scope_all}")
         flash("Title selection settings updated.", "success")
         return redirect(url_for("admin.title_control"))
     win = TitleSelectionWindow.query.order_by(TitleSelectionWindow.id.desc()).first()
     props = TitleProposal.query.order_by(TitleProposal.id.desc()).limit(200).all()
-    return render_template("admin/title_control.html", win=win, props=props)
+    return render_template("admin/title_control.html", win=win, props=props,
+                           loaded_at=datetime.utcnow().isoformat())
 
 @bp.post("/title-control/<int:tp_id>/approve")
 @login_required
@@ -353,6 +442,7 @@ def approve_title(tp_id):
     tp.status_admin="Approved"
     tp.last_action_at=datetime.utcnow()
     db.session.commit()
+    audit("title.admin_approve", "title_proposal", tp.id)
     flash("Approved and forwarded to supervisor.", "success")
     return redirect(url_for("admin.title_control"))
 
@@ -364,23 +454,146 @@ def reject_title(tp_id):
     tp.status_admin="Rejected"
     tp.last_action_at=datetime.utcnow()
     db.session.commit()
+    audit("title.admin_reject", "title_proposal", tp.id)
     flash("Rejected. Group may resubmit.", "warning")
     return redirect(url_for("admin.title_control"))
 
+BULK_TITLE_ACTIONS = {"approve": "Approved", "reject": "Rejected"}
+
+@bp.post("/title-control/bulk")
+@login_required
+@role_required("admin")
+def title_bulk():
+    """
+    Apply one admin decision to many proposals with a single UPDATE. Rows already in
+    that state, or acted on since the page was loaded (`loaded_at`), are left alone
+    and reported back as stale instead of being overwritten.
+    """
+    status = BULK_TITLE_ACTIONS.get(request.form.get("action"))
+    ids = {int(v) for v in request.form.getlist("ids") if v.isdigit()}
+    try:
+        loaded_at = datetime.fromisoformat(request.form.get("loaded_at", ""))
+    except ValueError:
+        loaded_at = None
+    if not status or not ids or loaded_at is None:
+        if request.args.get("format") == "json":
+            return jsonify(error="Select at least one title and an action."), 400
+        flash("Select at least one title and an action.", "danger")
+        return redirect(url_for("admin.title_control"))
+
+    now = datetime.utcnow()
+    criteria = [TitleProposal.id.in_(ids), TitleProposal.status_admin != status,
+                or_(TitleProposal.last_action_at.is_(None), TitleProposal.last_action_at < loaded_at)]
+    stmt = (update(TitleProposal).values(status_admin=status, last_action_at=now)
+            .execution_options(synchronize_session=False))
+    if db.engine.dialect.update_returning:
+        changed_ids = set(db.session.execute(stmt.where(*criteria).returning(TitleProposal.id)).scalars())
+    else:
+        # no UPDATE ... RETURNING (MySQL/MariaDB): lock the rows this run will change, then change exactly those
+        changed_ids = set(db.session.execute(select(TitleProposal.id).where(*criteria).with_for_update()).scalars())
+        if changed_ids:
+            db.session.execute(stmt.where(TitleProposal.id.in_(changed_ids)))
+    db.session.commit()
+    rows = db.session.execute(
+        select(TitleProposal.id, TitleProposal.group_code, TitleProposal.status_admin)
+        .where(TitleProposal.id.in_(ids))
+    ).all()
+    changed = [r for r in rows if r.id in changed_ids]
+    skipped = [r for r in rows if r.id not in changed_ids]
+    missing = sorted(ids - {r.id for r in rows})
+    for r in changed:
+        audit(f"title.admin_{request.form['action']}", "title_proposal", r.id, "bulk")
+
+    if request.args.get("format") == "json":
+        return jsonify(
+            status=status,
+            changed=[{"id": r.id, "group_code": r.group_code} for r in changed],
+            skipped=[{"id": r.id, "group_code": r.group_code, "status_admin": r.status_admin} for r in skipped],
+            missing=missing,
+        )
+    flash(f"{status} {len(changed)} title request(s).", "success" if changed else "warning")
+    if skipped or missing:
+        stale = ", ".join(f"{r.group_code} ({r.status_admin})" for r in skipped)
+        if missing:
+            stale = ", ".join(filter(None, [stale, f"{len(missing)} no longer exist"]))
+        flash(f"Skipped {len(skipped) + len(missing)} already changed since the page was loaded: {stale}", "warning")
+    return redirect(url_for("admin.title_control"))
+
 @bp.get("/accounts")
 @login_required
 @role_required("admin")
 def accounts():
     flt = request.args.get("role","all")
     q = (request.args.get("q") or "").strip()
-    users_q = User.query
+    criteria = []
     if flt in ("admin","supervisor","student"):
-        users_q = users_q.filter_by(role=flt)
+        criteria.append(User.role == flt)
     if q:
-        users_q = users_q.filter(User.username.ilike(f"%{q}%"))
-    users = users_q.order_by(User.id.desc()).limit(500).all()
+        criteria.append(search_filter(q, "account", User.id, [User.username]))
+    users = account_rows(*criteria, limit=500)
     return render_template("admin/accounts.html", users=users, flt=flt, q=q)
 
+@bp.get("/search")
+@login_required
+@role_required("admin")
+def search_page():
+    q = (request.args.get("q") or "").strip()
+    kind = request.args.get("type", "")
+    types = [kind] if kind in TYPE_ORDER else None
+    results = search(q, types=types, limit=50) if q else []
+    if request.args.get("format") == "json":
+        return jsonify(results=[r.__dict__ for r in results])
+    return render_template("admin/search.html", q=q, kind=kind, types=TYPE_ORDER, results=results)
+
+@bp.get("/audit")
+@login_required
+@role_required("admin")
+def audit_log():
+    actor = (request.args.get("actor") or "").strip()
+    entity_type = (request.args.get("entity_type") or "").strip()
+    entity_id = (request.args.get("entity_id") or "").strip()
+    since = request.args.get("since") or ""
+    until = request.args.get("until") or ""
+
+    events_q = db.session.query(AuditEvent, User.username).outerjoin(User, User.id==AuditEvent.actor_user_id)
+    if actor:
+        actor_user = User.query.filter_by(username=actor).first()
+        events_q = events_q.filter(AuditEvent.actor_user_id==(actor_user.id if actor_user else -1))
+    if entity_type:
+        events_q = events_q.filter(AuditEvent.entity_type==entity_type)
+        if entity_id:
+            events_q = events_q.filter(AuditEvent.entity_id==entity_id)
+    try:
+        if since:
+            events_q = events_q.filter(AuditEvent.created_at >= datetime.fromisoformat(since))
+        if until:
+            events_q = events_q.filter(AuditEvent.created_at < datetime.fromisoformat(until))
+    except ValueError:
+        flash("Invalid date filter.", "danger")
+        return redirect(url_for("admin.audit_log"))
+
+    events = events_q.order_by(AuditEvent.created_at.desc(), AuditEvent.id.desc()).limit(500).all()
+    entity_types = ["submission", "title_proposal", "title_window", "activity"]
+    return render_template("admin/audit.html", events=events, actor=actor, entity_type=entity_type,
+                           entity_id=entity_id, since=since, until=until, entity_types=entity_types)
+
+@bp.get("/slow-queries")
+@login_required
+@role_required("admin")
+def slow_queries():
+    sort = request.args.get("sort", "total")
+    rows = slow_query_log.summary(sort=sort)
+    return render_template("admin/slow_queries.html", rows=rows, sort=sort,
+                           threshold_ms=slow_query_log.threshold * 1000)
+
+@bp.post("/slow-queries/clear")
+@login_required
+@role_required("admin")
+def slow_queries_clear():
+    slow_query_log.clear()
+    flash("Slow-query log cleared.", "success")
+    return redirect(url_for("admin.slow_queries"))
+
 @bp.post("/accounts/<int:user_id>/reset")
 @login_required
 @role_required("admin")
@@ -400,9 +613,13 @@ def delete_account(user_id):
     if user.role == "admin" and user.username == "admin":
         flash("Cannot delete default admin.", "danger")
         return redirect(url_for("admin.accounts"))
-    db.session.delete(user)
-    db.session.commit()
-    flash("Account deleted.", "success")
+    if user.id == current_user.id:
+        flash("You cannot delete your own account.", "danger")
+        return redirect(url_for("admin.accounts"))
+    role = user.role
+    owned = soft_delete_user(user)
+    audit("account.delete", "user", user_id, role)
+    flash("Account deleted." + (f" {owned} of its activities are being removed in the background." if owned else ""), "success")
     return redirect(url_for("admin.accounts"))
 
 @bp.route("/import", methods=["GET","POST"])
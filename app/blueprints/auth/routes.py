@@ -5,6 +5,8 @@ from werkzeug.security import generate_password_hash
 from ...extensions import db
 from ...models import User, StudentMaster, StudentAccount
 from ...utils import initials_from_name, avatar_color, allowed_file, secure_save
+from ...images import process_profile_photo
+from ...tasks import tasks
 import os
 
 import random
@@ -289,6 +291,9 @@ def student_register_step2():
     )
     db.session.add(acc)
     db.session.commit()
+    if photo_path:
+        # thumbnails are built off the request; pages show initials until they are ready
+        tasks.submit(process_profile_photo, user.id)
 
     # clear session
     session.pop("register_sid", None)
@@ -0,0 +1,38 @@
+import hmac
+from flask import Blueprint, Response, abort, current_app, jsonify, request
+from sqlalchemy import text
+
+from ...extensions import db
+from ... import metrics
+
+bp = Blueprint("health", __name__)
+
+@bp.get("/healthz")
+def liveness():
+    # process is up and serving; no dependencies checked
+    return jsonify(status="ok")
+
+@bp.get("/readyz")
+def readiness():
+    """503 until the worker has warmed up, while it drains for shutdown, or when the database is unreachable."""
+    state = current_app.extensions["lifecycle"]
+    if state["draining"]:
+        return jsonify(status="draining"), 503
+    if not state["ready"]:
+        return jsonify(status="warming"), 503
+    try:
+        db.session.execute(text("SELECT 1"))
+    except Exception as e:
+        current_app.logger.warning("Readiness check failed: %s", e)
+        return jsonify(status="database unavailable"), 503
+    return jsonify(status="ready")
+
+@bp.get("/metrics")
+def prometheus_metrics():
+    if current_app.extensions.get("metrics") is None:
+        abort(404)  # prometheus_client not installed
+    token = current_app.config.get("METRICS_TOKEN")
+    if token and not hmac.compare_digest(request.headers.get("Authorization", ""), f"Bearer {token}"):
+        return Response("unauthorized\n", 401, {"WWW-Authenticate": "Bearer"}, mimetype="text/plain")
+    body, content_type = metrics.render()
+    return Response(body, content_type=content_type)
@@ -1,16 +1,29 @@
-from flask import Blueprint, render_template, request, redirect, url_for, flash, current_app, send_from_directory
+from flask import Blueprint, render_template, request, redirect, url_for, flash, current_app, send_from_directory, jsonify, abort
 from flask_login import login_required, current_user
+from flask_wtf.csrf import validate_csrf, CSRFError
+from wtforms import ValidationError
 from datetime import datetime
 import os
 from sqlalchemy import or_
 
 from ...decorators import role_required
-from ...extensions import db
+from ...extensions import db, csrf
 from ...models import (
     StudentAccount, StudentMaster, Group, GroupMember, SupervisorAssignment,
-    Activity, ActivityTarget, Submission, TeamRequest, TitleProposal, TitleArchive, TitleSelectionWindow, SupervisorProfile, User
+    Activity, ActivityTarget, Submission, TeamRequest, TitleProposal, TitleArchive, SupervisorProfile, User,
+    UploadSession
 )
-from ...utils import secure_save, allowed_file
+from ...images import THUMB_DIR
+from ...config_cache import current_title_window
+from ...uploads import (
+    receive_upload, UploadRejected, create_session, write_chunk, received_ranges, finalize_session,
+    discard_session, schedule_gc
+)
+from ...counters import add_member
+from ...tasks import tasks
+from ...similarity import index_submission
+from ...submissions import submit_gate, save_submission, SubmissionClosed
+from ...revisions import schedule_prune
 
 bp = Blueprint("student", __name__)
 
@@ -68,10 +81,8 @@ def dashboard():
             )
         ).order_by(Activity.deadline_at.asc()).all()
 
-    # title window
-    win = TitleSelectionWindow.query.order_by(
-        TitleSelectionWindow.id.desc()
-    ).first()
+    # title window (cached per process; invalidated by admin.title_control)
+    win = current_title_window()
     title_open = bool(win and win.is_open)
 
     return render_template(
@@ -164,7 +175,10 @@ def accept_request(req_id):
     db.session.flush()
 
     for sid in [tr.requester_student_id, tr.receiver_student_id]:
-        db.session.add(GroupMember(group_code=group_code, student_id=sid))
+        if not add_member(group_code, sid):
+            db.session.rollback()
+            flash("Team size limit reached.", "danger")
+            return redirect(url_for("student.requests_inbox"))
         # set group_code on accounts
         sacc = StudentAccount.query.filter_by(student_id=sid).first()
         if sacc:
@@ -200,7 +214,7 @@ def titles():
         return redirect(url_for("student.dashboard"))
 
     # selection window
-    win = TitleSelectionWindow.query.order_by(TitleSelectionWindow.id.desc()).first()
+    win = current_title_window()
     title_open = bool(win and win.is_open)
 
     # current proposal
@@ -262,9 +276,12 @@ def activities():
     return render_template("student/activities.html", acc=acc, group_code=group_code, acts=acts, subs_by_act=subs_by_act)
 
 @bp.route("/activities/<int:activity_id>/submit", methods=["GET","POST"])
+@csrf.exempt  # checked in the upload stream, before the file is written
 @login_required
 @role_required("student")
 def submit_activity(activity_id):
+    if request.method == "POST":
+        return _submit_post(activity_id)
     acc = _student_account()
     group_code = acc.group_code
     if not group_code:
@@ -289,40 +306,156 @@ def submit_activity(activity_id):
         flash("Deadline has passed. Submission is locked.", "danger")
         return redirect(url_for("student.activities"))
 
-    if request.method == "POST":
-        # allow resubmit only if not marked and deadline not passed
-        if sub and sub.status == "Marked":
-            flash("This activity is already marked. You cannot resubmit.", "danger")
-            return redirect(url_for("student.activities"))
-
-        file = request.files.get("file")
-        if act.require_pdf:
-            if not file or not file.filename:
-                flash("PDF file is required for this activity.", "danger")
-                return redirect(url_for("student.submit_activity", activity_id=activity_id))
-            if not allowed_file(file.filename, set(["pdf"])):
-                flash("Only PDF files are allowed.", "danger")
-                return redirect(url_for("student.submit_activity", activity_id=activity_id))
-
-        file_path=None
-        if file and file.filename:
-            upload_dir = os.path.join(current_app.config["UPLOAD_FOLDER"], "submissions", group_code)
-            file_path = secure_save(file, upload_dir, f"activity_{activity_id}_{acc.student_id}_{file.filename}")
-
-        if not sub:
-            sub = Submission(activity_id=activity_id, group_code=group_code, submitted_by_student_id=acc.student_id, file_path=file_path, status="Pending")
-            db.session.add(sub)
-        else:
-            sub.file_path = file_path or sub.file_path
-            sub.submitted_at = datetime.utcnow()
-            sub.status = "Pending"
-            sub.resubmission_count = (sub.resubmission_count or 0) + 1
+    return render_template("student/activity_submit.html", acc=acc, group_code=group_code, act=act, sub=sub,
+                           chunk_threshold=current_app.config["RESUMABLE_CHUNK_SIZE"])
+
+def _submit_post(activity_id):
+    """Deadline-surge path: one query for the rules, one statement for the row (app/submissions.py)."""
+    gate = submit_gate(current_user.id, activity_id)
+    if gate.activity is None:
+        abort(404)
+    err = gate.error()
+    if err:
+        flash(err, "warning" if not gate.group_code else "danger")
+        return redirect(url_for("student.dashboard" if not gate.group_code else "student.activities"))
+
+    # stream the body ourselves: the file is validated, hashed and written chunk by chunk
+    act = gate.activity
+    try:
+        _, upload = receive_upload(
+            "file", _submission_dir(gate.group_code), _submission_name(act, gate),
+            max_bytes=_max_upload_bytes(act), require_pdf=act.require_pdf,
+            check_fields=lambda fields: validate_csrf(fields.get("csrf_token")),
+        )
+    except ValidationError as e:
+        raise CSRFError(e.args[0])
+    except UploadRejected as e:
+        flash(str(e), "danger")
+        return redirect(url_for("student.submit_activity", activity_id=activity_id))
+    if act.require_pdf and not upload:
+        flash("PDF file is required for this activity.", "danger")
+        return redirect(url_for("student.submit_activity", activity_id=activity_id))
+
+    try:
+        sub_id = save_submission(gate, upload)
+    except SubmissionClosed as e:
+        db.session.rollback()
+        flash(str(e), "danger")
+        return redirect(url_for("student.activities"))
+    db.session.commit()
+    if upload:
+        tasks.submit(index_submission, sub_id)
+        schedule_prune()
+    flash("Submission saved successfully.", "success")
+    return redirect(url_for("student.activities"))
+
+def _submission_dir(group_code):
+    return os.path.join(current_app.config["UPLOAD_FOLDER"], "submissions", group_code)
+
+def _submission_name(act, acc):
+    # acc: anything with a student_id (StudentAccount or SubmitGate)
+    return f"activity_{act.id}_{acc.student_id}_{{filename}}"
+
+def _max_upload_bytes(act):
+    max_bytes = (act.max_file_mb or current_app.config["SUBMISSION_MAX_MB"]) * 1024 * 1024
+    if current_app.config.get("MAX_CONTENT_LENGTH"):
+        max_bytes = min(max_bytes, current_app.config["MAX_CONTENT_LENGTH"])
+    return max_bytes
 
+# --- Resumable uploads (JSON; used by the submit page for large files) ---
+
+def _own_upload(upload_id):
+    return UploadSession.query.filter_by(id=upload_id, user_id=current_user.id).first_or_404()
+
+def _upload_state(sess):
+    return {"upload_id": sess.id, "chunk_size": sess.chunk_size, "total_chunks": sess.total_chunks,
+            "received": received_ranges(sess)}
+
+@bp.post("/activities/<int:activity_id>/upload-sessions")
+@login_required
+@role_required("student")
+def upload_initiate(activity_id):
+    gate = submit_gate(current_user.id, activity_id)
+    if gate.activity is None:
+        abort(404)
+    err = gate.error()
+    if err:
+        return jsonify(error=err), 403
+    act = gate.activity
+    data = request.get_json(silent=True) or {}
+    # same file again (page reload, another tab): resume instead of starting over
+    sess = UploadSession.query.filter_by(user_id=current_user.id, activity_id=act.id,
+                                         sha256=(data.get("sha256") or "").lower(), total_size=data.get("size")).first()
+    if not sess:
+        try:
+            sess = create_session(current_user.id, act, gate.group_code, data.get("filename"), data.get("size"),
+                                  data.get("sha256"), _max_upload_bytes(act))
+        except UploadRejected as e:
+            return jsonify(error=str(e)), 400
         db.session.commit()
-        flash("Submission saved successfully.", "success")
-        return redirect(url_for("student.activities"))
+    schedule_gc()
+    return jsonify(_upload_state(sess))
 
-    return render_template("student/activity_submit.html", acc=acc, group_code=group_code, act=act, sub=sub)
+@bp.get("/upload-sessions/<upload_id>")
+@login_required
+@role_required("student")
+def upload_status(upload_id):
+    return jsonify(_upload_state(_own_upload(upload_id)))
+
+@bp.put("/upload-sessions/<upload_id>/chunks/<int:index>")
+@login_required
+@role_required("student")
+def upload_chunk(upload_id, index):
+    sess = _own_upload(upload_id)
+    try:
+        write_chunk(sess, index, request.stream, request.headers.get("X-Chunk-SHA256"),
+                    require_pdf=sess.activity.require_pdf)
+    except UploadRejected as e:
+        return jsonify(error=str(e)), 400
+    return jsonify(_upload_state(sess))
+
+@bp.post("/upload-sessions/<upload_id>/finalize")
+@login_required
+@role_required("student")
+def upload_finalize(upload_id):
+    sess = _own_upload(upload_id)
+    gate = submit_gate(current_user.id, sess.activity_id)
+    err = gate.error() if gate.activity else "This activity is no longer available."
+    if err:
+        return jsonify(error=err), 403
+    act = gate.activity
+    try:
+        upload = finalize_session(sess, _submission_dir(gate.group_code), _submission_name(act, gate),
+                                  require_pdf=act.require_pdf)
+        sub_id = save_submission(gate, upload)
+    except UploadRejected as e:
+        return jsonify(error=str(e), **_upload_state(sess)), 409
+    except SubmissionClosed as e:
+        db.session.commit()  # the upload session is used up either way
+        return jsonify(error=str(e)), 403
+    db.session.commit()
+    tasks.submit(index_submission, sub_id)
+    schedule_prune()
+    flash("Submission saved successfully.", "success")
+    return jsonify(ok=True, sha256=upload.sha256, redirect=url_for("student.activities"))
+
+@bp.delete("/upload-sessions/<upload_id>")
+@login_required
+@role_required("student")
+def upload_cancel(upload_id):
+    discard_session(_own_upload(upload_id))
+    db.session.commit()
+    return jsonify(ok=True)
+
+@bp.get("/avatars/<filename>")
+@login_required
+@role_required("student","admin","supervisor")
+def avatar(filename):
+    # thumbnail names carry a content hash, so they can be cached for good
+    directory = os.path.join(current_app.config["UPLOAD_FOLDER"], "profiles", THUMB_DIR)
+    resp = send_from_directory(directory, filename, mimetype="image/webp", max_age=31536000)
+    resp.headers["Cache-Control"] = "private, max-age=31536000, immutable"
+    return resp
 
 @bp.get("/uploads/<path:filepath>")
 @login_required
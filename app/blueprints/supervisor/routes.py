@@ -1,11 +1,23 @@
-from flask import Blueprint, render_template, request, redirect, url_for, flash
+from flask import Blueprint, render_template, request, redirect, url_for, flash, current_app, send_file
 from flask_login import login_required, current_user
 from datetime import datetime
+import os
 from sqlalchemy import or_
 
 from ...decorators import role_required
 from ...extensions import db
-from ...models import SupervisorAssignment, GroupMember, StudentMaster, Activity, ActivityTarget, Submission, TitleProposal, Group
+from ...models import (
+    SupervisorAssignment, Activity, ActivityTarget, Submission, TitleProposal, Group,
+    SubmissionRevision,
+)
+from ...reports import activity_summaries, SUBMISSION_STATUSES
+from ...audit import audit
+from ...utils import parse_max_file_mb
+from ...cleanup import soft_delete_activity
+from ...work_queue import queue_counts, queue_page, QUEUE_PER_PAGE
+from ...read_models import supervisor_group_rows
+from ...similarity import activity_report, index_status
+from ...revisions import mark_current_revision, revisions_of
 
 bp = Blueprint("supervisor", __name__)
 
@@ -16,44 +28,29 @@ def dashboard():
     assignments = SupervisorAssignment.query.filter_by(supervisor_user_id=current_user.id).all()
     group_codes = [a.group_code for a in assignments]
     groups_count = len(group_codes)
-    subs_pending = Submission.query.join(Activity, Submission.activity_id==Activity.id)        .filter(Activity.created_by_role=="supervisor", Activity.created_by_user_id==current_user.id)        .filter(Submission.status=="Pending").count()
-    return render_template("supervisor/dashboard.html", groups_count=groups_count, subs_pending=subs_pending)
+    queue = queue_counts(current_user.id)
+    return render_template("supervisor/dashboard.html", groups_count=groups_count, queue=queue)
+
+@bp.get("/queue")
+@login_required
+@role_required("supervisor")
+def queue():
+    page = max(request.args.get("page", 1, type=int), 1)
+    items, total = queue_page(current_user.id, page)
+    pages = max((total + QUEUE_PER_PAGE - 1) // QUEUE_PER_PAGE, 1)
+    return render_template("supervisor/queue.html", items=items, total=total, page=page, pages=pages)
+
+def _back(endpoint, **values):
+    """Actions taken from the work queue return to the same queue page."""
+    if request.form.get("from") == "queue":
+        return redirect(url_for("supervisor.queue", page=request.form.get("page", 1, type=int)))
+    return redirect(url_for(endpoint, **values))
 
 @bp.get("/groups")
 @login_required
 @role_required("supervisor")
 def groups():
-    assignments = SupervisorAssignment.query.filter_by(
-        supervisor_user_id=current_user.id
-    ).all()
-
-    group_rows = []
-
-    for a in assignments:
-        members = (
-            db.session.query(StudentMaster)
-            .join(GroupMember, GroupMember.student_id == StudentMaster.student_id)
-            .filter(GroupMember.group_code == a.group_code)
-            .all()
-        )
-
-        title = (
-            TitleProposal.query
-            .filter_by(
-                group_code=a.group_code,
-                status_admin="Approved",
-                status_supervisor="Approved"
-            )
-            .order_by(TitleProposal.id.desc())
-            .first()
-        )
-
-        group_rows.append({
-            "assignment": a,
-            "members": members,
-            "title": title
-        })
-
+    group_rows = supervisor_group_rows(current_user.id)
     return render_template(
         "supervisor/groups.html",
         group_rows=group_rows
@@ -72,6 +69,7 @@ def activity_create():
         start_at = request.form.get("start_at") or ""
         deadline_at = request.form.get("deadline_at") or ""
         require_pdf = True if request.form.get("require_pdf") == "on" else False
+        max_file_mb = parse_max_file_mb(request.form.get("max_file_mb"))
         scope_all = True if request.form.get("scope_all") == "on" else False
         targets = request.form.getlist("targets")
 
@@ -90,6 +88,7 @@ def activity_create():
             start_at=parse_dt(start_at),
             deadline_at=parse_dt(deadline_at),
             require_pdf=require_pdf,
+            max_file_mb=max_file_mb,
             scope_all_groups=scope_all,
         )
         db.session.add(act)
@@ -155,6 +154,7 @@ def update_activity(activity_id):
     activity.title = request.form.get("title")
     activity.description = request.form.get("description")
     activity.require_pdf = True if request.form.get("require_pdf") == "on" else False
+    activity.max_file_mb = parse_max_file_mb(request.form.get("max_file_mb"))
     activity.scope_all_groups = True if request.form.get("scope_all") == "on" else False
 
     # Parse the dates
@@ -190,10 +190,9 @@ def delete_activity(activity_id):
         flash("You don't have permission to delete this activity.", "danger")
         return redirect(url_for('supervisor.activity_create'))
 
-    # Deleting the activity and associated targets
-    ActivityTarget.query.filter_by(activity_id=activity.id).delete()
-    db.session.delete(activity)
-    db.session.commit()
+    # hidden now; targets, submissions and files are purged in the background
+    soft_delete_activity(activity)
+    audit("activity.delete", "activity", activity_id, activity.title)
 
     flash("Activity deleted successfully.", "warning")
     return redirect(url_for("supervisor.activity_create"))
@@ -204,10 +203,64 @@ def delete_activity(activity_id):
 @login_required
 @role_required("supervisor")
 def reports():
-    # submissions to my activities
-    my_act_ids = [a.id for a in Activity.query.filter_by(created_by_role="supervisor", created_by_user_id=current_user.id).all()]
-    subs = Submission.query.filter(Submission.activity_id.in_(my_act_ids)).order_by(Submission.submitted_at.desc()).limit(500).all()
-    return render_template("supervisor/reports.html", subs=subs)
+    # one aggregate row per activity I created
+    summaries = activity_summaries(Activity.created_by_role=="supervisor", Activity.created_by_user_id==current_user.id)
+    return render_template("supervisor/reports.html", summaries=summaries)
+
+@bp.get("/reports/activity/<int:activity_id>")
+@login_required
+@role_required("supervisor")
+def report_detail(activity_id):
+    act = Activity.query.get_or_404(activity_id)
+    if act.created_by_role != "supervisor" or act.created_by_user_id != current_user.id:
+        flash("Not allowed.", "danger")
+        return redirect(url_for("supervisor.reports"))
+    status = request.args.get("status", "all")
+    subs_q = Submission.query.filter_by(activity_id=act.id)
+    if status in SUBMISSION_STATUSES:
+        subs_q = subs_q.filter_by(status=status)
+    subs = subs_q.order_by(Submission.submitted_at.desc()).limit(500).all()
+    return render_template("supervisor/report_detail.html", act=act, subs=subs, status=status)
+
+@bp.get("/reports/activity/<int:activity_id>/similarity")
+@login_required
+@role_required("supervisor")
+def similarity_report(activity_id):
+    act = Activity.query.get_or_404(activity_id)
+    if act.created_by_role != "supervisor" or act.created_by_user_id != current_user.id:
+        flash("Not allowed.", "danger")
+        return redirect(url_for("supervisor.reports"))
+    pairs = activity_report(act.id)
+    with_file, indexed, no_text = index_status(act.id)
+    return render_template("supervisor/similarity.html", act=act, pairs=pairs,
+                           with_file=with_file, indexed=indexed, no_text=no_text)
+
+@bp.get("/reports/<int:sub_id>/revisions")
+@login_required
+@role_required("supervisor")
+def submission_history(sub_id):
+    sub = Submission.query.get_or_404(sub_id)
+    act = Activity.query.get(sub.activity_id)
+    if not act or act.created_by_role != "supervisor" or act.created_by_user_id != current_user.id:
+        flash("Not allowed.", "danger")
+        return redirect(url_for("supervisor.reports"))
+    return render_template("supervisor/revisions.html", act=act, sub=sub, revisions=revisions_of(sub.id),
+                           keep_last=current_app.config["REVISION_KEEP_LAST"])
+
+@bp.get("/revisions/<int:revision_id>/file")
+@login_required
+@role_required("supervisor")
+def revision_file(revision_id):
+    rev = SubmissionRevision.query.get_or_404(revision_id)
+    act = Activity.query.get(rev.activity_id)
+    if not act or act.created_by_role != "supervisor" or act.created_by_user_id != current_user.id:
+        flash("Not allowed.", "danger")
+        return redirect(url_for("supervisor.reports"))
+    if rev.pruned_at or not rev.file_path or not os.path.isfile(rev.file_path):
+        flash("This revision's file is no longer kept.", "warning")
+        return redirect(url_for("supervisor.submission_history", sub_id=rev.submission_id))
+    return send_file(rev.file_path, as_attachment=True,
+                     download_name=rev.original_name or os.path.basename(rev.file_path))
 
 @bp.post("/reports/<int:sub_id>/mark")
 @login_required
@@ -221,9 +274,11 @@ def mark_submission(sub_id):
     sub.status="Marked"
     sub.marked_by_user_id=current_user.id
     sub.marked_at=datetime.utcnow()
+    mark_current_revision(sub.id, sub.marked_at)
     db.session.commit()
+    audit("submission.mark", "submission", sub.id)
     flash("Marked successfully.", "success")
-    return redirect(url_for("supervisor.reports"))
+    return _back("supervisor.report_detail", activity_id=sub.activity_id)
 
 @bp.post("/reports/<int:sub_id>/reject")
 @login_required
@@ -238,8 +293,9 @@ def reject_submission(sub_id):
     sub.marked_by_user_id=current_user.id
     sub.marked_at=datetime.utcnow()
     db.session.commit()
+    audit("submission.reject", "submission", sub.id)
     flash("Rejected. Students may resubmit if deadline allows.", "warning")
-    return redirect(url_for("supervisor.reports"))
+    return _back("supervisor.report_detail", activity_id=sub.activity_id)
 
 @bp.get("/title-approvals")
 @login_required
@@ -262,8 +318,9 @@ def approve_title(tp_id):
     tp.status_supervisor="Approved"
     tp.last_action_at=datetime.utcnow()
     db.session.commit()
+    audit("title.supervisor_approve", "title_proposal", tp.id)
     flash("Title approved.", "success")
-    return redirect(url_for("supervisor.title_approvals"))
+    return _back("supervisor.title_approvals")
 
 @bp.post("/title-approvals/<int:tp_id>/reject")
 @login_required
@@ -277,5 +334,6 @@ def reject_title(tp_id):
     tp.status_supervisor="Rejected"
     tp.last_action_at=datetime.utcnow()
     db.session.commit()
+    audit("title.supervisor_reject", "title_proposal", tp.id)
     flash("Title rejected. Group can submit a new title.", "warning")
-    return redirect(url_for("supervisor.title_approvals"))
+    return _back("supervisor.title_approvals")
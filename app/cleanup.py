@@ -0,0 +1,173 @@
+"""
+Soft delete with background purge for activities and accounts.
+
+Deleting only stamps `deleted_at` (one UPDATE); a global ORM filter hides those rows
+from every query at once. A task then removes dependent rows in bounded batches,
+committing between batches so no single transaction holds long locks on
+`submissions`, and deletes the uploaded files once their rows are gone.
+`flask purge-deleted` finishes anything a restart interrupted.
+"""
+import os
+import time
+from datetime import datetime
+from flask import current_app
+from sqlalchemy import event, select, delete, update
+from sqlalchemy.orm import Session, with_loader_criteria
+
+from .extensions import db
+from .models import (
+    User, Activity, ActivityTarget, Submission, StudentAccount, SupervisorProfile, SupervisorAssignment,
+    TitleSelectionWindow, UploadSession, DeadlineReminder
+)
+from .tasks import tasks
+from .search import remove_from_index
+from .similarity import remove_activity as remove_fingerprints
+from .revisions import forget_activity as forget_revisions, release_files
+
+SOFT_DELETE_MODELS = (Activity, User)
+
+def _hide_deleted(state):
+    # column/relationship loads are left alone so objects already in hand keep working
+    if (state.is_select and not state.is_column_load and not state.is_relationship_load
+            and not state.execution_options.get("include_deleted", False)):
+        state.statement = state.statement.options(*[
+            with_loader_criteria(model, lambda cls: cls.deleted_at.is_(None), include_aliases=True)
+            for model in SOFT_DELETE_MODELS
+        ])
+
+def init_soft_delete(app):
+    if not event.contains(Session, "do_orm_execute", _hide_deleted):
+        event.listen(Session, "do_orm_execute", _hide_deleted)
+
+INCLUDE_DELETED = {"include_deleted": True}
+
+# --- soft delete (request side) ---
+
+def soft_delete_activity(activity):
+    activity.deleted_at = datetime.utcnow()
+    db.session.commit()
+    tasks.submit(purge_activity, activity.id)
+
+def soft_delete_user(user):
+    """Hide the account and everything it owns; returns how many activities go with it."""
+    now = datetime.utcnow()
+    user.deleted_at = now
+    user.active = False
+    user.username = f"~{user.id}~{user.username}"[:64]  # frees the name for a new account
+    owned = db.session.execute(
+        update(Activity).where(Activity.created_by_user_id == user.id, Activity.deleted_at.is_(None))
+        .values(deleted_at=now)
+    ).rowcount
+    db.session.commit()
+    tasks.submit(purge_user, user.id)
+    return owned
+
+# --- purge (background) ---
+
+def _remove_files(paths):
+    """Delete files that live under UPLOAD_FOLDER; anything else is left alone."""
+    root = os.path.realpath(current_app.config["UPLOAD_FOLDER"])
+    removed = 0
+    for p in paths:
+        if not p:
+            continue
+        real = os.path.realpath(p)
+        if not real.startswith(root + os.sep):
+            continue
+        try:
+            os.remove(real)
+            removed += 1
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            current_app.logger.warning("Could not remove %s: %s", real, e)
+    return removed
+
+def _delete_in_batches(model, *criteria, file_columns=(), remove_files=None):
+    """DELETE matching rows batch by batch (one commit each); files are removed after each commit."""
+    remove_files = remove_files or _remove_files
+    batch = int(current_app.config.get("CLEANUP_BATCH_SIZE", 500))
+    pause = float(current_app.config.get("CLEANUP_PAUSE_SECONDS", 0.05))
+    pk = model.__mapper__.primary_key[0]
+    rows_deleted = files_removed = 0
+    while True:
+        rows = db.session.execute(select(pk, *file_columns).where(*criteria).limit(batch)).all()
+        if not rows:
+            return rows_deleted, files_removed
+        db.session.execute(delete(model).where(pk.in_([r[0] for r in rows])).execution_options(synchronize_session=False))
+        db.session.commit()
+        rows_deleted += len(rows)
+        files_removed += remove_files(path for r in rows for path in r[1:])
+        if len(rows) == batch and pause:
+            time.sleep(pause)  # let queued writers in between batches
+
+def _discard_uploads(*criteria):
+    sessions = db.session.execute(select(UploadSession.id).where(*criteria)).scalars().all()
+    if sessions:
+        incoming = os.path.join(current_app.config["UPLOAD_FOLDER"], "incoming")
+        _remove_files(os.path.join(incoming, f"{sid}.part") for sid in sessions)
+        _delete_in_batches(UploadSession, UploadSession.id.in_(sessions))
+
+def purge_activity(activity_id):
+    act = db.session.get(Activity, activity_id, execution_options=INCLUDE_DELETED)
+    if not act or act.deleted_at is None:
+        return None
+    earlier = forget_revisions(activity_id)
+    # blobs may be shared with other submissions: release_files only removes unreferenced ones
+    subs, files = _delete_in_batches(Submission, Submission.activity_id == activity_id,
+                                     file_columns=(Submission.file_path,), remove_files=release_files)
+    files += release_files(earlier)
+    _delete_in_batches(ActivityTarget, ActivityTarget.activity_id == activity_id)
+    _delete_in_batches(DeadlineReminder, DeadlineReminder.activity_id == activity_id)
+    _discard_uploads(UploadSession.activity_id == activity_id)
+    remove_fingerprints(activity_id)
+    db.session.execute(delete(Activity).where(Activity.id == activity_id).execution_options(synchronize_session=False))
+    db.session.commit()
+    current_app.logger.info("Purged activity %s: %s submissions, %s files", activity_id, subs, files)
+    return subs, files
+
+def purge_user(user_id):
+    user = db.session.get(User, user_id, execution_options=INCLUDE_DELETED)
+    if not user or user.deleted_at is None:
+        return False
+
+    for act_id in db.session.execute(
+        select(Activity.id).where(Activity.created_by_user_id == user_id).execution_options(include_deleted=True)
+    ).scalars().all():
+        purge_activity(act_id)
+
+    _discard_uploads(UploadSession.user_id == user_id)
+    _delete_in_batches(StudentAccount, StudentAccount.user_id == user_id, file_columns=(
+        StudentAccount.photo_path, StudentAccount.thumb_sm_path, StudentAccount.thumb_md_path, StudentAccount.thumb_lg_path))
+    _delete_in_batches(SupervisorAssignment, SupervisorAssignment.supervisor_user_id == user_id)
+    _delete_in_batches(SupervisorProfile, SupervisorProfile.user_id == user_id)
+    remove_from_index("supervisor", user_id)
+
+    # references that survive the account (ON DELETE SET NULL in schema.sql)
+    batch = int(current_app.config.get("CLEANUP_BATCH_SIZE", 500))
+    while True:
+        ids = db.session.execute(select(Submission.id).where(Submission.marked_by_user_id == user_id).limit(batch)).scalars().all()
+        if not ids:
+            break
+        db.session.execute(update(Submission).where(Submission.id.in_(ids)).values(marked_by_user_id=None)
+                           .execution_options(synchronize_session=False))
+        db.session.commit()
+    db.session.execute(update(TitleSelectionWindow).where(TitleSelectionWindow.created_by == user_id)
+                       .values(created_by=None).execution_options(synchronize_session=False))
+
+    db.session.execute(delete(User).where(User.id == user_id).execution_options(synchronize_session=False))
+    db.session.commit()
+    current_app.logger.info("Purged user %s", user_id)
+    return True
+
+def purge_pending():
+    """Purge every soft-deleted row (after a restart lost queued tasks). Returns (activities, users)."""
+    act_ids = db.session.execute(select(Activity.id).where(Activity.deleted_at.isnot(None))
+                                 .execution_options(include_deleted=True)).scalars().all()
+    for act_id in act_ids:
+        purge_activity(act_id)
+    user_ids = db.session.execute(select(User.id).where(User.deleted_at.isnot(None))
+                                  .execution_options(include_deleted=True)).scalars().all()
+    for user_id in user_ids:
+        purge_user(user_id)
+    return len(act_ids), len(user_ids)
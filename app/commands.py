@@ -1,9 +1,24 @@
 import click
+import json
 from werkzeug.security import generate_password_hash
 from datetime import datetime
 
 from .extensions import db
 from .models import User, SupervisorProfile, StudentMaster
+from .datagen import generate_cohort
+from . import bench
+from .assets import build_assets
+from .images import pending_photo_accounts, process_profile_photo
+from .uploads import gc_upload_sessions
+from .cleanup import purge_pending
+from .reconcile import reconcile_uploads, format_report
+from .serve import serve
+from .search import rebuild_index
+from .notify import send_deadline_reminders, parse_windows
+from .counters import recount
+from .similarity import index_pending, clear_index
+from .revisions import prune_revisions
+from .archive import archive_year, closed_years, pending_counts, parse_year, year_label
 
 def register_commands(app):
     @app.cli.command("init-db")
@@ -52,3 +67,211 @@ def register_commands(app):
                     ))
             db.session.commit()
             click.echo("✅ Seed completed: admin/admin123, supervisor SUP1001/sup123, students CS001-CS003")
+
+    @app.cli.command("assets-build")
+    def assets_build():
+        """Fingerprint static files into static/dist with .gz/.br variants and a manifest."""
+        build_assets(app.static_folder, log=click.echo)
+        click.echo("✅ Assets built. Restart the app to pick up the new manifest.")
+
+    @app.cli.command("thumbnails")
+    def thumbnails():
+        """Build profile photo thumbnails that are still pending (e.g. after a restart)."""
+        ids = [a.user_id for a in pending_photo_accounts().all()]
+        done = sum(1 for uid in ids if process_profile_photo(uid))
+        click.echo(f"✅ Thumbnails built for {done}/{len(ids)} accounts.")
+
+    @app.cli.command("uploads-gc")
+    @click.option("--ttl-hours", type=int, default=None, help="Idle time before a resumable upload is dropped (default UPLOAD_SESSION_TTL_HOURS).")
+    def uploads_gc(ttl_hours):
+        """Delete abandoned resumable uploads and their partial files."""
+        sessions, files = gc_upload_sessions(ttl_hours)
+        click.echo(f"✅ Removed {sessions} abandoned upload sessions, {files} stray partial files.")
+
+    @app.cli.command("revisions-prune")
+    @click.option("--keep", type=int, default=None, help="Revisions kept per submission (default REVISION_KEEP_LAST).")
+    def revisions_prune(keep):
+        """Apply the revision retention policy: last N per submission plus the marked version."""
+        pruned, files = prune_revisions(keep=keep)
+        click.echo(f"✅ Pruned {pruned} revisions, removed {files} files no longer used.")
+
+    @app.cli.command("purge-deleted")
+    def purge_deleted():
+        """Finish purging soft-deleted activities and accounts (e.g. after a restart)."""
+        acts, users = purge_pending()
+        click.echo(f"✅ Purged {acts} activities and {users} accounts.")
+
+    @app.cli.command("uploads-reconcile")
+    @click.option("--delete", is_flag=True, help="Delete orphaned files older than the grace period.")
+    @click.option("--grace-hours", default=24.0, show_default=True, help="Never delete files younger than this.")
+    @click.option("--max-refs", default=200000, show_default=True, help="Referenced paths held in memory per pass.")
+    @click.option("--sample", default=20, show_default=True, help="Orphans / dangling references to list.")
+    @click.option("--json", "json_path", help="Also write the report as JSON.")
+    def uploads_reconcile(delete, grace_hours, max_refs, sample, json_path):
+        """Report orphaned files and dangling references in the upload folder."""
+        report = reconcile_uploads(app.config["UPLOAD_FOLDER"], grace_hours=grace_hours, delete=delete,
+                                   max_refs=max_refs, sample=sample, log=click.echo)
+        click.echo(format_report(report))
+        if json_path:
+            with open(json_path, "w", encoding="utf-8") as f:
+                json.dump(report, f, indent=2)
+        if not delete and report["eligible"]:
+            click.echo("Run again with --delete to remove the orphans older than the grace period.")
+
+    @app.cli.command("search-reindex")
+    @click.option("--batch", default=2000, show_default=True, help="Rows per commit.")
+    def search_reindex(batch):
+        """Rebuild the admin search index (after bulk imports that bypass the ORM)."""
+        total = rebuild_index(batch=batch, log=click.echo)
+        click.echo(f"✅ Search index rebuilt: {total} tokens.")
+
+    @app.cli.command("recount")
+    def recount_cmd():
+        """Recompute group member counts and per-activity submission counters from the rows."""
+        groups, activities = recount()
+        click.echo(f"✅ Recounted {groups} groups and {activities} activities.")
+
+    @app.cli.command("archive-years")
+    @click.option("--year", help='One academic year to archive, e.g. 2024 or 2024/25 (default: every closed year).')
+    @click.option("--batch-size", type=int, help="Rows per transaction (default ARCHIVE_BATCH_SIZE).")
+    @click.option("--dry-run", is_flag=True, help="Only count the rows that would be moved.")
+    def archive_years(year, batch_size, dry_run):
+        """Move closed academic years into the archive tables (resumable: rerun after an interruption)."""
+        try:
+            years = [parse_year(year)] if year else closed_years()
+        except ValueError:
+            raise click.ClickException(f"Invalid academic year: {year}")
+        if not years:
+            click.echo("✅ Nothing to archive.")
+            return
+        for y in years:
+            if dry_run:
+                counts = pending_counts(y)
+                click.echo(f"{year_label(y)}: " + ", ".join(f"{n} {name}" for name, n in counts.items()))
+                continue
+            try:
+                moved = archive_year(y, batch_size=batch_size, log=click.echo)
+            except ValueError as e:
+                raise click.ClickException(str(e))
+            click.echo(f"✅ Archived {year_label(y)}: " + ", ".join(f"{n} {name}" for name, n in moved.items()))
+
+    @app.cli.command("send-reminders")
+    @click.option("--windows", help="Comma-separated hours before the deadline (default REMINDER_WINDOWS_HOURS).")
+    @click.option("--dry-run", is_flag=True, help="List the digests without sending or recording them.")
+    def send_reminders(windows, dry_run):
+        """Email digests about unsubmitted activities closing soon (safe to rerun; schedule it hourly)."""
+        try:
+            report = send_deadline_reminders(windows=parse_windows(windows) if windows else None,
+                                             dry_run=dry_run, log=click.echo)
+        except RuntimeError as e:
+            raise click.ClickException(str(e))
+        if dry_run:
+            click.echo(f"✅ {report['digests']} digests ({report['items']} reminders) would be sent.")
+            return
+        click.echo(f"✅ Sent {report['sent']} digests ({report['items']} reminders); "
+                   f"{report['skipped']} already sent by another run, {report['failed']} failed (retried next run).")
+
+    @app.cli.command("serve")
+    @click.option("--host", default="0.0.0.0", show_default=True)
+    @click.option("--port", default=8000, show_default=True)
+    @click.option("--workers", default=2, show_default=True, help="Processes (gunicorn only).")
+    @click.option("--threads", default=8, show_default=True, help="Threads per worker.")
+    @click.option("--timeout", default=60, show_default=True, help="Seconds before a stuck worker is restarted.")
+    @click.option("--graceful-timeout", default=30, show_default=True, help="Seconds to finish in-flight requests on shutdown.")
+    @click.option("--server", type=click.Choice(["auto", "gunicorn", "waitress"]), default="auto", show_default=True)
+    def serve_cmd(host, port, workers, threads, timeout, graceful_timeout, server):
+        """Run the production WSGI server with warmed-up workers."""
+        try:
+            serve(app, host=host, port=port, workers=workers, threads=threads, timeout=timeout,
+                  graceful_timeout=graceful_timeout, server=server, log=click.echo)
+        except RuntimeError as e:
+            raise click.ClickException(str(e))
+
+    @app.cli.command("gen-data")
+    @click.option("--students", default=1000, show_default=True, help="Students in the official dataset.")
+    @click.option("--supervisors", default=20, show_default=True)
+    @click.option("--activities", default=10, show_default=True, help="Activity rounds (odd rounds: one per supervisor).")
+    @click.option("--archive-titles", default=500, show_default=True)
+    @click.option("--registered-ratio", default=0.9, show_default=True, help="Share of students with an account.")
+    @click.option("--group-size", default=3, show_default=True)
+    @click.option("--submit-ratio", default=0.8, show_default=True, help="Share of visible activities submitted.")
+    @click.option("--with-files", is_flag=True, help="Write a small PDF for every submission.")
+    @click.option("--prefix", default="SYN", show_default=True, help="Namespace for generated IDs.")
+    @click.option("--seed", "rng_seed", default=42, show_default=True)
+    def gen_data(students, supervisors, activities, archive_titles, registered_ratio, group_size,
+                 submit_ratio, with_files, prefix, rng_seed):
+        """Generate a synthetic cohort for load testing (student passwords: pass123)."""
+        with app.app_context():
+            db.create_all()
+            click.echo(f"Generating cohort {prefix!r} ...")
+            try:
+                generate_cohort(
+                    students=students, supervisors=supervisors, activities=activities,
+                    archive_titles=archive_titles, registered_ratio=registered_ratio,
+                    group_size=group_size, submit_ratio=submit_ratio, with_files=with_files,
+                    upload_folder=app.config["UPLOAD_FOLDER"], prefix=prefix, seed=rng_seed, log=click.echo,
+                )
+            except RuntimeError as e:
+                raise click.ClickException(str(e))
+            click.echo("Indexing for admin search ...")
+            rebuild_index(log=click.echo)
+            recount()
+            click.echo("✅ Synthetic data generated.")
+
+    @app.cli.command("similarity-index")
+    @click.option("--workers", type=int, help="Processes for text extraction and hashing (default SIMILARITY_WORKERS).")
+    @click.option("--batch-size", default=200, show_default=True, help="Submissions per batch.")
+    @click.option("--rebuild", is_flag=True, help="Drop every fingerprint first and index all submissions again.")
+    def similarity_index(workers, batch_size, rebuild):
+        """Fingerprint submitted PDFs for the similarity report (only new or replaced files unless --rebuild)."""
+        if rebuild:
+            clear_index()
+        try:
+            indexed, failed = index_pending(workers=workers, batch_size=batch_size, log=click.echo)
+        except RuntimeError as e:
+            raise click.ClickException(str(e))
+        click.echo(f"✅ Indexed {indexed} submissions; {failed} had no readable PDF text.")
+
+    @app.cli.command("bench-projections")
+    @click.option("--iterations", default=10, show_default=True, help="Measured calls per query.")
+    def bench_projections(iterations):
+        """Compare CPU and memory of list-page queries as ORM entities vs. read-model projections."""
+        results = bench.compare_projections(app, iterations=iterations, log=click.echo)
+        click.echo(bench.format_projection_results(results))
+
+    @app.cli.command("bench-surge")
+    @click.option("--groups", default=200, show_default=True, help="Groups submitting at once.")
+    @click.option("--per-group", default=2, show_default=True, help="Members of each group racing to submit.")
+    @click.option("--threads", default=16, show_default=True)
+    @click.option("--rounds", default=2, show_default=True, help="Later rounds are resubmissions.")
+    def bench_surge(groups, per_group, threads, rounds):
+        """Deadline surge on the submit path: accepted submissions/sec and row/counter integrity."""
+        try:
+            result = bench.surge_submissions(app, groups=groups, per_group=per_group, threads=threads,
+                                             rounds=rounds, log=click.echo)
+        except RuntimeError as e:
+            raise click.ClickException(str(e))
+        click.echo(bench.format_surge_results(result))
+        if result["duplicate_rows"] or not result["counter_ok"]:
+            raise click.ClickException("Submission rows or counters are inconsistent.")
+
+    @app.cli.command("bench")
+    @click.option("--iterations", default=20, show_default=True, help="Timed requests per route.")
+    @click.option("--warmup", default=2, show_default=True)
+    @click.option("--only", multiple=True, help="Endpoint prefix to include, e.g. admin. or student.dashboard")
+    @click.option("--save", "save_path", help="Write results as JSON (use as a baseline later).")
+    @click.option("--compare", "baseline_path", help="Baseline JSON to compare against.")
+    @click.option("--threshold", default=20.0, show_default=True, help="p95 regression %% that fails --compare.")
+    def bench_cmd(iterations, warmup, only, save_path, baseline_path, threshold):
+        """Benchmark every GET route: p50/p95/p99 latency, queries per request, throughput."""
+        results = bench.run_benchmark(app, iterations=iterations, warmup=warmup, only=only, log=click.echo)
+        baseline = bench.load_results(baseline_path) if baseline_path else None
+        click.echo(bench.format_results(results, baseline))
+        if save_path:
+            bench.save_results(save_path, results)
+            click.echo(f"Saved results to {save_path}")
+        if baseline:
+            worse = bench.regressions(results, baseline, threshold)
+            if worse:
+                raise click.ClickException(f"Regressions vs baseline: {', '.join(worse)}")
+            click.echo("✅ No regressions vs baseline.")
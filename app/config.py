@@ -37,13 +37,19 @@ import os
 class Config:
     SECRET_KEY = os.getenv("SECRET_KEY")
 
-    SQLALCHEMY_DATABASE_URI = (
+    SQLALCHEMY_DATABASE_URI = os.getenv("DATABASE_URL") or (
         f"mysql+pymysql://{os.getenv('DB_USER')}:{os.getenv('DB_PASSWORD')}"
         f"@{os.getenv('DB_HOST')}:{os.getenv('DB_PORT')}/{os.getenv('DB_NAME')}"
     )
 
     SQLALCHEMY_TRACK_MODIFICATIONS = False
 
+    # Read replica (optional): GET requests read from it, writes go to the primary
+    SQLALCHEMY_BINDS = {"replica": os.getenv("REPLICA_DATABASE_URL")} if os.getenv("REPLICA_DATABASE_URL") else {}
+    REPLICA_STICKY_SECONDS = int(os.getenv("REPLICA_STICKY_SECONDS", 5))
+    REPLICA_MAX_LAG_SECONDS = int(os.getenv("REPLICA_MAX_LAG_SECONDS", 5))
+    REPLICA_CHECK_SECONDS = int(os.getenv("REPLICA_CHECK_SECONDS", 10))
+
     ALLOWED_IMAGE_EXTENSIONS = {"png", "jpg", "jpeg", "webp"}
     MAX_IMAGE_SIZE_MB = 5
 
@@ -69,3 +75,58 @@ class Config:
     OTP_EXP_MINUTES = int(os.getenv("OTP_EXP_MINUTES", 10))
     OTP_MAX_ATTEMPTS = int(os.getenv("OTP_MAX_ATTEMPTS", 5))
     OTP_RESEND_COOLDOWN_SECONDS = int(os.getenv("OTP_RESEND_COOLDOWN_SECONDS", 60))
+
+    # Audit log (buffered writer)
+    AUDIT_FLUSH_SIZE = int(os.getenv("AUDIT_FLUSH_SIZE", 50))
+    AUDIT_FLUSH_SECONDS = float(os.getenv("AUDIT_FLUSH_SECONDS", 2))
+    AUDIT_SPOOL_PATH = os.getenv("AUDIT_SPOOL_PATH")  # default: <instance>/audit_spool.jsonl; one <name>.<pid>-<ns>.jsonl per failed batch
+
+    # Background tasks (thumbnails etc.)
+    TASK_WORKERS = int(os.getenv("TASK_WORKERS", 2))
+    TASKS_EAGER = os.getenv("TASKS_EAGER", "false").lower() == "true"  # run inline (CLI / debugging)
+
+    # Submission uploads (streamed and validated chunk by chunk)
+    SUBMISSION_MAX_MB = int(os.getenv("SUBMISSION_MAX_MB", 25))  # default when an activity sets no limit
+    UPLOAD_CHUNK_SIZE = int(os.getenv("UPLOAD_CHUNK_SIZE", 64 * 1024))
+    RESUMABLE_CHUNK_SIZE = int(os.getenv("RESUMABLE_CHUNK_SIZE", 2 * 1024 * 1024))
+    UPLOAD_SESSION_TTL_HOURS = int(os.getenv("UPLOAD_SESSION_TTL_HOURS", 24))  # idle sessions are GC'd after this
+
+    # Background purge of soft-deleted activities/accounts
+    CLEANUP_BATCH_SIZE = int(os.getenv("CLEANUP_BATCH_SIZE", 500))
+    CLEANUP_PAUSE_SECONDS = float(os.getenv("CLEANUP_PAUSE_SECONDS", 0.05))
+
+    # In-memory cache of settings rows (title window), invalidated through stamp files
+    CONFIG_CACHE_DIR = os.getenv("CONFIG_CACHE_DIR")  # default: <instance>/config_cache; must be shared by all workers
+    CONFIG_CACHE_CHECK_SECONDS = float(os.getenv("CONFIG_CACHE_CHECK_SECONDS", 1))
+    CONFIG_CACHE_TTL_SECONDS = float(os.getenv("CONFIG_CACHE_TTL_SECONDS", 300))
+
+    # Prometheus /metrics (multi-worker aggregation: set PROMETHEUS_MULTIPROC_DIR in .env)
+    METRICS_TOKEN = os.getenv("METRICS_TOKEN")  # if set, scrapes need "Authorization: Bearer <token>"
+
+    # Slow-query log with EXPLAIN capture (admin > Slow Queries)
+    SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", 500))  # 0 disables the hook
+    SLOW_QUERY_LOG_PATH = os.getenv("SLOW_QUERY_LOG_PATH")  # default: <instance>/slow_queries.jsonl
+    SLOW_QUERY_LOG_MAX_MB = float(os.getenv("SLOW_QUERY_LOG_MAX_MB", 5))  # rotated once; at most 2x on disk
+    SLOW_QUERY_EXPLAIN_SECONDS = float(os.getenv("SLOW_QUERY_EXPLAIN_SECONDS", 600))  # per statement fingerprint
+
+    # Deadline reminders (flask send-reminders; uses the SMTP settings above)
+    REMINDER_WINDOWS_HOURS = os.getenv("REMINDER_WINDOWS_HOURS", "72,24")  # one mail per window per activity
+    REMINDER_SMTP_CONNECTIONS = int(os.getenv("REMINDER_SMTP_CONNECTIONS", 2))
+    REMINDER_MESSAGES_PER_CONNECTION = int(os.getenv("REMINDER_MESSAGES_PER_CONNECTION", 50))
+    REMINDER_RATE_PER_SECOND = float(os.getenv("REMINDER_RATE_PER_SECOND", 5))  # across all connections
+    REMINDER_SMTP_TIMEOUT = float(os.getenv("REMINDER_SMTP_TIMEOUT", 30))
+
+    # Team size (enforced with a conditional update on groups.member_count)
+    GROUP_MAX_MEMBERS = int(os.getenv("GROUP_MAX_MEMBERS", 3))
+
+    # Academic-year archive (flask archive-years)
+    ACADEMIC_YEAR_START_MONTH = int(os.getenv("ACADEMIC_YEAR_START_MONTH", 9))  # 9 = years run September..August
+    ARCHIVE_BATCH_SIZE = int(os.getenv("ARCHIVE_BATCH_SIZE", 1000))  # rows moved per transaction
+
+    # Submission similarity index (flask similarity-index; needs pypdf)
+    SIMILARITY_THRESHOLD = float(os.getenv("SIMILARITY_THRESHOLD", 0.5))  # estimated share of shared 5-word phrases
+    SIMILARITY_WORKERS = int(os.getenv("SIMILARITY_WORKERS", 0))  # processes for the backfill; 0 = one per CPU
+    SIMILARITY_MAX_PAGES = int(os.getenv("SIMILARITY_MAX_PAGES", 300))  # pages read per PDF
+
+    # Submission revisions (app/revisions.py)
+    REVISION_KEEP_LAST = int(os.getenv("REVISION_KEEP_LAST", 3))  # per submission, plus the marked version
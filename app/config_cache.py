@@ -0,0 +1,95 @@
+"""
+Process-wide cache for rarely changing settings rows (e.g. the title selection window).
+
+Values live in memory per worker. Each key has a stamp file under
+CONFIG_CACHE_DIR (default <instance>/config_cache) that writers replace after
+committing; readers stat it at most every CONFIG_CACHE_CHECK_SECONDS and reload
+from the database when it changed, so every worker on the host sees an update
+within that interval. CONFIG_CACHE_TTL_SECONDS bounds staleness if a stamp is
+missed (e.g. workers on another host).
+"""
+import os
+import threading
+import time
+from dataclasses import dataclass
+
+from sqlalchemy import select
+
+from .extensions import db
+from .models import TitleSelectionWindow
+
+@dataclass(frozen=True)
+class TitleWindowState:
+    """Detached snapshot of the latest TitleSelectionWindow (safe to share between requests)."""
+    id: int
+    is_open: bool
+    scope_all_groups: bool
+
+def _load_title_window():
+    # always the primary: a lagging replica could return the old window, cached under the new stamp
+    win = db.session.execute(
+        select(TitleSelectionWindow).order_by(TitleSelectionWindow.id.desc()).limit(1),
+        bind_arguments={"bind": db.engine},
+    ).scalar()
+    return TitleWindowState(win.id, bool(win.is_open), bool(win.scope_all_groups)) if win else None
+
+LOADERS = {
+    "title_window": _load_title_window,
+}
+
+class ConfigCache:
+    def __init__(self, app=None):
+        self._entries = {}  # key -> (value, stamp, loaded_at, checked_at)
+        self._lock = threading.Lock()
+        self.directory = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.directory = app.config.get("CONFIG_CACHE_DIR") or os.path.join(app.instance_path, "config_cache")
+        os.makedirs(self.directory, exist_ok=True)
+        self.check_seconds = float(app.config.get("CONFIG_CACHE_CHECK_SECONDS", 1))
+        self.ttl_seconds = float(app.config.get("CONFIG_CACHE_TTL_SECONDS", 300))
+        app.extensions["config_cache"] = self
+
+    def _stamp_path(self, key):
+        return os.path.join(self.directory, f"{key}.version")
+
+    def _stamp(self, key):
+        try:
+            st = os.stat(self._stamp_path(key))
+        except FileNotFoundError:
+            return None
+        return st.st_ino, st.st_mtime_ns, st.st_size
+
+    def get(self, key):
+        now = time.monotonic()
+        entry = self._entries.get(key)
+        if entry is not None:
+            value, stamp, loaded_at, checked_at = entry
+            if now - checked_at < self.check_seconds:
+                return value
+            if now - loaded_at < self.ttl_seconds and self._stamp(key) == stamp:
+                self._entries[key] = (value, stamp, loaded_at, now)
+                return value
+        # stamp first: a write landing during the load is picked up on the next check
+        stamp = self._stamp(key)
+        value = LOADERS[key]()
+        with self._lock:
+            self._entries[key] = (value, stamp, now, now)
+        return value
+
+    def invalidate(self, key):
+        """Call after committing a change: bumps the stamp so all workers reload."""
+        path = self._stamp_path(key)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(str(time.time_ns()))
+        os.replace(tmp, path)  # new inode, so readers see a different stamp
+        with self._lock:
+            self._entries.pop(key, None)
+
+config_cache = ConfigCache()
+
+def current_title_window():
+    return config_cache.get("title_window")
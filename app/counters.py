@@ -0,0 +1,89 @@
+"""
+Denormalized counters: Group.member_count and Activity.pending/marked/rejected_count.
+
+Submission counters follow every ORM write: an after_flush hook turns the status
+changes of the flush into one `UPDATE activities SET x = x + delta` per activity,
+in the same transaction as the submission rows. Member counts change only through
+add_member(), which reserves the seat with a conditional UPDATE (`... WHERE
+member_count < limit`), so concurrent joins cannot overfill a group.
+Bulk Core writes bypass both; `flask recount` rebuilds the columns from the rows.
+"""
+from collections import defaultdict
+from itertools import chain
+from flask import current_app
+from sqlalchemy import event, inspect, update, select, func
+from sqlalchemy.orm import Session
+
+from .extensions import db
+from .models import Activity, Group, GroupMember, Submission
+
+STATUS_COLUMNS = {"Pending": "pending_count", "Marked": "marked_count", "Rejected": "rejected_count"}
+
+def _submission_deltas(session):
+    deltas = defaultdict(lambda: defaultdict(int))  # activity_id -> column -> delta
+    for obj in chain(session.new, session.dirty, session.deleted):
+        if not isinstance(obj, Submission):
+            continue
+        if obj in session.new:
+            deltas[obj.activity_id][STATUS_COLUMNS.get(obj.status or "Pending")] += 1
+        elif obj in session.deleted:
+            old = inspect(obj).attrs.status.history
+            status = old.deleted[0] if old.deleted else obj.status
+            deltas[obj.activity_id][STATUS_COLUMNS.get(status)] -= 1
+        else:
+            hist = inspect(obj).attrs.status.history
+            if hist.deleted and hist.added and hist.deleted[0] != hist.added[0]:
+                deltas[obj.activity_id][STATUS_COLUMNS.get(hist.deleted[0])] -= 1
+                deltas[obj.activity_id][STATUS_COLUMNS.get(hist.added[0])] += 1
+    return deltas
+
+def _after_flush(session, flush_context):
+    deltas = _submission_deltas(session)
+    if not deltas:
+        return
+    conn = session.connection()
+    for activity_id, cols in deltas.items():
+        values = {col: getattr(Activity, col) + d for col, d in cols.items() if col and d}
+        if values:
+            conn.execute(update(Activity).where(Activity.id == activity_id).values(**values))
+
+def init_counters(app):
+    if not event.contains(Session, "after_flush", _after_flush):
+        event.listen(Session, "after_flush", _after_flush)
+
+def group_member_limit():
+    return int(current_app.config.get("GROUP_MAX_MEMBERS", 3))
+
+def reserve_seats(group_code, n=1, limit=None):
+    """Atomically take n seats in a group; False (nothing changed) when that would pass the limit."""
+    limit = limit or group_member_limit()
+    taken = db.session.execute(
+        update(Group)
+        .where(Group.group_code == group_code, Group.member_count + n <= limit)
+        .values(member_count=Group.member_count + n)
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    return taken == 1
+
+def add_member(group_code, student_id, limit=None):
+    """Add a student to a group within the member limit (caller commits). Returns False when full."""
+    if not reserve_seats(group_code, 1, limit):
+        return False
+    db.session.add(GroupMember(group_code=group_code, student_id=student_id))
+    return True
+
+def recount():
+    """Recompute every counter from the rows (after bulk loads or an upgrade). Returns rows updated."""
+    members = (select(func.count(GroupMember.id)).where(GroupMember.group_code == Group.group_code)
+               .correlate(Group).scalar_subquery())
+    groups = db.session.execute(update(Group).values(member_count=members)
+                                .execution_options(synchronize_session=False)).rowcount
+    values = {}
+    for status, col in STATUS_COLUMNS.items():
+        values[col] = (select(func.count(Submission.id))
+                       .where(Submission.activity_id == Activity.id, Submission.status == status)
+                       .correlate(Activity).scalar_subquery())
+    activities = db.session.execute(update(Activity).values(**values)
+                                    .execution_options(synchronize_session=False, include_deleted=True)).rowcount
+    db.session.commit()
+    return groups, activities
@@ -0,0 +1,224 @@
+"""Synthetic cohort generator used by `flask gen-data` (load testing / benchmarks)."""
+import os
+import random
+from datetime import datetime, timedelta
+from sqlalchemy import func, insert
+from werkzeug.security import generate_password_hash
+
+from .extensions import db
+from .models import (
+    User, SupervisorProfile, StudentMaster, StudentAccount, Group, GroupMember,
+    SupervisorAssignment, Activity, ActivityTarget, Submission, TitleProposal,
+    TitleArchive, TeamRequest
+)
+from .utils import initials_from_name, avatar_color
+
+FIRST_NAMES = ["Abdi", "Ahmed", "Amina", "Asha", "Bashir", "Deeqa", "Farah", "Fatima", "Hamza", "Hodan",
+               "Ibrahim", "Ilhan", "Khadija", "Layla", "Mohamed", "Mustafa", "Nasra", "Omar", "Sahra", "Yusuf"]
+LAST_NAMES = ["Ali", "Aden", "Dahir", "Farah", "Hassan", "Hussein", "Ismail", "Jama", "Mahamud", "Nur",
+              "Osman", "Said", "Warsame", "Yusuf"]
+FACULTIES = {"Computing": ["CS", "IT", "SE"], "Engineering": ["EE", "CE"], "Business": ["BBA", "ACC"]}
+PROJECT_TYPES = ["Web System", "Mobile App", "Research", "Data Analysis", "IoT"]
+TOPIC_WORDS = ["Smart", "Online", "Automated", "Secure", "Mobile", "Hospital", "Library", "Inventory", "Payroll",
+               "Attendance", "Clinic", "Banking", "Farming", "Transport", "Voting", "Tracking", "Management", "System"]
+ACTIVITY_TITLES = ["Proposal", "Chapter 1", "Chapter 2", "Chapter 3", "Progress Report", "Prototype Demo",
+                   "Chapter 4", "Chapter 5", "Final Report", "Presentation Slides"]
+
+# minimal valid one-page PDF, written for generated submissions
+TINY_PDF = (
+    b"%PDF-1.4\n1 0 obj<</Type/Catalog/Pages 2 0 R>>endobj\n"
+    b"2 0 obj<</Type/Pages/Kids[3 0 R]/Count 1>>endobj\n"
+    b"3 0 obj<</Type/Page/Parent 2 0 R/MediaBox[0 0 612 792]>>endobj\n"
+    b"trailer<</Root 1 0 R>>\n%%EOF\n"
+)
+
+def _bulk(model, rows, chunk=5000):
+    for i in range(0, len(rows), chunk):
+        db.session.execute(insert(model), rows[i:i + chunk])
+
+def _title(rng):
+    return " ".join(rng.sample(TOPIC_WORDS, 4))
+
+def generate_cohort(students=1000, supervisors=20, activities=10, archive_titles=500, registered_ratio=0.9,
+                    group_size=3, submit_ratio=0.8, with_files=False, upload_folder=None, prefix="SYN",
+                    year=None, seed=42, log=print):
+    """
+    Insert a realistic dataset in bulk: students, accounts, groups, supervisor assignments,
+    activities with targets, submissions (optionally with PDF files), title proposals and
+    archive titles. Identifiers are namespaced by `prefix` so several cohorts can coexist.
+    Returns a dict of row counts.
+    """
+    rng = random.Random(seed)
+    now = datetime.utcnow()
+    year = year or now.year
+    password_hash = generate_password_hash("pass123")  # hashing is slow; share one hash
+    counts = {}
+
+    if StudentMaster.query.filter(StudentMaster.student_id.like(f"{prefix}%")).first():
+        raise RuntimeError(f"Dataset with prefix {prefix!r} already exists; choose another --prefix.")
+
+    next_user_id = (db.session.query(func.max(User.id)).scalar() or 0) + 1
+
+    # admin that owns admin activities
+    admin = User.query.filter_by(role="admin").first()
+    if not admin:
+        admin = User(role="admin", username="admin", password_hash=generate_password_hash("admin123"), active=True)
+        db.session.add(admin)
+        db.session.flush()
+        next_user_id = max(next_user_id, admin.id + 1)
+
+    # supervisors
+    sup_users, sup_profiles = [], []
+    for n in range(supervisors):
+        uid = next_user_id
+        next_user_id += 1
+        sup_users.append({"id": uid, "role": "supervisor", "username": f"{prefix}SUP{n:04d}",
+                          "password_hash": password_hash, "active": True, "created_at": now})
+        sup_profiles.append({"user_id": uid, "name": f"Dr. {rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}",
+                             "email": f"{prefix.lower()}sup{n}@example.com", "phone": f"061{rng.randrange(10**7):07d}"})
+    _bulk(User, sup_users)
+    _bulk(SupervisorProfile, sup_profiles)
+    sup_ids = [u["id"] for u in sup_users]
+    counts["supervisors"] = len(sup_ids)
+
+    # students + accounts
+    masters, users, accounts = [], [], []
+    registered = []
+    for n in range(students):
+        sid = f"{prefix}{n:07d}"
+        name = f"{rng.choice(FIRST_NAMES)} {rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}"
+        faculty = rng.choice(list(FACULTIES))
+        masters.append({"student_id": sid, "name": name, "gender": rng.choice(["M", "F"]),
+                        "phone": f"061{rng.randrange(10**7):07d}", "email": f"{sid.lower()}@students.example.com",
+                        "faculty": faculty, "program": rng.choice(FACULTIES[faculty]), "batch": str(year),
+                        "imported_at": now})
+        if rng.random() < registered_ratio:
+            uid = next_user_id
+            next_user_id += 1
+            users.append({"id": uid, "role": "student", "username": sid, "password_hash": password_hash,
+                          "active": True, "created_at": now})
+            accounts.append({"user_id": uid, "student_id": sid, "photo_path": None,
+                             "avatar_initials": initials_from_name(name), "avatar_color": avatar_color(sid),
+                             "group_code": None})
+            registered.append(sid)
+    _bulk(StudentMaster, masters)
+    _bulk(User, users)
+    counts["students"] = len(masters)
+    counts["accounts"] = len(accounts)
+
+    # groups from registered students (a few stay ungrouped)
+    rng.shuffle(registered)
+    grouped = registered[: int(len(registered) * 0.95)]
+    groups, members, group_of = [], [], {}
+    for g, i in enumerate(range(0, len(grouped) - 1, group_size)):  # a trailing single student stays solo
+        code = f"{prefix}G{g:06d}"
+        groups.append({"group_code": code, "created_at": now - timedelta(days=rng.randrange(30, 120))})
+        for sid in grouped[i:i + group_size]:
+            members.append({"group_code": code, "student_id": sid, "joined_at": now})
+            group_of[sid] = code
+    for acc in accounts:
+        acc["group_code"] = group_of.get(acc["student_id"])
+    _bulk(Group, groups)
+    _bulk(StudentAccount, accounts)
+    _bulk(GroupMember, members)
+    group_codes = [g["group_code"] for g in groups]
+    counts["groups"] = len(group_codes)
+
+    # team requests: accepted for each group, plus some open ones
+    members_by_group = {}
+    for m in members:
+        members_by_group.setdefault(m["group_code"], []).append(m["student_id"])
+    requests = []
+    for code in group_codes:
+        pair = members_by_group[code][:2]
+        if len(pair) == 2:
+            requests.append({"requester_student_id": pair[0], "receiver_student_id": pair[1],
+                             "status": "Accepted", "created_at": now - timedelta(days=90)})
+    ungrouped = registered[len(grouped):]
+    for a, b in zip(ungrouped[::2], ungrouped[1::2]):
+        requests.append({"requester_student_id": a, "receiver_student_id": b, "status": "Pending", "created_at": now})
+    _bulk(TeamRequest, requests)
+    counts["team_requests"] = len(requests)
+
+    # supervisor assignments (round robin)
+    groups_by_sup = {s: [] for s in sup_ids}
+    assignments = []
+    for i, code in enumerate(group_codes):
+        if not sup_ids:
+            break
+        sup = sup_ids[i % len(sup_ids)]
+        groups_by_sup[sup].append(code)
+        assignments.append({"group_code": code, "supervisor_user_id": sup, "assigned_at": now})
+    _bulk(SupervisorAssignment, assignments)
+
+    # activities: admin ones for all groups, supervisor ones targeted at their groups
+    acts, targets = [], []
+    next_act_id = (db.session.query(func.max(Activity.id)).scalar() or 0) + 1
+    visible = {}
+    for n in range(activities):
+        deadline = now + timedelta(days=rng.randrange(-60, 60))
+        title = ACTIVITY_TITLES[n % len(ACTIVITY_TITLES)]
+        if n % 2 == 0 or not sup_ids:
+            acts.append({"id": next_act_id, "created_by_role": "admin", "created_by_user_id": admin.id,
+                         "title": f"{title} ({prefix})", "description": f"Submit the {title.lower()}.",
+                         "start_at": deadline - timedelta(days=14), "deadline_at": deadline,
+                         "require_pdf": True, "scope_all_groups": True, "created_at": now})
+            visible[next_act_id] = group_codes
+            next_act_id += 1
+            continue
+        for sup in sup_ids:
+            acts.append({"id": next_act_id, "created_by_role": "supervisor", "created_by_user_id": sup,
+                         "title": f"{title} ({prefix})", "description": f"Supervisor task: {title.lower()}.",
+                         "start_at": deadline - timedelta(days=14), "deadline_at": deadline,
+                         "require_pdf": rng.random() < 0.7, "scope_all_groups": False, "created_at": now})
+            for code in groups_by_sup[sup]:
+                targets.append({"activity_id": next_act_id, "group_code": code})
+            visible[next_act_id] = groups_by_sup[sup]
+            next_act_id += 1
+    _bulk(Activity, acts)
+    _bulk(ActivityTarget, targets)
+    counts["activities"] = len(acts)
+    counts["activity_targets"] = len(targets)
+
+    # submissions
+    subs = []
+    for act_id, codes in visible.items():
+        for code in codes:
+            if rng.random() > submit_ratio:
+                continue
+            sid = rng.choice(members_by_group[code])
+            file_path = None
+            if with_files:
+                upload_dir = os.path.join(upload_folder, "submissions", code)
+                os.makedirs(upload_dir, exist_ok=True)
+                file_path = os.path.join(upload_dir, f"activity_{act_id}_{sid}_report.pdf").replace("\\", "/")
+                with open(file_path, "wb") as f:
+                    f.write(TINY_PDF)
+            status = rng.choices(["Pending", "Marked", "Rejected"], weights=[5, 4, 1])[0]
+            subs.append({"activity_id": act_id, "group_code": code, "submitted_by_student_id": sid,
+                         "file_path": file_path, "submitted_at": now - timedelta(hours=rng.randrange(1, 2000)),
+                         "status": status, "marked_by_user_id": None, "marked_at": None, "feedback": None,
+                         "resubmission_count": rng.choice([0, 0, 0, 1, 2])})
+    _bulk(Submission, subs)
+    counts["submissions"] = len(subs)
+
+    # title proposals
+    proposals = []
+    for code in group_codes:
+        admin_status = rng.choices(["Pending", "Approved", "Rejected"], weights=[3, 6, 1])[0]
+        sup_status = rng.choices(["Pending", "Approved", "Rejected"], weights=[3, 6, 1])[0] if admin_status == "Approved" else "Pending"
+        proposals.append({"group_code": code, "title": _title(rng), "project_type": rng.choice(PROJECT_TYPES),
+                          "submitted_at": now - timedelta(days=rng.randrange(1, 60)), "status_admin": admin_status,
+                          "status_supervisor": sup_status, "last_action_at": now})
+    _bulk(TitleProposal, proposals)
+    counts["title_proposals"] = len(proposals)
+
+    archive = [{"title": _title(rng), "project_type": rng.choice(PROJECT_TYPES), "year": str(year - rng.randrange(1, 10)),
+                "department": rng.choice(list(FACULTIES)), "imported_at": now} for _ in range(archive_titles)]
+    _bulk(TitleArchive, archive)
+    counts["titles_archive"] = len(archive)
+
+    db.session.commit()
+    for k, v in counts.items():
+        log(f"  {k}: {v}")
+    return counts
@@ -0,0 +1,111 @@
+import threading
+import time
+from functools import wraps
+from flask import current_app, g, has_request_context, request, session
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event, text
+
+REPLICA_BIND = "replica"
+READ_METHODS = ("GET", "HEAD")
+
+class RoutingSession(Session):
+    """
+    Sends reads made while serving GET/HEAD requests to the "replica" bind
+    (SQLALCHEMY_BINDS["replica"]) and everything else to the primary.
+
+    Stays on the primary when:
+      - this request wrote: a flush, or an insert/update/delete statement (read-after-write),
+      - the browser session wrote recently (REPLICA_STICKY_SECONDS),
+      - the view asked for it (use_primary / @primary_db),
+      - the replica is down or lagging (checked every REPLICA_CHECK_SECONDS).
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and not self._flushing and _prefer_replica(self):
+            replica = self._db.engines.get(REPLICA_BIND)
+            if replica is not None and replica_available(replica):
+                return replica
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+@event.listens_for(RoutingSession, "after_flush")
+def _mark_write(sess, flush_context):
+    sess.info["wrote"] = True
+
+@event.listens_for(RoutingSession, "do_orm_execute")
+def _mark_statement_write(state):
+    # Core insert()/update()/delete() run through session.execute() never flush
+    if state.is_insert or state.is_update or state.is_delete:
+        state.session.info["wrote"] = True
+
+def _prefer_replica(sess) -> bool:
+    if not has_request_context() or request.method not in READ_METHODS:
+        return False
+    if sess.info.get("wrote") or g.get("db_primary"):
+        return False
+    return session.get("_db_primary_until", 0) < time.time()
+
+def use_primary():
+    """Per-request override: route every query of the current request to the primary."""
+    g.db_primary = True
+
+def primary_db(fn):
+    @wraps(fn)
+    def wrapped(*args, **kwargs):
+        use_primary()
+        return fn(*args, **kwargs)
+    return wrapped
+
+# --- replica health ---
+_health_lock = threading.Lock()
+_health = {"ok": True, "checked_at": 0.0}
+
+def _replica_lag(conn):
+    """
+    Seconds behind the source, or None when the backend is not a MySQL replica (e.g. SQLite).
+    Raises when replication is stopped or broken (MySQL reports the lag as NULL).
+    """
+    if conn.dialect.name != "mysql":
+        return None
+    for stmt, column in (("SHOW REPLICA STATUS", "Seconds_Behind_Source"), ("SHOW SLAVE STATUS", "Seconds_Behind_Master")):
+        try:
+            row = conn.execute(text(stmt)).mappings().first()
+        except Exception:
+            continue
+        if row is None:
+            return None  # not configured as a replica
+        lag = row.get(column)
+        if lag is None:
+            raise RuntimeError("replication is not running")
+        return lag
+    return None
+
+def replica_available(engine) -> bool:
+    cfg = current_app.config
+    now = time.monotonic()
+    if now - _health["checked_at"] < cfg.get("REPLICA_CHECK_SECONDS", 10):
+        return _health["ok"]
+    with _health_lock:
+        if now - _health["checked_at"] < cfg.get("REPLICA_CHECK_SECONDS", 10):
+            return _health["ok"]
+        try:
+            with engine.connect() as conn:
+                conn.execute(text("SELECT 1"))
+                lag = _replica_lag(conn)
+            ok = lag is None or lag <= cfg.get("REPLICA_MAX_LAG_SECONDS", 5)
+            if not ok:
+                current_app.logger.warning("Replica lagging %ss; reading from primary.", lag)
+        except Exception as e:
+            current_app.logger.warning("Replica unavailable (%s); reading from primary.", e)
+            ok = False
+        _health.update(ok=ok, checked_at=now)
+        return ok
+
+def init_routing(app):
+    """Remember browsers that just wrote so their next reads hit the primary."""
+    from .extensions import db
+
+    @app.after_request
+    def _stick_to_primary(response):
+        if db.session().info.get("wrote"):
+            session["_db_primary_until"] = time.time() + app.config.get("REPLICA_STICKY_SECONDS", 5)
+        return response
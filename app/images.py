@@ -0,0 +1,68 @@
+"""Profile photo processing: metadata stripping and WebP thumbnails."""
+import hashlib
+import os
+from datetime import datetime
+from flask import current_app
+from PIL import Image, ImageOps
+
+from .extensions import db
+from .models import StudentAccount
+
+THUMB_SIZES = {"sm": 48, "md": 96, "lg": 256}
+THUMB_DIR = "thumbs"
+
+def _strip_metadata(img):
+    """Copy pixels only (drops EXIF/GPS, ICC, comments) after applying the EXIF rotation."""
+    img = ImageOps.exif_transpose(img)
+    mode = "RGBA" if img.mode in ("RGBA", "LA", "P") else "RGB"
+    img = img.convert(mode)
+    clean = Image.new(mode, img.size)
+    clean.paste(img)
+    return clean
+
+def make_thumbnails(src_path: str, out_dir: str, stem: str) -> dict:
+    """Rewrite src without metadata and write one square WebP per THUMB_SIZES entry. Returns {size_key: path}."""
+    with Image.open(src_path) as raw:
+        fmt = raw.format or "PNG"
+        img = _strip_metadata(raw)
+
+    # replace the original with the stripped copy (same format)
+    save_kwargs = {"quality": 90} if fmt in ("JPEG", "WEBP") else {}
+    if fmt == "JPEG" and img.mode == "RGBA":
+        img = img.convert("RGB")
+    img.save(src_path, format=fmt, **save_kwargs)
+
+    with open(src_path, "rb") as f:
+        digest = hashlib.sha256(f.read()).hexdigest()[:10]
+    os.makedirs(out_dir, exist_ok=True)
+    paths = {}
+    for key, px in THUMB_SIZES.items():
+        thumb = ImageOps.fit(img, (px, px), method=Image.LANCZOS)
+        path = os.path.join(out_dir, f"{stem}_{px}_{digest}.webp").replace("\\", "/")
+        thumb.save(path, format="WEBP", quality=80, method=6)
+        paths[key] = path
+    return paths
+
+def process_profile_photo(user_id: int) -> bool:
+    """Background task: build thumbnails for one account and record their paths."""
+    acc = StudentAccount.query.get(user_id)
+    if not acc or not acc.photo_path:
+        return False
+    out_dir = os.path.join(current_app.config["UPLOAD_FOLDER"], "profiles", THUMB_DIR)
+    try:
+        paths = make_thumbnails(acc.photo_path, out_dir, acc.student_id)
+    except (OSError, ValueError) as e:
+        # unreadable image: keep showing initials
+        current_app.logger.warning("Thumbnail generation failed for %s: %s", acc.student_id, e)
+        acc.thumbs_ready_at = None
+        db.session.commit()
+        return False
+    acc.thumb_sm_path = paths["sm"]
+    acc.thumb_md_path = paths["md"]
+    acc.thumb_lg_path = paths["lg"]
+    acc.thumbs_ready_at = datetime.utcnow()
+    db.session.commit()
+    return True
+
+def pending_photo_accounts():
+    return StudentAccount.query.filter(StudentAccount.photo_path.isnot(None), StudentAccount.thumbs_ready_at.is_(None))
@@ -0,0 +1,161 @@
+"""
+Prometheus metrics (`GET /metrics`, text exposition format).
+
+Recorded per process with prometheus_client:
+  upms_http_request_duration_seconds{blueprint,endpoint,method}  histogram
+  upms_http_responses_total{blueprint,status}                      counter
+  upms_db_connections_in_use / upms_db_pool_size{bind}             gauges (pool events)
+  upms_upload_bytes_total / upms_upload_duration_seconds{kind}     form, chunk, finalize
+  upms_upload_rejected_total{kind}
+  upms_task_queue_depth, upms_audit_buffer_depth                   gauges
+
+With several gunicorn workers, set PROMETHEUS_MULTIPROC_DIR (in .env, so it is set
+before anything is imported): each worker then writes its values to mmap files in
+that directory and /metrics sums them, whichever worker answers the scrape.
+`flask serve` clears stale files on start and drops dead workers' gauges.
+
+The request hooks only read a cached child metric and call observe()/inc(); the
+label lookup happens once per endpoint. Without prometheus_client installed every
+metric is a no-op and /metrics returns 404.
+"""
+import os
+import time
+from flask import g, request
+
+try:
+    import prometheus_client
+    from prometheus_client import Counter, Gauge, Histogram, CollectorRegistry, CONTENT_TYPE_LATEST
+    from prometheus_client import multiprocess
+except ImportError:  # metrics are optional
+    prometheus_client = None
+
+MULTIPROC_DIR = os.environ.get("PROMETHEUS_MULTIPROC_DIR") or os.environ.get("prometheus_multiproc_dir")
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+UPLOAD_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+class _Noop:
+    def labels(self, *args, **kwargs):
+        return self
+
+    def inc(self, amount=1):
+        pass
+
+    def dec(self, amount=1):
+        pass
+
+    def set(self, value):
+        pass
+
+    def observe(self, value):
+        pass
+
+if prometheus_client is not None:
+    REQUEST_LATENCY = Histogram("upms_http_request_duration_seconds", "Request latency by endpoint",
+                                ["blueprint", "endpoint", "method"], buckets=LATENCY_BUCKETS)
+    RESPONSES = Counter("upms_http_responses", "Responses by blueprint and status code", ["blueprint", "status"])
+    DB_IN_USE = Gauge("upms_db_connections_in_use", "Pooled connections checked out", ["bind"],
+                      multiprocess_mode="livesum")
+    DB_POOL_SIZE = Gauge("upms_db_pool_size", "Configured pool size (summed over workers)", ["bind"],
+                         multiprocess_mode="livesum")
+    UPLOAD_BYTES = Counter("upms_upload_bytes", "Bytes received by upload stage", ["kind"])
+    UPLOAD_SECONDS = Histogram("upms_upload_duration_seconds", "Time spent receiving/verifying uploads",
+                               ["kind"], buckets=UPLOAD_BUCKETS)
+    UPLOAD_REJECTED = Counter("upms_upload_rejected", "Uploads rejected by validation", ["kind"])
+    TASK_DEPTH = Gauge("upms_task_queue_depth", "Background tasks queued or running", multiprocess_mode="livesum")
+    AUDIT_DEPTH = Gauge("upms_audit_buffer_depth", "Audit events waiting to be written", multiprocess_mode="livesum")
+else:
+    REQUEST_LATENCY = RESPONSES = DB_IN_USE = DB_POOL_SIZE = _Noop()
+    UPLOAD_BYTES = UPLOAD_SECONDS = UPLOAD_REJECTED = TASK_DEPTH = AUDIT_DEPTH = _Noop()
+
+# (endpoint, method) -> latency child; (blueprint, status) -> counter child
+_latency_children = {}
+_response_children = {}
+
+def _before_request():
+    g._metrics_started = time.perf_counter()
+
+def _after_request(response):
+    started = g.pop("_metrics_started", None)
+    if started is None:
+        return response
+    elapsed = time.perf_counter() - started
+    endpoint = request.endpoint or "unmatched"  # 404s share one series
+    key = (endpoint, request.method)
+    child = _latency_children.get(key)
+    if child is None:
+        blueprint = request.blueprint or ("static" if endpoint == "static" else "app")
+        child = _latency_children[key] = (REQUEST_LATENCY.labels(blueprint, endpoint, request.method), blueprint)
+    child[0].observe(elapsed)
+    rkey = (child[1], response.status_code)
+    counter = _response_children.get(rkey)
+    if counter is None:
+        counter = _response_children[rkey] = RESPONSES.labels(child[1], str(response.status_code))
+    counter.inc()
+    return response
+
+def _watch_pool(name, engine):
+    from sqlalchemy import event
+
+    gauge = DB_IN_USE.labels(name)
+    size = DB_POOL_SIZE.labels(name)
+
+    def on_connect(*args):
+        # set from the worker that opens connections, not the master that imported the app
+        if callable(getattr(engine.pool, "size", None)):
+            size.set(engine.pool.size())
+
+    event.listen(engine, "connect", on_connect)
+    event.listen(engine, "checkout", lambda *args: gauge.inc())
+    event.listen(engine, "checkin", lambda *args: gauge.dec())
+
+def init_metrics(app):
+    if prometheus_client is None:
+        app.extensions["metrics"] = None
+        return
+    from .extensions import db
+
+    app.before_request(_before_request)
+    app.after_request(_after_request)
+    with app.app_context():
+        for bind, engine in db.engines.items():
+            _watch_pool(bind or "default", engine)
+    app.extensions["metrics"] = {"multiprocess": bool(MULTIPROC_DIR)}
+
+def observe_upload(kind, started, size=0):
+    """Record one finished upload stage; `started` is a time.perf_counter() value."""
+    UPLOAD_SECONDS.labels(kind).observe(time.perf_counter() - started)
+    if size:
+        UPLOAD_BYTES.labels(kind).inc(size)
+
+def render():
+    """(body, content type) for the current values, summed over workers in multiprocess mode."""
+    if MULTIPROC_DIR:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = prometheus_client.REGISTRY
+    return prometheus_client.generate_latest(registry), CONTENT_TYPE_LATEST
+
+# --- multiprocess housekeeping (used by `flask serve`) ---
+
+def clear_multiproc_dir():
+    """Remove value files left by earlier runs (call in the master, before forking)."""
+    if not MULTIPROC_DIR:
+        return 0
+    os.makedirs(MULTIPROC_DIR, exist_ok=True)
+    own = f"_{os.getpid()}.db"
+    removed = 0
+    for name in os.listdir(MULTIPROC_DIR):
+        if name.endswith(".db") and not name.endswith(own):
+            try:
+                os.remove(os.path.join(MULTIPROC_DIR, name))
+                removed += 1
+            except OSError:
+                pass
+    return removed
+
+def mark_worker_dead(pid):
+    """Drop a dead worker's live gauges; its counters and histograms keep counting in the totals."""
+    if MULTIPROC_DIR and prometheus_client is not None:
+        multiprocess.mark_process_dead(pid, MULTIPROC_DIR)
@@ -12,6 +12,7 @@ class User(db.Model, UserMixin):
     password_hash = db.Column(db.String(255), nullable=False)
     active = db.Column(db.Boolean, default=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    deleted_at = db.Column(db.DateTime, index=True)  # soft delete; purged in the background (app/cleanup.py)
 
     student_account = db.relationship("StudentAccount", back_populates="user", uselist=False)
     supervisor_profile = db.relationship("SupervisorProfile", back_populates="user", uselist=False)
@@ -44,6 +45,11 @@ class StudentAccount(db.Model):
     avatar_initials = db.Column(db.String(8))
     avatar_color = db.Column(db.String(20))
     group_code = db.Column(db.String(20), db.ForeignKey("groups.group_code"))
+    # WebP thumbnails built in the background (app/images.py); NULL thumbs_ready_at = pending
+    thumb_sm_path = db.Column(db.String(255))
+    thumb_md_path = db.Column(db.String(255))
+    thumb_lg_path = db.Column(db.String(255))
+    thumbs_ready_at = db.Column(db.DateTime)
 
     user = db.relationship("User", back_populates="student_account")
     master = db.relationship("StudentMaster", back_populates="account")
@@ -62,6 +68,7 @@ class Group(db.Model):
     __tablename__ = "groups"
     group_code = db.Column(db.String(20), primary_key=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    member_count = db.Column(db.Integer, nullable=False, default=0, server_default="0")  # app/counters.py
 
     members = db.relationship("GroupMember", back_populates="group", cascade="all, delete-orphan")
     members_accounts = db.relationship("StudentAccount", back_populates="group")
@@ -97,8 +104,14 @@ class Activity(db.Model):
     start_at = db.Column(db.DateTime)
     deadline_at = db.Column(db.DateTime)
     require_pdf = db.Column(db.Boolean, default=False)
+    max_file_mb = db.Column(db.Integer)  # NULL = SUBMISSION_MAX_MB
     scope_all_groups = db.Column(db.Boolean, default=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    deleted_at = db.Column(db.DateTime, index=True)  # soft delete; purged in the background (app/cleanup.py)
+    # submissions per status, maintained on flush (app/counters.py)
+    pending_count = db.Column(db.Integer, nullable=False, default=0, server_default="0")
+    marked_count = db.Column(db.Integer, nullable=False, default=0, server_default="0")
+    rejected_count = db.Column(db.Integer, nullable=False, default=0, server_default="0")
 
     targets = db.relationship("ActivityTarget", back_populates="activity", cascade="all, delete-orphan")
     submissions = db.relationship("Submission", back_populates="activity", cascade="all, delete-orphan")
@@ -119,6 +132,7 @@ class Submission(db.Model):
     group_code = db.Column(db.String(20), db.ForeignKey("groups.group_code"), nullable=False)
     submitted_by_student_id = db.Column(db.String(32), db.ForeignKey("students_master.student_id"), nullable=False)
     file_path = db.Column(db.String(255))
+    file_sha256 = db.Column(db.String(64))
     submitted_at = db.Column(db.DateTime, default=datetime.utcnow)
     status = db.Column(db.Enum("Pending","Marked","Rejected", name="submission_status_enum"), default="Pending")
     marked_by_user_id = db.Column(db.Integer, db.ForeignKey("users.id"))
@@ -126,6 +140,11 @@ class Submission(db.Model):
     feedback = db.Column(db.Text)
     resubmission_count = db.Column(db.Integer, default=0)
 
+    __table_args__ = (
+        db.Index("ix_sub_activity_status", "activity_id", "status", "submitted_at"),  # supervisor queue
+        db.UniqueConstraint("activity_id", "group_code", name="uq_submission_group"),  # one row per group
+    )
+
     activity = db.relationship("Activity", back_populates="submissions")
     group = db.relationship("Group")
     marker = db.relationship("User", foreign_keys=[marked_by_user_id])
@@ -172,3 +191,203 @@ class TeamRequest(db.Model):
     receiver = db.relationship("StudentMaster", foreign_keys=[receiver_student_id])
 
 
+
+class AuditEvent(db.Model):
+    __tablename__ = "audit_events"
+    id = db.Column(db.Integer, primary_key=True)
+    # no FK: history must survive account deletion
+    actor_user_id = db.Column(db.Integer)
+    actor_role = db.Column(db.String(20))
+    action = db.Column(db.String(40), nullable=False)
+    entity_type = db.Column(db.String(40), nullable=False)
+    entity_id = db.Column(db.String(64), nullable=False)
+    detail = db.Column(db.String(255))
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
+    __table_args__ = (
+        db.Index("ix_audit_actor", "actor_user_id", "created_at"),
+        db.Index("ix_audit_entity", "entity_type", "entity_id", "created_at"),
+        db.Index("ix_audit_created", "created_at"),
+    )
+
+class UploadSession(db.Model):
+    """Resumable (chunked) submission upload in progress; see app/uploads.py."""
+    __tablename__ = "upload_sessions"
+    id = db.Column(db.String(32), primary_key=True)  # random token, also the .part file name
+    user_id = db.Column(db.Integer, db.ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    activity_id = db.Column(db.Integer, db.ForeignKey("activities.id", ondelete="CASCADE"), nullable=False)
+    group_code = db.Column(db.String(20), nullable=False)
+    filename = db.Column(db.String(255), nullable=False)
+    total_size = db.Column(db.BigInteger, nullable=False)
+    chunk_size = db.Column(db.Integer, nullable=False)
+    sha256 = db.Column(db.String(64), nullable=False)  # declared by the client, checked on finalize
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
+    activity = db.relationship("Activity")
+    chunks = db.relationship("UploadChunk", cascade="all, delete-orphan", passive_deletes=True)
+
+    __table_args__ = (db.Index("ix_upload_sessions_updated", "updated_at"),)
+
+    @property
+    def total_chunks(self) -> int:
+        return max(1, -(-self.total_size // self.chunk_size))
+
+class UploadChunk(db.Model):
+    __tablename__ = "upload_chunks"
+    upload_id = db.Column(db.String(32), db.ForeignKey("upload_sessions.id", ondelete="CASCADE"), primary_key=True)
+    chunk_index = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    size = db.Column(db.Integer, nullable=False)
+    received_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
+class SearchToken(db.Model):
+    """Admin search index (app/search.py): one row per token of an indexed field, kept current on flush."""
+    __tablename__ = "search_tokens"
+    id = db.Column(db.Integer, primary_key=True)
+    entity_type = db.Column(db.String(20), nullable=False)  # student | account | supervisor | group
+    entity_id = db.Column(db.String(64), nullable=False)
+    token = db.Column(db.String(64), nullable=False)
+    weight = db.Column(db.SmallInteger, nullable=False)
+
+    __table_args__ = (
+        db.Index("ix_search_token", "token", "entity_type"),
+        db.Index("ix_search_entity", "entity_type", "entity_id"),
+    )
+
+class DeadlineReminder(db.Model):
+    """A deadline reminder sent to a student for one activity and reminder window (app/notify.py)."""
+    __tablename__ = "deadline_reminders"
+    id = db.Column(db.Integer, primary_key=True)
+    activity_id = db.Column(db.Integer, db.ForeignKey("activities.id", ondelete="CASCADE"), nullable=False)
+    student_id = db.Column(db.String(32), nullable=False)
+    window_hours = db.Column(db.Integer, nullable=False)
+    sent_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
+    __table_args__ = (db.UniqueConstraint("activity_id", "student_id", "window_hours", name="uq_deadline_reminder"),)
+
+# --- academic-year archive (app/archive.py) ---
+# Closed years are moved out of the live tables into these copies (same ids, no FKs),
+# tagged with their academic year, e.g. "2024/25".
+
+class ActivityArchive(db.Model):
+    __tablename__ = "activities_archive"
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    created_by_role = db.Column(db.String(20), nullable=False)
+    created_by_user_id = db.Column(db.Integer, nullable=False)
+    title = db.Column(db.String(200), nullable=False)
+    description = db.Column(db.Text)
+    start_at = db.Column(db.DateTime)
+    deadline_at = db.Column(db.DateTime)
+    require_pdf = db.Column(db.Boolean)
+    max_file_mb = db.Column(db.Integer)
+    scope_all_groups = db.Column(db.Boolean)
+    created_at = db.Column(db.DateTime)
+    pending_count = db.Column(db.Integer, nullable=False, default=0)
+    marked_count = db.Column(db.Integer, nullable=False, default=0)
+    rejected_count = db.Column(db.Integer, nullable=False, default=0)
+    academic_year = db.Column(db.String(10), nullable=False, index=True)
+    archived_at = db.Column(db.DateTime, nullable=False)
+
+class ActivityTargetArchive(db.Model):
+    __tablename__ = "activity_targets_archive"
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    activity_id = db.Column(db.Integer, nullable=False, index=True)
+    group_code = db.Column(db.String(20), nullable=False)
+    academic_year = db.Column(db.String(10), nullable=False, index=True)
+    archived_at = db.Column(db.DateTime, nullable=False)
+
+class SubmissionArchive(db.Model):
+    __tablename__ = "submissions_archive"
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    activity_id = db.Column(db.Integer, nullable=False, index=True)
+    group_code = db.Column(db.String(20), nullable=False)
+    submitted_by_student_id = db.Column(db.String(32), nullable=False)
+    file_path = db.Column(db.String(255))
+    file_sha256 = db.Column(db.String(64))
+    submitted_at = db.Column(db.DateTime)
+    status = db.Column(db.String(20))
+    marked_by_user_id = db.Column(db.Integer)
+    marked_at = db.Column(db.DateTime)
+    feedback = db.Column(db.Text)
+    resubmission_count = db.Column(db.Integer)
+    academic_year = db.Column(db.String(10), nullable=False, index=True)
+    archived_at = db.Column(db.DateTime, nullable=False)
+
+class TitleProposalArchive(db.Model):
+    __tablename__ = "title_proposals_archive"
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    group_code = db.Column(db.String(20), nullable=False, index=True)
+    title = db.Column(db.String(255), nullable=False)
+    project_type = db.Column(db.String(80))
+    submitted_at = db.Column(db.DateTime)
+    status_admin = db.Column(db.String(20))
+    status_supervisor = db.Column(db.String(20))
+    last_action_at = db.Column(db.DateTime)
+    academic_year = db.Column(db.String(10), nullable=False, index=True)
+    archived_at = db.Column(db.DateTime, nullable=False)
+
+class GroupMemberArchive(db.Model):
+    __tablename__ = "group_members_archive"
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    group_code = db.Column(db.String(20), nullable=False, index=True)
+    student_id = db.Column(db.String(32), nullable=False)
+    joined_at = db.Column(db.DateTime)
+    academic_year = db.Column(db.String(10), nullable=False, index=True)
+    archived_at = db.Column(db.DateTime, nullable=False)
+
+class TeamRequestArchive(db.Model):
+    __tablename__ = "team_requests_archive"
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    requester_student_id = db.Column(db.String(32), nullable=False)
+    receiver_student_id = db.Column(db.String(32), nullable=False)
+    status = db.Column(db.String(20))
+    created_at = db.Column(db.DateTime)
+    academic_year = db.Column(db.String(10), nullable=False, index=True)
+    archived_at = db.Column(db.DateTime, nullable=False)
+
+# --- submission similarity (app/similarity.py) ---
+# Keyed by submission id without FKs, so fingerprints of archived submissions
+# (same ids in submissions_archive) still match new work.
+
+class SubmissionFingerprint(db.Model):
+    """MinHash signature of a submitted PDF's text."""
+    __tablename__ = "submission_fingerprints"
+    submission_id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    activity_id = db.Column(db.Integer, nullable=False, index=True)
+    file_path = db.Column(db.String(255))
+    file_sha256 = db.Column(db.String(64))
+    signature = db.Column(db.LargeBinary)  # NUM_PERM little-endian uint32; NULL when no text could be read
+    shingles = db.Column(db.Integer, nullable=False, default=0)
+    error = db.Column(db.String(255))
+    indexed_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
+class SimilarityBucket(db.Model):
+    """LSH index: one row per (band, bucket) of a fingerprint; shared buckets mark candidate pairs."""
+    __tablename__ = "similarity_buckets"
+    band = db.Column(db.SmallInteger, primary_key=True, autoincrement=False)
+    bucket = db.Column(db.BigInteger, primary_key=True, autoincrement=False)
+    submission_id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    activity_id = db.Column(db.Integer, nullable=False)
+
+    __table_args__ = (
+        db.Index("ix_similarity_bucket_submission", "submission_id"),
+        db.Index("ix_similarity_bucket_activity", "activity_id"),
+    )
+
+class SubmissionRevision(db.Model):
+    """One uploaded file of a submission (app/revisions.py); keyed by submission id, kept through archival."""
+    __tablename__ = "submission_revisions"
+    id = db.Column(db.Integer, primary_key=True)
+    submission_id = db.Column(db.Integer, nullable=False)
+    activity_id = db.Column(db.Integer, nullable=False, index=True)
+    revision_no = db.Column(db.Integer, nullable=False)
+    file_path = db.Column(db.String(255), index=True)  # content-addressed blob, shared by identical uploads
+    file_sha256 = db.Column(db.String(64))
+    original_name = db.Column(db.String(255))
+    size_bytes = db.Column(db.BigInteger)
+    uploaded_by_student_id = db.Column(db.String(32))
+    uploaded_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    marked_at = db.Column(db.DateTime)  # the version that was marked; never pruned
+    pruned_at = db.Column(db.DateTime)  # file released by the retention policy; the row stays as history
+
+    __table_args__ = (db.UniqueConstraint("submission_id", "revision_no", name="uq_submission_revision"),)
@@ -0,0 +1,256 @@
+"""
+Deadline reminders (`flask send-reminders`, run from cron / Task Scheduler).
+
+One query finds every group member whose group has not submitted an activity
+that closes within one of REMINDER_WINDOWS_HOURS (e.g. 72 and 24 hours) and who
+has not been reminded for that activity and window yet. Rows are folded into one
+digest mail per student, the (activity, student, window) rows are claimed in
+`deadline_reminders` (unique, so a concurrent or repeated run skips them) and the
+mails go out over REMINDER_SMTP_CONNECTIONS reused SMTP connections, throttled
+to REMINDER_RATE_PER_SECOND overall. A failed send releases its claim, so the next
+run retries it.
+
+Works against a local sink too: SMTP_HOST=localhost SMTP_PORT=1025
+SMTP_USE_TLS=false with no SMTP_USER (e.g. `python -m aiosmtpd -n -l localhost:1025`).
+"""
+import queue
+import smtplib
+import threading
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from email.message import EmailMessage
+from flask import current_app
+from sqlalchemy import select, delete, insert, exists, case, or_, tuple_
+from sqlalchemy.exc import IntegrityError
+
+from .extensions import db
+from .models import Activity, ActivityTarget, GroupMember, StudentMaster, Submission, DeadlineReminder
+
+@dataclass
+class Digest:
+    email: str
+    student_id: str
+    name: str
+    items: list = field(default_factory=list)  # (activity_id, title, deadline_at, group_code, window)
+
+    @property
+    def claims(self):
+        return [(a, self.student_id, w) for a, _, _, _, w in self.items]
+
+def parse_windows(value):
+    return sorted({int(h) for h in str(value).split(",") if h.strip()})
+
+def due_reminders(windows, now=None):
+    """(activity_id, title, deadline_at, group_code, student_id, name, email, window) still to be sent."""
+    now = now or datetime.utcnow()
+    window = case(*[(Activity.deadline_at <= now + timedelta(hours=w), w) for w in windows])
+    targeted = or_(
+        Activity.scope_all_groups == True,
+        exists().where(ActivityTarget.activity_id == Activity.id, ActivityTarget.group_code == GroupMember.group_code),
+    )
+    submitted = exists().where(Submission.activity_id == Activity.id, Submission.group_code == GroupMember.group_code)
+    reminded = exists().where(
+        DeadlineReminder.activity_id == Activity.id,
+        DeadlineReminder.student_id == GroupMember.student_id,
+        DeadlineReminder.window_hours == window,
+    )
+    stmt = (
+        select(Activity.id, Activity.title, Activity.deadline_at, GroupMember.group_code,
+               StudentMaster.student_id, StudentMaster.name, StudentMaster.email, window.label("window"))
+        .select_from(Activity)
+        .join(GroupMember, targeted)
+        .join(StudentMaster, StudentMaster.student_id == GroupMember.student_id)
+        .where(
+            Activity.deadline_at > now,
+            Activity.deadline_at <= now + timedelta(hours=windows[-1]),
+            StudentMaster.email.isnot(None), StudentMaster.email != "",
+            ~submitted, ~reminded,
+        )
+        .order_by(StudentMaster.student_id, Activity.deadline_at)
+    )
+    return db.session.execute(stmt).all()
+
+def build_digests(rows):
+    digests = {}
+    for act_id, title, deadline, group_code, student_id, name, email, window in rows:
+        d = digests.get(student_id)
+        if d is None:
+            d = digests[student_id] = Digest(email.strip(), student_id, name)
+        d.items.append((act_id, title, deadline, group_code, window))
+    return list(digests.values())
+
+CLAIM_BATCH = 200
+
+def _insert_claims(digests, now):
+    db.session.execute(insert(DeadlineReminder), [
+        {"activity_id": a, "student_id": s, "window_hours": w, "sent_at": now} for d in digests for a, s, w in d.claims
+    ])
+    db.session.commit()
+
+def claim(digests, now):
+    """
+    Record digests as sent before sending them; the unique key makes a second run skip
+    them. Claims go in batches, falling back to one digest at a time when another
+    run got to part of a batch first. Returns the digests this run owns.
+    """
+    owned = []
+    for i in range(0, len(digests), CLAIM_BATCH):
+        batch = digests[i:i + CLAIM_BATCH]
+        try:
+            _insert_claims(batch, now)
+            owned += batch
+            continue
+        except IntegrityError:
+            db.session.rollback()
+        for d in batch:
+            try:
+                _insert_claims([d], now)
+                owned.append(d)
+            except IntegrityError:
+                db.session.rollback()
+    return owned
+
+def release(digest):
+    db.session.execute(delete(DeadlineReminder).where(
+        tuple_(DeadlineReminder.activity_id, DeadlineReminder.student_id, DeadlineReminder.window_hours)
+        .in_(digest.claims)))
+    db.session.commit()
+
+def compose(digest, from_email):
+    msg = EmailMessage()
+    n = len(digest.items)
+    msg["Subject"] = f"UPMS+ reminder: {n} submission{'s' if n > 1 else ''} due soon"
+    msg["From"] = from_email
+    msg["To"] = digest.email
+    lines = [f"Hello {digest.name},", "", "Your group has not submitted the following yet:", ""]
+    for _, title, deadline, group_code, _ in digest.items:
+        lines.append(f"  - {title} (group {group_code}), due {deadline:%Y-%m-%d %H:%M} UTC")
+    lines += ["", "Log in to UPMS+ to upload your work before the deadline."]
+    msg.set_content("\n".join(lines))
+    return msg
+
+class Throttle:
+    """Shared rate limit: at most `rate` sends per second across all connections."""
+
+    def __init__(self, rate):
+        self.interval = 1.0 / rate if rate > 0 else 0.0
+        self._next = time.monotonic()
+        self._lock = threading.Lock()
+
+    def wait(self):
+        if not self.interval:
+            return
+        with self._lock:
+            now = time.monotonic()
+            slot = max(self._next, now)
+            self._next = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+class SMTPSender:
+    """One reusable SMTP connection; reconnects after `per_connection` messages or a dropped link."""
+
+    def __init__(self, config, per_connection):
+        self.config = config
+        self.per_connection = per_connection
+        self.conn = None
+        self.sent = 0
+
+    def _connect(self):
+        c = self.config
+        host, port = c.get("SMTP_HOST"), int(c.get("SMTP_PORT", 587))
+        timeout = float(c.get("REMINDER_SMTP_TIMEOUT", 30))
+        if c.get("SMTP_USE_TLS", True):
+            conn = smtplib.SMTP(host, port, timeout=timeout)
+            conn.starttls()
+        elif port == 465:
+            conn = smtplib.SMTP_SSL(host, port, timeout=timeout)
+        else:
+            conn = smtplib.SMTP(host, port, timeout=timeout)  # plain, e.g. a local sink
+        if c.get("SMTP_USER") and c.get("SMTP_PASSWORD"):
+            conn.login(c["SMTP_USER"], c["SMTP_PASSWORD"])
+        return conn
+
+    def send(self, msg):
+        for attempt in (1, 2):
+            if self.conn is None or self.sent >= self.per_connection:
+                self.close()
+                self.conn = self._connect()
+                self.sent = 0
+            try:
+                self.conn.send_message(msg)
+                self.sent += 1
+                return
+            except smtplib.SMTPServerDisconnected:
+                self.conn = None  # server closed an idle/used-up connection; reconnect once
+                if attempt == 2:
+                    raise
+
+    def close(self):
+        if self.conn is not None:
+            try:
+                self.conn.quit()
+            except (smtplib.SMTPException, OSError):
+                pass
+            self.conn = None
+
+def send_all(digests, config, log=print):
+    """Send composed digests over a small connection pool. Returns the digests that failed."""
+    from_email = config.get("SMTP_FROM") or config.get("SMTP_USER")
+    throttle = Throttle(float(config.get("REMINDER_RATE_PER_SECOND", 5)))
+    per_connection = int(config.get("REMINDER_MESSAGES_PER_CONNECTION", 50))
+    work = queue.Queue()
+    for d in digests:
+        work.put(d)
+    failed, lock = [], threading.Lock()
+
+    def worker():
+        sender = SMTPSender(config, per_connection)
+        try:
+            while True:
+                try:
+                    d = work.get_nowait()
+                except queue.Empty:
+                    return
+                throttle.wait()
+                try:
+                    sender.send(compose(d, from_email))
+                except (smtplib.SMTPException, OSError) as e:
+                    sender.close()
+                    log(f"  could not send to {d.email}: {e}")
+                    with lock:
+                        failed.append(d)
+        finally:
+            sender.close()
+
+    n = max(1, min(int(config.get("REMINDER_SMTP_CONNECTIONS", 2)), len(digests)))
+    threads = [threading.Thread(target=worker, name=f"smtp-{i}") for i in range(n)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return failed
+
+def send_deadline_reminders(windows=None, now=None, dry_run=False, log=print):
+    """Find, claim and send due reminders. Returns a dict of counts."""
+    config = current_app.config
+    windows = windows or parse_windows(config.get("REMINDER_WINDOWS_HOURS", "72,24"))
+    now = now or datetime.utcnow()
+    digests = build_digests(due_reminders(windows, now))
+    report = {"digests": len(digests), "items": sum(len(d.items) for d in digests), "sent": 0, "skipped": 0, "failed": 0}
+    if dry_run:
+        for d in digests:
+            log(f"  {d.email}: " + "; ".join(f"{t} ({w}h)" for _, t, _, _, w in d.items))
+        return report
+    if digests and not config.get("SMTP_HOST"):
+        raise RuntimeError("SMTP is not configured (SMTP_HOST).")
+
+    claimed = claim(digests, now)
+    report["skipped"] = len(digests) - len(claimed)
+    failed = send_all(claimed, config, log=log)
+    for d in failed:
+        release(d)
+    report["failed"] = len(failed)
+    report["sent"] = len(claimed) - len(failed)
+    return report
@@ -0,0 +1,105 @@
+"""
+Read models for the big list pages: column-projected queries that return small
+__slots__ records instead of ORM entities.
+
+A page that prints five columns of 1000 rows does not need 1000 tracked entities in
+the identity map (state, attribute history, relationship loaders). These queries
+select only the columns the template shows, in one round trip, and the records are
+plain attribute bags: nothing is tracked, refreshed or lazy-loaded later.
+`flask bench-projections` compares them with the entity queries they replace.
+"""
+from sqlalchemy import select
+
+from .extensions import db
+from .models import (
+    StudentMaster, StudentAccount, User, Submission, Activity, SupervisorAssignment,
+    GroupMember, TitleProposal,
+)
+
+class Record:
+    __slots__ = ()
+
+    def __init__(self, *values):
+        for name, value in zip(self.__slots__, values):
+            setattr(self, name, value)
+
+    def __repr__(self):
+        return f"{type(self).__name__}({', '.join(f'{n}={getattr(self, n)!r}' for n in self.__slots__)})"
+
+class StudentRow(Record):
+    # avatar_* / thumb_sm_path / thumbs_ready_at feed the avatar() macro (size "sm")
+    __slots__ = ("student_id", "name", "program", "batch", "user_id", "group_code",
+                 "avatar_initials", "avatar_color", "thumb_sm_path", "thumbs_ready_at")
+
+class AccountRow(Record):
+    __slots__ = ("id", "role", "username", "active")
+
+class SubmissionRow(Record):
+    __slots__ = ("id", "group_code", "activity_title", "submitted_at", "file_path", "status")
+
+class MemberRow(Record):
+    __slots__ = ("student_id", "name", "phone", "batch")
+
+class GroupRow(Record):
+    __slots__ = ("group_code", "members", "title", "project_type")
+
+def _records(cls, stmt):
+    return [cls(*row) for row in db.session.execute(stmt)]
+
+def student_rows(*criteria, limit=1000):
+    """Students with their account (if any); criteria may use StudentMaster and StudentAccount."""
+    return _records(StudentRow, (
+        select(StudentMaster.student_id, StudentMaster.name, StudentMaster.program, StudentMaster.batch,
+               StudentAccount.user_id, StudentAccount.group_code, StudentAccount.avatar_initials,
+               StudentAccount.avatar_color, StudentAccount.thumb_sm_path, StudentAccount.thumbs_ready_at)
+        .outerjoin(StudentAccount, StudentAccount.student_id == StudentMaster.student_id)
+        .where(*criteria)
+        .order_by(StudentMaster.student_id)
+        .limit(limit)
+    ))
+
+def account_rows(*criteria, limit=500):
+    return _records(AccountRow, (
+        select(User.id, User.role, User.username, User.active)
+        .where(*criteria)
+        .order_by(User.id.desc())
+        .limit(limit)
+    ))
+
+def submission_rows(*criteria, limit=500):
+    """Latest submissions with their activity title (joined, not lazy-loaded per row)."""
+    return _records(SubmissionRow, (
+        select(Submission.id, Submission.group_code, Activity.title, Submission.submitted_at,
+               Submission.file_path, Submission.status)
+        .join(Activity, Activity.id == Submission.activity_id)
+        .where(*criteria)
+        .order_by(Submission.submitted_at.desc())
+        .limit(limit)
+    ))
+
+def supervisor_group_rows(supervisor_user_id):
+    """A supervisor's groups with members and approved title: two queries for any number of groups."""
+    mine = select(SupervisorAssignment.group_code).where(SupervisorAssignment.supervisor_user_id == supervisor_user_id)
+    groups = {code: GroupRow(code, [], None, None) for code in db.session.execute(
+        mine.order_by(SupervisorAssignment.id)).scalars()}
+    if not groups:
+        return []
+    members = db.session.execute(
+        select(GroupMember.group_code, StudentMaster.student_id, StudentMaster.name, StudentMaster.phone, StudentMaster.batch)
+        .join(StudentMaster, StudentMaster.student_id == GroupMember.student_id)
+        .where(GroupMember.group_code.in_(mine))
+        .order_by(GroupMember.group_code, GroupMember.id)
+    )
+    for code, *member in members:
+        groups[code].members.append(MemberRow(*member))
+    titles = db.session.execute(
+        select(TitleProposal.group_code, TitleProposal.title, TitleProposal.project_type)
+        .where(TitleProposal.group_code.in_(mine), TitleProposal.status_admin == "Approved",
+               TitleProposal.status_supervisor == "Approved")
+        .order_by(TitleProposal.id.desc())
+    )
+    for code, title, project_type in titles:
+        row = groups[code]
+        if row.title is None:  # newest approved title wins
+            row.title, row.project_type = title, project_type
+    return list(groups.values())
@@ -0,0 +1,173 @@
+"""
+Upload store reconciliation (`flask uploads-reconcile`).
+
+Compares the files under UPLOAD_FOLDER with the paths the database references
+(Submission.file_path, unpruned revisions, archived submissions, StudentAccount
+photo/thumbnail paths):
+  orphans   - files nothing points to (old resubmissions, purged rows, failed requests)
+  dangling  - references whose file is missing
+Memory stays bounded: references are streamed from the database and split into
+hash buckets of at most `max_refs` paths; the tree is walked once per bucket
+(normally just once). Orphans older than the grace period can be deleted.
+"""
+import os
+import time
+import zlib
+from sqlalchemy import select, func
+
+from .extensions import db
+from .models import Submission, StudentAccount, SubmissionRevision, SubmissionArchive
+
+# managed elsewhere: partial resumable uploads (uploads-gc)
+SKIP_DIRS = {"incoming"}
+STREAM_BATCH = 5000
+
+def _stream(stmt):
+    return db.session.execute(stmt.execution_options(yield_per=STREAM_BATCH, include_deleted=True))
+
+def _references():
+    """Yield (kind, row_id, path) for every stored path without loading them all."""
+    for sid, path in _stream(select(Submission.id, Submission.file_path).where(Submission.file_path.isnot(None))):
+        yield "submission", sid, path
+    for rid, path in _stream(select(SubmissionRevision.id, SubmissionRevision.file_path)
+                             .where(SubmissionRevision.file_path.isnot(None), SubmissionRevision.pruned_at.is_(None))):
+        yield "revision", rid, path
+    for sid, path in _stream(select(SubmissionArchive.id, SubmissionArchive.file_path).where(SubmissionArchive.file_path.isnot(None))):
+        yield "archived submission", sid, path
+    cols = (StudentAccount.photo_path, StudentAccount.thumb_sm_path, StudentAccount.thumb_md_path, StudentAccount.thumb_lg_path)
+    for row in _stream(select(StudentAccount.user_id, *cols).where(StudentAccount.photo_path.isnot(None))):
+        for path in row[1:]:
+            if path:
+                yield "account", row[0], path
+
+def _reference_count():
+    subs = db.session.query(func.count(Submission.id)).filter(Submission.file_path.isnot(None)).scalar() or 0
+    subs += db.session.query(func.count(SubmissionRevision.id)).filter(SubmissionRevision.pruned_at.is_(None)).scalar() or 0
+    subs += db.session.query(func.count(SubmissionArchive.id)).filter(SubmissionArchive.file_path.isnot(None)).scalar() or 0
+    photos = db.session.query(func.count(StudentAccount.user_id)).filter(StudentAccount.photo_path.isnot(None)).scalar() or 0
+    return subs + photos * 4
+
+def _walk(root):
+    """Yield (relative path, size, mtime) for every file, depth first, one directory listing at a time."""
+    stack = [""]
+    while stack:
+        rel_dir = stack.pop()
+        try:
+            entries = os.scandir(os.path.join(root, rel_dir))
+        except OSError:
+            continue
+        with entries:
+            for entry in entries:
+                rel = f"{rel_dir}/{entry.name}" if rel_dir else entry.name
+                if entry.is_dir(follow_symlinks=False):
+                    if rel not in SKIP_DIRS:
+                        stack.append(rel)
+                elif entry.is_file(follow_symlinks=False):
+                    st = entry.stat(follow_symlinks=False)
+                    yield rel, st.st_size, st.st_mtime
+
+def _bucket(rel, buckets):
+    return zlib.crc32(rel.encode("utf-8")) % buckets if buckets > 1 else 0
+
+def reconcile_uploads(root, grace_hours=24.0, delete=False, max_refs=200000, sample=20, log=print):
+    """
+    Walk `root` against the stored references. Returns a report dict; with delete=True
+    orphans whose mtime is older than `grace_hours` are removed.
+    """
+    root = os.path.realpath(root)
+    buckets = max(1, -(-_reference_count() // max_refs))
+    cutoff = time.time() - grace_hours * 3600
+    report = {
+        "root": root, "passes": buckets, "files": 0, "bytes": 0, "referenced": 0, "external_refs": 0,
+        "orphans": 0, "orphan_bytes": 0, "eligible": 0, "eligible_bytes": 0, "deleted": 0, "reclaimed_bytes": 0,
+        "dangling": 0, "by_dir": {}, "orphan_sample": [], "dangling_sample": [],
+    }
+
+    for b in range(buckets):
+        refs = {}  # relative path -> (kind, id) for this bucket only
+        for kind, row_id, path in _references():
+            real = os.path.realpath(path)
+            if not real.startswith(root + os.sep):
+                if b == 0:
+                    report["external_refs"] += 1  # stored outside UPLOAD_FOLDER; not ours to judge
+                continue
+            rel = os.path.relpath(real, root).replace("\\", "/")
+            if _bucket(rel, buckets) == b:
+                refs[rel] = (kind, row_id)
+
+        for rel, size, mtime in _walk(root):
+            if _bucket(rel, buckets) != b:
+                continue
+            top = rel.split("/", 1)[0] if "/" in rel else "."
+            stats = report["by_dir"].setdefault(top, {"files": 0, "bytes": 0, "orphans": 0, "orphan_bytes": 0})
+            report["files"] += 1
+            report["bytes"] += size
+            stats["files"] += 1
+            stats["bytes"] += size
+            if refs.pop(rel, None) is not None:
+                report["referenced"] += 1
+                continue
+            report["orphans"] += 1
+            report["orphan_bytes"] += size
+            stats["orphans"] += 1
+            stats["orphan_bytes"] += size
+            if len(report["orphan_sample"]) < sample:
+                report["orphan_sample"].append(rel)
+            if mtime >= cutoff:
+                continue  # may belong to an upload whose row is not committed yet
+            report["eligible"] += 1
+            report["eligible_bytes"] += size
+            if delete:
+                try:
+                    os.remove(os.path.join(root, rel))
+                    report["deleted"] += 1
+                    report["reclaimed_bytes"] += size
+                except OSError as e:
+                    log(f"  could not delete {rel}: {e}")
+
+        # whatever is left in this bucket was never seen on disk
+        report["dangling"] += len(refs)
+        for rel, (kind, row_id) in refs.items():
+            if len(report["dangling_sample"]) >= sample:
+                break
+            report["dangling_sample"].append(f"{kind} {row_id}: {rel}")
+
+    if delete:
+        _prune_empty_dirs(root)
+    return report
+
+def _prune_empty_dirs(root):
+    for dirpath, dirnames, filenames in os.walk(root, topdown=False):
+        rel = os.path.relpath(dirpath, root).replace("\\", "/")
+        if rel == "." or rel.split("/", 1)[0] in SKIP_DIRS or rel in ("submissions", "profiles", "blobs"):
+            continue
+        if not dirnames and not filenames:
+            try:
+                os.rmdir(dirpath)
+            except OSError:
+                pass
+
+def _size(n):
+    if n < 1024 * 1024:
+        return f"{n / 1024:.1f} KB"
+    return f"{n / (1024 * 1024):.1f} MB"
+
+def format_report(report):
+    lines = [
+        f"Upload store: {report['root']} ({report['passes']} pass{'es' if report['passes'] > 1 else ''})",
+        f"  files: {report['files']} ({_size(report['bytes'])}), referenced: {report['referenced']}",
+        f"  orphans: {report['orphans']} ({_size(report['orphan_bytes'])}), "
+        f"older than grace period: {report['eligible']} ({_size(report['eligible_bytes'])})",
+        f"  dangling references: {report['dangling']}, stored outside the upload folder: {report['external_refs']}",
+    ]
+    for top, s in sorted(report["by_dir"].items()):
+        lines.append(f"    {top + '/':20} {s['files']:>8} files {_size(s['bytes']):>12}   orphans {s['orphans']:>6} {_size(s['orphan_bytes']):>12}")
+    if report["orphan_sample"]:
+        lines.append("  sample orphans:")
+        lines += [f"    {p}" for p in report["orphan_sample"]]
+    if report["dangling_sample"]:
+        lines.append("  sample dangling references:")
+        lines += [f"    {p}" for p in report["dangling_sample"]]
+    if report["deleted"]:
+        lines.append(f"  deleted {report['deleted']} orphans, reclaimed {_size(report['reclaimed_bytes'])}")
+    return "\n".join(lines)
@@ -0,0 +1,129 @@
+from datetime import datetime
+import numpy as np
+import pandas as pd
+from sqlalchemy import func, case, select
+
+from .extensions import db
+from .models import Activity, ActivityTarget, Group, Submission
+
+SUBMISSION_STATUSES = ("Pending", "Marked", "Rejected")
+
+def targeted_groups_expr():
+    """Number of groups an activity applies to: every group when scope_all_groups, else its targets."""
+    all_groups = select(func.count(Group.group_code)).scalar_subquery()
+    target_count = (
+        select(func.count(ActivityTarget.id))
+        .where(ActivityTarget.activity_id == Activity.id)
+        .correlate(Activity)
+        .scalar_subquery()
+    )
+    return case((Activity.scope_all_groups == True, all_groups), else_=target_count)
+
+def activity_summaries(*criteria):
+    """
+    Submission totals per activity, read from the maintained status counters
+    (app/counters.py) instead of aggregating `submissions`.
+    `criteria` are extra filters on Activity (e.g. created_by_user_id).
+    A resubmission updates its group's row, so the counters also give the number of groups that submitted.
+    """
+    rows = (
+        db.session.query(
+            Activity.id,
+            Activity.title,
+            Activity.deadline_at,
+            targeted_groups_expr().label("targeted"),
+            (Activity.pending_count + Activity.marked_count + Activity.rejected_count).label("submitted"),
+            Activity.pending_count.label("pending"),
+            Activity.marked_count.label("marked"),
+            Activity.rejected_count.label("rejected"),
+        )
+        .filter(*criteria)
+        .order_by(Activity.id.desc())
+        .all()
+    )
+
+    now = datetime.utcnow()
+    summaries = []
+    for r in rows:
+        targeted = int(r.targeted or 0)
+        submitted = int(r.submitted or 0)
+        past_deadline = bool(r.deadline_at and r.deadline_at < now)
+        summaries.append({
+            "activity_id": r.id,
+            "title": r.title,
+            "deadline_at": r.deadline_at,
+            "targeted": targeted,
+            "submitted": submitted,
+            "pending": int(r.pending),
+            "marked": int(r.marked),
+            "rejected": int(r.rejected),
+            # groups that never submitted once the deadline passed
+            "overdue": max(targeted - submitted, 0) if past_deadline else 0,
+        })
+    return summaries
+
+def latest_submission_statuses():
+    """Status of the newest submission for every (activity, group) pair, as one aggregate query."""
+    latest = (
+        db.session.query(func.max(Submission.id).label("id"))
+        .group_by(Submission.activity_id, Submission.group_code)
+        .subquery()
+    )
+    return (
+        db.session.query(Submission.group_code, Submission.activity_id, Submission.status)
+        .join(latest, latest.c.id == Submission.id)
+        .all()
+    )
+
+def completion_matrix():
+    """
+    Groups x activities grid of the latest submission status.
+    Cells are a submission status, "Not submitted"/"Overdue" for visible activities
+    without a submission, or "" when the activity does not apply to the group.
+    Returns (DataFrame indexed by group_code with activity id columns, activity rows).
+    """
+    group_codes = [g for (g,) in db.session.query(Group.group_code).order_by(Group.group_code.asc()).all()]
+    acts = (
+        db.session.query(Activity.id, Activity.title, Activity.deadline_at, Activity.scope_all_groups)
+        .order_by(Activity.deadline_at.asc(), Activity.id.asc())
+        .all()
+    )
+    act_ids = [a.id for a in acts]
+    if not group_codes or not act_ids:
+        return pd.DataFrame(index=group_codes, columns=act_ids, dtype=object), acts
+
+    group_index = pd.Index(group_codes)
+    act_index = pd.Index(act_ids)
+
+    # visibility: scope_all columns + explicit targets
+    visible = np.zeros((len(group_codes), len(act_ids)), dtype=bool)
+    visible[:, [bool(a.scope_all_groups) for a in acts]] = True
+    targets = pd.DataFrame(
+        db.session.query(ActivityTarget.group_code, ActivityTarget.activity_id).all(),
+        columns=["group_code", "activity_id"],
+    )
+    rows = group_index.get_indexer(targets.group_code)
+    cols = act_index.get_indexer(targets.activity_id)
+    keep = (rows >= 0) & (cols >= 0)
+    visible[rows[keep], cols[keep]] = True
+
+    statuses = pd.DataFrame(latest_submission_statuses(), columns=["group_code", "activity_id", "status"])
+    status_grid = np.full((len(group_codes), len(act_ids)), None, dtype=object)
+    rows = group_index.get_indexer(statuses.group_code)
+    cols = act_index.get_indexer(statuses.activity_id)
+    keep = (rows >= 0) & (cols >= 0)
+    status_grid[rows[keep], cols[keep]] = statuses.status.to_numpy()[keep]
+
+    now = datetime.utcnow()
+    overdue = np.array([bool(a.deadline_at and a.deadline_at < now) for a in acts])
+    missing = np.where(overdue[np.newaxis, :], "Overdue", "Not submitted")
+    cells = np.where(
+        pd.isna(status_grid),
+        np.where(visible, missing, ""),
+        status_grid,
+    )
+    return pd.DataFrame(cells, index=group_codes, columns=act_ids), acts
+
+def behind_mask(matrix: pd.DataFrame):
+    """Groups with at least one overdue, missing or rejected activity."""
+    return matrix.isin(["Overdue", "Not submitted", "Rejected"]).any(axis=1)
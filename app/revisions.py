@@ -0,0 +1,145 @@
+"""
+Submission revisions: every uploaded file of a submission, kept as history.
+
+Files are stored by content under UPLOAD_FOLDER/blobs/<sha[:2]>/<sha256><ext>, so
+uploading the same file again (or the same file in another submission) stores it
+once; `submission_revisions` records who uploaded what, when, its size and hash.
+Submission.file_path points at the blob of the latest revision.
+
+Retention: the pruner keeps the last REVISION_KEEP_LAST revisions of each
+submission, plus the version that was marked. Older revisions keep their metadata
+but their file reference is released (pruned_at). A blob is deleted once no
+unpruned revision or submission refers to it and it is older than the grace
+period, so a blob that was just uploaded again is not removed under the uploader
+(`flask uploads-reconcile --delete` collects any that were skipped).
+The pruner runs on the task pool at most once an hour, or as `flask revisions-prune`.
+Rows are keyed by submission id without a foreign key, so archived submissions keep
+their history.
+"""
+import os
+import time
+from dataclasses import replace
+from datetime import datetime
+from flask import current_app
+from sqlalchemy import select, insert, update, delete, func, literal
+
+from .extensions import db
+from .models import Submission, SubmissionRevision
+from .tasks import tasks
+
+BLOB_DIR = "blobs"
+BLOB_GRACE_SECONDS = 3600
+
+def keep_last():
+    return max(1, int(current_app.config.get("REVISION_KEEP_LAST", 3)))
+
+def blob_path(sha256, ext=""):
+    root = current_app.config["UPLOAD_FOLDER"]
+    return os.path.join(root, BLOB_DIR, sha256[:2], sha256 + ext).replace("\\", "/")
+
+def blob_path_of(upload):
+    """Where store_blob puts a verified upload."""
+    return blob_path(upload.sha256, os.path.splitext(upload.path)[1].lower())
+
+def store_blob(upload):
+    """Move a verified upload into the blob store. Returns the upload with its blob path."""
+    path = blob_path_of(upload)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    # identical content: replacing an existing blob is harmless and refreshes its mtime for the grace period
+    os.replace(upload.path, path)
+    return replace(upload, path=path)
+
+def add_revision(submission_id, activity_id, upload, student_id, now):
+    """Record the next revision of a submission (caller commits)."""
+    next_no = (select(func.coalesce(func.max(SubmissionRevision.revision_no), 0) + 1)
+               .where(SubmissionRevision.submission_id == submission_id).scalar_subquery())
+    db.session.execute(insert(SubmissionRevision).from_select(
+        ["submission_id", "activity_id", "revision_no", "file_path", "file_sha256", "original_name",
+         "size_bytes", "uploaded_by_student_id", "uploaded_at"],
+        select(literal(submission_id), literal(activity_id), next_no, literal(upload.path), literal(upload.sha256),
+               literal(upload.filename[:255]), literal(upload.size), literal(student_id), literal(now)),
+    ))
+
+def mark_current_revision(submission_id, now):
+    """Keep the version being marked out of the pruner's reach (caller commits)."""
+    latest = db.session.execute(
+        select(SubmissionRevision.id).where(SubmissionRevision.submission_id == submission_id)
+        .order_by(SubmissionRevision.revision_no.desc()).limit(1)
+    ).scalar()
+    if latest:
+        db.session.execute(update(SubmissionRevision).where(SubmissionRevision.id == latest)
+                           .values(marked_at=now).execution_options(synchronize_session=False))
+
+def revisions_of(submission_id):
+    return (SubmissionRevision.query.filter_by(submission_id=submission_id)
+            .order_by(SubmissionRevision.revision_no.desc()).all())
+
+# --- retention ---
+
+def release_files(paths, grace_seconds=BLOB_GRACE_SECONDS):
+    """Delete stored files that no unpruned revision or submission refers to any more. Returns files removed."""
+    paths = sorted({p for p in paths if p})
+    if not paths:
+        return 0
+    used = set(db.session.execute(select(SubmissionRevision.file_path).where(
+        SubmissionRevision.file_path.in_(paths), SubmissionRevision.pruned_at.is_(None))).scalars())
+    used |= set(db.session.execute(select(Submission.file_path).where(Submission.file_path.in_(paths))).scalars())
+    root = os.path.realpath(current_app.config["UPLOAD_FOLDER"])
+    blobs = os.path.join(root, BLOB_DIR) + os.sep
+    cutoff = time.time() - grace_seconds
+    removed = 0
+    for p in paths:
+        if p in used:
+            continue
+        real = os.path.realpath(p)
+        if not real.startswith(root + os.sep):
+            continue
+        try:
+            if real.startswith(blobs) and os.path.getmtime(real) > cutoff:
+                continue  # may have just been uploaded again; uploads-reconcile removes it if not
+            os.remove(real)
+            removed += 1
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            current_app.logger.warning("Could not remove %s: %s", real, e)
+    return removed
+
+def prune_revisions(keep=None, batch_size=500, now=None):
+    """Release all but the last `keep` revisions of every submission (marked versions stay). Returns (revisions, files)."""
+    keep = keep or keep_last()
+    now = now or datetime.utcnow()
+    ranked = select(
+        SubmissionRevision.id, SubmissionRevision.file_path, SubmissionRevision.marked_at,
+        func.row_number().over(partition_by=SubmissionRevision.submission_id,
+                               order_by=SubmissionRevision.revision_no.desc()).label("recency"),
+    ).where(SubmissionRevision.pruned_at.is_(None)).subquery()
+    pruned = removed = 0
+    while True:
+        rows = db.session.execute(
+            select(ranked.c.id, ranked.c.file_path)
+            .where(ranked.c.recency > keep, ranked.c.marked_at.is_(None))
+            .limit(batch_size)
+        ).all()
+        if not rows:
+            return pruned, removed
+        db.session.execute(update(SubmissionRevision).where(SubmissionRevision.id.in_([r.id for r in rows]))
+                           .values(pruned_at=now).execution_options(synchronize_session=False))
+        db.session.commit()
+        pruned += len(rows)
+        removed += release_files(r.file_path for r in rows)
+
+_last_prune = {"at": 0.0}
+
+def schedule_prune(interval_seconds=3600):
+    """Queue prune_revisions on the task pool at most once per interval (per process)."""
+    if time.time() - _last_prune["at"] >= interval_seconds:
+        _last_prune["at"] = time.time()
+        tasks.submit(prune_revisions)
+
+def forget_activity(activity_id):
+    """Drop an activity's revision rows (purge). Returns their file paths for release_files once the submissions are gone."""
+    paths = set(db.session.execute(select(SubmissionRevision.file_path).where(
+        SubmissionRevision.activity_id == activity_id, SubmissionRevision.pruned_at.is_(None))).scalars())
+    db.session.execute(delete(SubmissionRevision).where(SubmissionRevision.activity_id == activity_id))
+    return paths
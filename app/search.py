@@ -0,0 +1,229 @@
+"""
+Admin search across students, accounts, supervisors and groups.
+
+Searchable fields are split into lowercase tokens stored in `search_tokens`
+(token, entity_type) -> entity. Identifiers (student ID, username, group code)
+also get every suffix of 3+ characters, so "0123" still finds "SYN000123". A query
+term matches tokens by prefix, which is an index range scan, so latency does not
+grow with the table the way `ILIKE '%q%'` does. All terms must match: the per-term
+matches are intersected in SQL (GROUP BY entity HAVING every term), and only the
+ranked result is limited. Results are ranked by field weight, exact over prefix matches.
+
+The index is maintained in the same transaction as the change, from an
+after_flush hook. Bulk Core inserts (flask gen-data) bypass it: run
+`flask search-reindex` afterwards. Until the index has been built (e.g. right
+after upgrading), the Students and Accounts filters fall back to ILIKE.
+"""
+import re
+from dataclasses import dataclass
+from itertools import chain
+from flask import url_for
+from sqlalchemy import event, delete, insert, inspect, select, func, tuple_, case, literal, union_all, or_
+from sqlalchemy.orm import Session
+
+from .extensions import db
+from .models import User, StudentMaster, SupervisorProfile, Group, GroupMember, SearchToken
+
+TOKEN_MAX = 64
+SUFFIX_MIN = 3
+MAX_TERMS = 6
+_SPLIT = re.compile(r"[^0-9a-z]+")
+
+# entity type, key attribute, [(field, weight, is_identifier)]
+INDEXED = {
+    StudentMaster: ("student", "student_id", [("student_id", 8, True), ("name", 5, False), ("email", 2, False),
+                                              ("program", 1, False), ("faculty", 1, False), ("batch", 1, False)]),
+    User: ("account", "id", [("username", 8, True)]),
+    SupervisorProfile: ("supervisor", "user_id", [("name", 5, False), ("email", 2, False), ("phone", 2, True)]),
+    Group: ("group", "group_code", [("group_code", 8, True)]),
+}
+TYPE_ORDER = ["student", "account", "supervisor", "group"]
+
+@dataclass
+class SearchResult:
+    type: str
+    id: str
+    title: str
+    subtitle: str
+    url: str
+    score: float
+
+def tokenize(text):
+    text = (text or "").strip().lower()
+    return [t[:TOKEN_MAX] for t in _SPLIT.split(text) if t]
+
+def _field_tokens(value, identifier):
+    """(words, suffixes) of one field value; identifiers also count as one whole word."""
+    words = set(tokenize(value))
+    suffixes = set()
+    if identifier:
+        whole = re.sub(r"\s+", "", (value or "").lower())[:TOKEN_MAX]
+        if whole:
+            words.add(whole)
+            suffixes.update(whole[i:] for i in range(1, len(whole) - SUFFIX_MIN + 1))
+    return words, suffixes - words
+
+def index_rows(obj):
+    """(entity_type, entity_id, rows) for an indexed instance; rows is empty when it must not be found."""
+    etype, key, fields = INDEXED[type(obj)]
+    entity_id = str(getattr(obj, key))
+    if isinstance(obj, User) and obj.deleted_at is not None:
+        return etype, entity_id, []
+    weights = {}
+    for field, weight, identifier in fields:
+        words, suffixes = _field_tokens(getattr(obj, field), identifier)
+        for token in suffixes:
+            weights.setdefault(token, 1)  # suffixes rank below whole words
+        for token in words:
+            weights[token] = max(weights.get(token, 0), weight)
+    rows = [{"entity_type": etype, "entity_id": entity_id, "token": t, "weight": w} for t, w in weights.items()]
+    return etype, entity_id, rows
+
+def _indexed_changed(obj):
+    state = inspect(obj)
+    names = [f for f, _, _ in INDEXED[type(obj)][2]] + (["deleted_at"] if isinstance(obj, User) else [])
+    return any(state.attrs[n].history.has_changes() for n in names)
+
+def _after_flush(session, flush_context):
+    changed = []
+    for obj in chain(session.new, session.dirty, session.deleted):
+        if type(obj) not in INDEXED:
+            continue
+        if obj in session.dirty and not _indexed_changed(obj):
+            continue
+        changed.append(obj)
+    if not changed:
+        return
+    conn = session.connection()
+    keys, rows = [], []
+    for obj in changed:
+        etype, entity_id, obj_rows = index_rows(obj)
+        keys.append((etype, entity_id))
+        if obj not in session.deleted:
+            rows += obj_rows
+    conn.execute(delete(SearchToken).where(tuple_(SearchToken.entity_type, SearchToken.entity_id).in_(keys)))
+    if rows:
+        conn.execute(insert(SearchToken), rows)
+
+def init_search(app):
+    if not event.contains(Session, "after_flush", _after_flush):
+        event.listen(Session, "after_flush", _after_flush)
+
+def remove_from_index(entity_type, entity_id):
+    """For rows removed with Core deletes, which the flush hook never sees."""
+    db.session.execute(delete(SearchToken).where(SearchToken.entity_type == entity_type,
+                                                 SearchToken.entity_id == str(entity_id)))
+
+def rebuild_index(batch=2000, log=print):
+    """Rebuild the whole index, walking each table in primary-key batches. Returns tokens written."""
+    db.session.execute(delete(SearchToken))
+    db.session.commit()
+    total = 0
+    for model in INDEXED:
+        pk = model.__mapper__.primary_key[0]
+        last = None
+        while True:
+            stmt = select(model).order_by(pk).limit(batch)
+            if last is not None:
+                stmt = stmt.where(pk > last)
+            objs = db.session.execute(stmt).scalars().all()
+            if not objs:
+                break
+            rows = [row for obj in objs for row in index_rows(obj)[2]]
+            if rows:
+                db.session.execute(insert(SearchToken), rows)
+            db.session.commit()
+            total += len(rows)
+            last = getattr(objs[-1], pk.key)
+            db.session.expunge_all()
+        log(f"  indexed {INDEXED[model][0]}s")
+    return total
+
+# --- querying ---
+
+def _escape_like(term):
+    return term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+def match(q, types=None, limit=None):
+    """{(entity_type, entity_id): score} for entities matching every term of `q`, best first."""
+    terms = list(dict.fromkeys(tokenize(q)))[:MAX_TERMS]
+    if not terms:
+        return {}
+    per_term = []
+    for i, term in enumerate(terms):
+        score = SearchToken.weight * case((SearchToken.token == term, 2.0),
+                                          else_=literal(float(len(term))) / func.length(SearchToken.token))
+        stmt = (select(SearchToken.entity_type, SearchToken.entity_id, literal(i).label("term"),
+                       func.max(score).label("score"))
+                .where(SearchToken.token.like(_escape_like(term) + "%", escape="\\"))
+                .group_by(SearchToken.entity_type, SearchToken.entity_id))
+        if types:
+            stmt = stmt.where(SearchToken.entity_type.in_(types))
+        per_term.append(stmt)
+    hits = union_all(*per_term).subquery("hits") if len(per_term) > 1 else per_term[0].subquery("hits")
+    total = func.sum(hits.c.score)
+    stmt = (select(hits.c.entity_type, hits.c.entity_id, total)
+            .group_by(hits.c.entity_type, hits.c.entity_id)
+            .having(func.count(hits.c.term.distinct()) == len(terms))
+            .order_by(total.desc(), case({t: n for n, t in enumerate(TYPE_ORDER)}, value=hits.c.entity_type),
+                      hits.c.entity_id))
+    if limit:
+        stmt = stmt.limit(limit)
+    return {(etype, entity_id): float(score) for etype, entity_id, score in db.session.execute(stmt)}
+
+def search_ids(q, entity_type, limit=1000):
+    """Best matching ids of one type (strings), highest score first."""
+    return [entity_id for _, entity_id in match(q, [entity_type], limit)]
+
+_built = {"index": False}
+
+def index_built():
+    """True once search_tokens has any rows (checked until it does, then remembered per process)."""
+    if not _built["index"]:
+        _built["index"] = db.session.execute(select(SearchToken.entity_id).limit(1)).first() is not None
+    return _built["index"]
+
+def search_filter(q, entity_type, key, like_columns):
+    """
+    Criterion for a list page filter: `key` among the index matches, or a substring
+    match on `like_columns` while the index is still empty (before `flask search-reindex`).
+    """
+    if not index_built():
+        return or_(*[col.ilike(f"%{q}%") for col in like_columns])
+    convert = key.type.python_type
+    return key.in_([convert(i) for i in search_ids(q, entity_type)])
+
+def search(q, types=None, limit=20):
+    """Typed, ranked SearchResult list."""
+    ranked = list(match(q, types, limit).items())
+    by_type = {}
+    for (etype, entity_id), _ in ranked:
+        by_type.setdefault(etype, []).append(entity_id)
+
+    found = {}
+    if by_type.get("student"):
+        for sm in StudentMaster.query.filter(StudentMaster.student_id.in_(by_type["student"])):
+            found[("student", sm.student_id)] = (sm.name, " · ".join(filter(None, [sm.student_id, sm.program, sm.batch])),
+                                                 url_for("admin.students", q=sm.student_id))
+    if by_type.get("account"):
+        for u in User.query.filter(User.id.in_([int(i) for i in by_type["account"]])):
+            found[("account", str(u.id))] = (u.username, u.role + ("" if u.active else " · inactive"),
+                                             url_for("admin.accounts", q=u.username, role=u.role))
+    if by_type.get("supervisor"):
+        rows = (db.session.query(SupervisorProfile).join(User, User.id == SupervisorProfile.user_id)
+                .filter(SupervisorProfile.user_id.in_([int(i) for i in by_type["supervisor"]])))
+        for sp in rows:
+            found[("supervisor", str(sp.user_id))] = (sp.name, " · ".join(filter(None, [sp.email, sp.phone])),
+                                                      url_for("admin.supervisors"))
+    if by_type.get("group"):
+        sizes = dict(db.session.query(GroupMember.group_code, func.count(GroupMember.id))
+                     .filter(GroupMember.group_code.in_(by_type["group"])).group_by(GroupMember.group_code))
+        for (code,) in db.session.query(Group.group_code).filter(Group.group_code.in_(by_type["group"])):
+            found[("group", code)] = (code, f"{sizes.get(code, 0)} members", url_for("admin.assigning"))
+
+    results = []
+    for key, score in ranked:
+        if key in found:  # index entries of rows purged with Core deletes are skipped
+            title, subtitle, url = found[key]
+            results.append(SearchResult(key[0], key[1], title, subtitle, url, round(score, 2)))
+    return results
@@ -0,0 +1,153 @@
+"""
+Production server (`flask serve`).
+
+POSIX: gunicorn with preloaded app, N forked workers x M threads (gthread).
+Windows/XAMPP: waitress (one process, M threads) since gunicorn cannot fork there.
+
+The app is built once; templates are compiled before forking so workers share them.
+Each worker then warms its own DB pool and settings caches before it accepts
+connections. /healthz answers as soon as the process is up, /readyz only once the
+worker is warm, and turns 503 again while draining on SIGTERM/SIGINT.
+"""
+import signal
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from sqlalchemy import text
+
+from .extensions import db
+from .config_cache import config_cache, LOADERS
+from .tasks import tasks
+from .audit import audit_writer
+from . import metrics
+
+def compile_templates(app):
+    """Load (and so compile/cache) every Jinja template."""
+    env = app.jinja_env
+    names = [n for n in env.list_templates() if n.endswith(".html")]
+    for name in names:
+        env.get_template(name)
+    return len(names)
+
+def warm_db(app, connections):
+    """Open up to `connections` pooled connections per engine (concurrently, so the pool really grows)."""
+    with app.app_context():
+        engines = list(db.engines.values())
+
+    def ping(engine):
+        with engine.connect() as conn:
+            conn.execute(text("SELECT 1"))
+            time.sleep(0.05)  # hold it so the other pings need their own connection
+
+    opened = 0
+    for engine in engines:
+        n = max(1, min(connections, getattr(engine.pool, "size", lambda: connections)()))
+        with ThreadPoolExecutor(max_workers=n) as pool:
+            list(pool.map(ping, [engine] * n))
+        opened += n
+    return opened
+
+def warm_caches(app):
+    with app.app_context():
+        for key in LOADERS:
+            config_cache.get(key)
+        db.session.remove()
+
+def warm_worker(app, threads, log=print):
+    started = time.perf_counter()
+    conns = warm_db(app, threads)
+    warm_caches(app)
+    app.extensions["lifecycle"]["ready"] = True
+    log(f"worker warm in {(time.perf_counter() - started) * 1000:.0f} ms ({conns} DB connections)")
+
+def dispose_engines(app):
+    # connections opened before fork must not be shared with the children
+    with app.app_context():
+        for engine in db.engines.values():
+            engine.dispose(close=False)
+
+def drain(app):
+    app.extensions["lifecycle"]["draining"] = True
+
+def finish(app):
+    """Let background work finish before the process exits."""
+    tasks.shutdown(wait=True)
+    audit_writer.close()
+
+def serve(app, host="0.0.0.0", port=8000, workers=2, threads=8, timeout=60, graceful_timeout=30,
+          server="auto", log=print):
+    if server == "auto":
+        server = "waitress" if sys.platform == "win32" else "gunicorn"
+    app.extensions["lifecycle"]["ready"] = False
+    log(f"compiled {compile_templates(app)} templates")
+    if server == "gunicorn":
+        return _serve_gunicorn(app, host, port, workers, threads, timeout, graceful_timeout, log)
+    if server == "waitress":
+        return _serve_waitress(app, host, port, threads, graceful_timeout, log)
+    raise ValueError(f"Unknown server {server!r}")
+
+def _serve_gunicorn(app, host, port, workers, threads, timeout, graceful_timeout, log):
+    try:
+        from gunicorn.app.base import BaseApplication
+    except ImportError:
+        raise RuntimeError("gunicorn is not installed (pip install gunicorn), or use --server waitress")
+
+    def post_fork(server, worker):
+        dispose_engines(app)
+        warm_worker(app, threads, log=worker.log.info)
+
+    def worker_int(worker):
+        drain(app)
+
+    def worker_exit(server, worker):
+        drain(app)
+        finish(app)
+
+    def child_exit(server, worker):
+        metrics.mark_worker_dead(worker.pid)
+
+    class Server(BaseApplication):
+        def load_config(self):
+            for key, value in {
+                "bind": f"{host}:{port}", "workers": workers, "threads": threads, "worker_class": "gthread",
+                "preload_app": True, "timeout": timeout, "graceful_timeout": graceful_timeout,
+                "post_fork": post_fork, "worker_int": worker_int, "worker_exit": worker_exit,
+                "child_exit": child_exit,
+                "accesslog": "-",
+            }.items():
+                self.cfg.set(key, value)
+
+        def load(self):
+            return app
+
+    if metrics.MULTIPROC_DIR:
+        metrics.clear_multiproc_dir()
+    elif workers > 1 and app.extensions.get("metrics") is not None:
+        log("PROMETHEUS_MULTIPROC_DIR is not set: /metrics will only show the worker that answers")
+    dispose_engines(app)
+    Server().run()
+
+def _serve_waitress(app, host, port, threads, graceful_timeout, log):
+    try:
+        from waitress.server import create_server
+    except ImportError:
+        raise RuntimeError("waitress is not installed (pip install waitress)")
+
+    server = create_server(app, host=host, port=port, threads=threads, channel_timeout=graceful_timeout)
+    warm_worker(app, threads, log=log)
+
+    def stop(signum, frame):
+        log("shutting down: draining requests")
+        drain(app)
+        server.close()  # stop accepting; in-flight requests complete
+
+    signal.signal(signal.SIGINT, stop)
+    signal.signal(signal.SIGTERM, stop)
+    log(f"serving on http://{host}:{port} ({threads} threads)")
+    try:
+        server.run()
+    except (OSError, ValueError):
+        pass  # raised by the select loop once the listening socket is closed
+    finally:
+        server.task_dispatcher.shutdown(timeout=graceful_timeout)
+        finish(app)
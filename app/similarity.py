@@ -0,0 +1,258 @@
+"""
+Similarity index over submitted PDFs (near-identical reports, reused theses).
+
+Each submission's PDF text is reduced to a set of word 5-grams ("shingles") and a
+MinHash signature of NUM_PERM values; the share of equal values between two
+signatures estimates the Jaccard similarity of their shingle sets. Signatures are
+cut into BANDS bands of ROWS values and each band is hashed into `similarity_buckets`
+(locality-sensitive hashing): two documents land in a common bucket with high
+probability when they are similar and rarely otherwise, so the candidates for a
+submission are a handful of indexed lookups however many documents are stored.
+Candidates are then checked against the full signatures and SIMILARITY_THRESHOLD.
+
+Text extraction and hashing are CPU-bound: `flask similarity-index` runs them in a
+process pool (SIMILARITY_WORKERS). New and replaced files are indexed one by one in
+the background after they are submitted. Fingerprints are keyed by submission id,
+which archival keeps, so last year's work is still matched.
+Requires `pypdf`; without it nothing is indexed.
+"""
+import hashlib
+import os
+import re
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from datetime import datetime
+import numpy as np
+from flask import current_app
+from sqlalchemy import select, delete, insert, or_, and_, func
+from sqlalchemy.orm import aliased
+
+try:
+    import pypdf
+except ImportError:  # optional: similarity indexing is skipped without it
+    pypdf = None
+
+from .extensions import db
+from .models import (
+    Submission, Activity, SubmissionArchive, ActivityArchive, SubmissionFingerprint, SimilarityBucket,
+)
+
+NUM_PERM = 128
+BANDS, ROWS = 32, 4  # candidate pairs from ~42% similarity upwards: (1/BANDS) ** (1/ROWS)
+SHINGLE_WORDS = 5
+# permutations h(x) = (a*x + b) mod p over crc32 values: with p < 2**32 and a, b < p,
+# a*x + b stays below 2**64, so the uint64 arithmetic below never wraps
+_PRIME = np.uint64(4294967291)  # largest prime below 2**32
+_MASK = np.uint64(0xFFFFFFFF)
+_rng = np.random.RandomState(1729)  # fixed: signatures must stay comparable across runs and processes
+_A = _rng.randint(1, int(_PRIME), NUM_PERM, dtype=np.uint64)
+_B = _rng.randint(0, int(_PRIME), NUM_PERM, dtype=np.uint64)
+_WORD = re.compile(r"[a-z0-9]+")
+
+# --- pure functions (run in pool processes; no app context) ---
+
+def extract_text(path, max_pages):
+    reader = pypdf.PdfReader(path)
+    return "\n".join((page.extract_text() or "") for page in reader.pages[:max_pages])
+
+def shingles(text, k=SHINGLE_WORDS):
+    words = _WORD.findall(text.lower())
+    if len(words) < k:
+        return {" ".join(words)} if words else set()
+    return {" ".join(words[i:i + k]) for i in range(len(words) - k + 1)}
+
+def minhash(shingle_set, chunk=4096):
+    """Signature of NUM_PERM uint32 values: per permutation, the minimum hash over all shingles."""
+    hashes = np.fromiter((zlib.crc32(s.encode()) for s in shingle_set), dtype=np.uint64, count=len(shingle_set))
+    hashes %= _PRIME
+    sig = np.full(NUM_PERM, _MASK, dtype=np.uint64)
+    for i in range(0, len(hashes), chunk):
+        permuted = (np.outer(hashes[i:i + chunk], _A) + _B) % _PRIME
+        np.minimum(sig, permuted.min(axis=0), out=sig)
+    return sig.astype("<u4")
+
+def fingerprint_file(path, max_pages=300):
+    """(signature bytes or None, shingle count, error or None) for one file."""
+    if pypdf is None:
+        return None, 0, "pypdf is not installed"
+    if not path.lower().endswith(".pdf"):
+        return None, 0, "not a PDF"
+    try:
+        text = extract_text(path, max_pages)
+    except FileNotFoundError:
+        return None, 0, "file missing"
+    except Exception as e:  # malformed / encrypted PDFs: record and move on
+        return None, 0, f"unreadable: {e}"[:255]
+    grams = shingles(text)
+    if not grams:
+        return None, 0, "no extractable text"
+    return minhash(grams).tobytes(), len(grams), None
+
+def band_buckets(signature):
+    """[(band, bucket)] of a signature; the bucket is a signed 64-bit hash (fits BIGINT)."""
+    out = []
+    for band in range(BANDS):
+        chunk = signature[band * ROWS * 4:(band + 1) * ROWS * 4]
+        out.append((band, int.from_bytes(hashlib.blake2b(chunk, digest_size=8).digest(), "little", signed=True)))
+    return out
+
+def similarity(sig_a, sig_b):
+    return float(np.mean(np.frombuffer(sig_a, dtype="<u4") == np.frombuffer(sig_b, dtype="<u4")))
+
+# --- indexing ---
+
+def _stale_submissions(limit, ids=None):
+    """Live submissions with a file whose fingerprint is missing or was taken from another file."""
+    stmt = (
+        select(Submission.id, Submission.activity_id, Submission.file_path, Submission.file_sha256)
+        .outerjoin(SubmissionFingerprint, SubmissionFingerprint.submission_id == Submission.id)
+        .where(
+            Submission.file_path.isnot(None),
+            or_(
+                SubmissionFingerprint.submission_id.is_(None),
+                SubmissionFingerprint.file_path != Submission.file_path,
+                SubmissionFingerprint.file_sha256.is_distinct_from(Submission.file_sha256),
+            ),
+        )
+        .order_by(Submission.id)
+        .limit(limit)
+    )
+    if ids is not None:
+        stmt = stmt.where(Submission.id.in_(ids))
+    return db.session.execute(stmt).all()
+
+def _store(rows, results, now):
+    ids = [r.id for r in rows]
+    db.session.execute(delete(SimilarityBucket).where(SimilarityBucket.submission_id.in_(ids)))
+    db.session.execute(delete(SubmissionFingerprint).where(SubmissionFingerprint.submission_id.in_(ids)))
+    prints, buckets = [], []
+    for r, (signature, count, error) in zip(rows, results):
+        prints.append({"submission_id": r.id, "activity_id": r.activity_id, "file_path": r.file_path,
+                       "file_sha256": r.file_sha256, "signature": signature, "shingles": count,
+                       "error": error, "indexed_at": now})
+        if signature:
+            buckets += [{"band": band, "bucket": bucket, "submission_id": r.id, "activity_id": r.activity_id}
+                        for band, bucket in band_buckets(signature)]
+    db.session.execute(insert(SubmissionFingerprint), prints)
+    if buckets:
+        db.session.execute(insert(SimilarityBucket), buckets)
+    db.session.commit()
+
+def index_pending(workers=None, batch_size=200, ids=None, log=print):
+    """
+    Fingerprint every submission that needs it (or just `ids`). With more than one
+    worker the PDFs are processed in a process pool. Returns (indexed, failed).
+    """
+    if pypdf is None:
+        raise RuntimeError("pypdf is not installed; similarity indexing is unavailable.")
+    config = current_app.config
+    workers = workers if workers is not None else int(config.get("SIMILARITY_WORKERS", 0)) or os.cpu_count() or 1
+    max_pages = int(config.get("SIMILARITY_MAX_PAGES", 300))
+    pool = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+    indexed = failed = 0
+    try:
+        while True:
+            rows = _stale_submissions(batch_size, ids)
+            if not rows:
+                break
+            paths = [r.file_path for r in rows]
+            pages = [max_pages] * len(rows)
+            results = list(pool.map(fingerprint_file, paths, pages, chunksize=4) if pool
+                           else map(fingerprint_file, paths, pages))
+            _store(rows, results, datetime.utcnow())
+            indexed += sum(1 for sig, _, _ in results if sig)
+            failed += sum(1 for sig, _, _ in results if not sig)
+            log(f"  fingerprinted {indexed + failed} submissions ({failed} without text)")
+    finally:
+        if pool:
+            pool.shutdown()
+    return indexed, failed
+
+def index_submission(submission_id):
+    """Background task after a (re)submission: fingerprint one file in this thread."""
+    if pypdf is not None:
+        index_pending(workers=1, ids=[submission_id], log=lambda *a: None)
+
+def remove_activity(activity_id):
+    """Drop the fingerprints of an activity's submissions (purge)."""
+    db.session.execute(delete(SimilarityBucket).where(SimilarityBucket.activity_id == activity_id))
+    db.session.execute(delete(SubmissionFingerprint).where(SubmissionFingerprint.activity_id == activity_id))
+
+def clear_index():
+    db.session.execute(delete(SimilarityBucket))
+    db.session.execute(delete(SubmissionFingerprint))
+    db.session.commit()
+
+# --- report ---
+
+@dataclass
+class SubmissionRef:
+    id: int
+    group_code: str
+    activity_id: int
+    activity_title: str
+    academic_year: str | None  # set for archived submissions
+    file_path: str | None
+
+@dataclass
+class SimilarPair:
+    similarity: float
+    submission: SubmissionRef  # the one in the activity being reported on
+    other: SubmissionRef
+
+def _refs(ids):
+    live = db.session.execute(
+        select(Submission.id, Submission.group_code, Activity.id, Activity.title, Submission.file_path)
+        .join(Activity, Activity.id == Submission.activity_id)
+        .where(Submission.id.in_(ids))
+        .execution_options(include_deleted=True)
+    ).all()
+    refs = {r[0]: SubmissionRef(r[0], r[1], r[2], r[3], None, r[4]) for r in live}
+    missing = [i for i in ids if i not in refs]
+    if missing:
+        archived = db.session.execute(
+            select(SubmissionArchive.id, SubmissionArchive.group_code, ActivityArchive.id, ActivityArchive.title,
+                   SubmissionArchive.academic_year, SubmissionArchive.file_path)
+            .join(ActivityArchive, ActivityArchive.id == SubmissionArchive.activity_id)
+            .where(SubmissionArchive.id.in_(missing))
+        ).all()
+        refs.update({r[0]: SubmissionRef(*r) for r in archived})
+    return refs
+
+def activity_report(activity_id, threshold=None, limit=200):
+    """
+    Pairs involving a submission of this activity whose estimated similarity reaches the
+    threshold: with each other, and with any other (also archived) submission. Most similar first.
+    """
+    threshold = threshold if threshold is not None else float(current_app.config.get("SIMILARITY_THRESHOLD", 0.5))
+    a, b = aliased(SimilarityBucket), aliased(SimilarityBucket)
+    candidates = db.session.execute(
+        select(a.submission_id, b.submission_id).distinct()
+        .join(b, and_(b.band == a.band, b.bucket == a.bucket, b.submission_id != a.submission_id))
+        .where(a.activity_id == activity_id,
+               or_(b.activity_id != activity_id, a.submission_id < b.submission_id))  # each inner pair once
+    ).all()
+    if not candidates:
+        return []
+    ids = {i for pair in candidates for i in pair}
+    sigs = dict(db.session.execute(
+        select(SubmissionFingerprint.submission_id, SubmissionFingerprint.signature)
+        .where(SubmissionFingerprint.submission_id.in_(ids))
+    ).all())
+    scored = [(similarity(sigs[x], sigs[y]), x, y) for x, y in candidates if sigs.get(x) and sigs.get(y)]
+    scored = sorted((s for s in scored if s[0] >= threshold), reverse=True)[:limit]
+    refs = _refs(sorted({i for _, x, y in scored for i in (x, y)}))
+    return [SimilarPair(round(s, 3), refs[x], refs[y]) for s, x, y in scored if x in refs and y in refs]
+
+def index_status(activity_id):
+    """(submissions with a file, fingerprinted, without text) for one activity."""
+    with_file = db.session.execute(
+        select(func.count()).select_from(Submission)
+        .where(Submission.activity_id == activity_id, Submission.file_path.isnot(None))
+    ).scalar()
+    done, no_text = db.session.execute(
+        select(func.count(), func.count(SubmissionFingerprint.error))
+        .where(SubmissionFingerprint.activity_id == activity_id)
+    ).one()
+    return with_file, done, no_text
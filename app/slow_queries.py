@@ -0,0 +1,179 @@
+"""
+Slow-query log (admin page: /admin/slow-queries).
+
+A cursor-level hook times every statement; anything slower than SLOW_QUERY_MS is
+appended to a JSONL file with its SQL (placeholders only, bound values are never
+written), the route or command that issued it and the duration. The first slow
+run of each statement fingerprint, and then at most one run every
+SLOW_QUERY_EXPLAIN_SECONDS, is EXPLAINed in the background on a separate
+connection and the plan is logged too. The file is rotated to `<path>.1` once it
+passes SLOW_QUERY_LOG_MAX_MB, so at most twice that is kept on disk.
+"""
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from datetime import datetime
+from flask import has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from .tasks import tasks
+
+EXPLAINABLE = ("select", "update", "delete", "with")
+SKIP_OPTION = "slow_query_log"  # execution_options(slow_query_log=False) opts a statement out
+
+_STRING = re.compile(r"'(?:[^'\\]|\\.|'')*'")
+_NUMBER = re.compile(r"\b\d+(?:\.\d+)?\b")
+_IN_LIST = re.compile(r"\(\s*(?:\?|%s|%\(\w+\)s|:\w+)(?:\s*,\s*(?:\?|%s|%\(\w+\)s|:\w+))*\s*\)")
+_PLACEHOLDER = re.compile(r"%\(\w+\)s|%s|:\w+|\?")
+_SPACE = re.compile(r"\s+")
+
+def normalize(statement: str) -> str:
+    """SQL with literals and placeholders replaced by ?, IN lists collapsed, whitespace squeezed."""
+    sql = _STRING.sub("?", statement)
+    sql = _NUMBER.sub("?", sql)
+    sql = _PLACEHOLDER.sub("?", sql)
+    sql = _IN_LIST.sub("(...)", sql)
+    return _SPACE.sub(" ", sql).strip()
+
+def fingerprint(normalized: str) -> str:
+    return hashlib.sha1(normalized.lower().encode("utf-8")).hexdigest()[:12]
+
+def _source():
+    if has_request_context():
+        return f"{request.method} {request.endpoint or request.path}"
+    return f"thread:{threading.current_thread().name}"
+
+class SlowQueryLog:
+    def __init__(self, app=None):
+        self.threshold = 0.0
+        self.path = None
+        self._write_lock = threading.Lock()
+        self._explained = {}  # fingerprint -> monotonic time of the last EXPLAIN
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.threshold = float(app.config.get("SLOW_QUERY_MS", 500)) / 1000.0
+        self.path = app.config.get("SLOW_QUERY_LOG_PATH") or os.path.join(app.instance_path, "slow_queries.jsonl")
+        self.max_bytes = int(float(app.config.get("SLOW_QUERY_LOG_MAX_MB", 5)) * 1024 * 1024)
+        self.explain_seconds = float(app.config.get("SLOW_QUERY_EXPLAIN_SECONDS", 600))
+        app.extensions["slow_queries"] = self
+        if self.threshold > 0 and not event.contains(Engine, "before_cursor_execute", _before_execute):
+            event.listen(Engine, "before_cursor_execute", _before_execute)
+            event.listen(Engine, "after_cursor_execute", _after_execute)
+
+    # --- recording ---
+
+    def record(self, conn, statement, parameters, elapsed, executemany):
+        normalized = normalize(statement)
+        fp = fingerprint(normalized)
+        self._append({
+            "at": datetime.utcnow().isoformat(timespec="seconds"),
+            "fp": fp,
+            "ms": round(elapsed * 1000, 1),
+            "sql": normalized[:4000],
+            "params": len(parameters) if isinstance(parameters, (list, tuple, dict)) else 0,
+            "source": _source(),
+        })
+        if not executemany and self._should_explain(fp, statement):
+            tasks.submit(_explain, conn.engine, statement, parameters, fp)
+
+    def _should_explain(self, fp, statement):
+        if not statement.lstrip().lower().startswith(EXPLAINABLE):
+            return False
+        now = time.monotonic()
+        last = self._explained.get(fp)
+        if last is not None and now - last < self.explain_seconds:
+            return False
+        self._explained[fp] = now
+        return True
+
+    def _append(self, entry):
+        line = json.dumps(entry, default=str) + "\n"
+        with self._write_lock:
+            try:
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+                if os.path.exists(self.path) and os.path.getsize(self.path) + len(line) > self.max_bytes:
+                    os.replace(self.path, self.path + ".1")
+                with open(self.path, "a", encoding="utf-8") as f:
+                    f.write(line)
+            except OSError:
+                pass  # logging must never break the query that triggered it
+
+    # --- reading (admin page) ---
+
+    def _entries(self):
+        for path in (self.path + ".1", self.path):
+            try:
+                with open(path, encoding="utf-8") as f:
+                    for line in f:
+                        try:
+                            yield json.loads(line)
+                        except ValueError:
+                            continue  # partial line from a concurrent rotation
+            except FileNotFoundError:
+                continue
+
+    def summary(self, sort="total", limit=50):
+        """Slow statements grouped by fingerprint, worst first."""
+        groups = {}
+        for e in self._entries():
+            g = groups.get(e["fp"])
+            if g is None:
+                g = groups[e["fp"]] = {"fp": e["fp"], "sql": e.get("sql"), "count": 0, "total_ms": 0.0,
+                                       "max_ms": 0.0, "last_at": None, "sources": {}, "plan": None}
+            if "plan" in e:
+                g["plan"], g["plan_at"] = e["plan"], e["at"]
+                continue
+            g["count"] += 1
+            g["total_ms"] += e["ms"]
+            g["max_ms"] = max(g["max_ms"], e["ms"])
+            g["last_at"] = e["at"]
+            g["sources"][e["source"]] = g["sources"].get(e["source"], 0) + 1
+            g["sql"] = e.get("sql") or g["sql"]
+        rows = [g for g in groups.values() if g["count"]]
+        for g in rows:
+            g["avg_ms"] = g["total_ms"] / g["count"]
+            g["sources"] = sorted(g["sources"].items(), key=lambda kv: -kv[1])[:3]
+        key = {"total": "total_ms", "max": "max_ms", "count": "count", "avg": "avg_ms"}.get(sort, "total_ms")
+        rows.sort(key=lambda g: g[key], reverse=True)
+        return rows[:limit]
+
+    def clear(self):
+        with self._write_lock:
+            for path in (self.path, self.path + ".1"):
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+        self._explained.clear()
+
+slow_query_log = SlowQueryLog()
+
+def _before_execute(conn, cursor, statement, parameters, context, executemany):
+    if context is not None:
+        context._slow_query_started = time.perf_counter()
+
+def _after_execute(conn, cursor, statement, parameters, context, executemany):
+    started = getattr(context, "_slow_query_started", None)
+    if started is None:
+        return
+    elapsed = time.perf_counter() - started
+    if elapsed < slow_query_log.threshold or context.execution_options.get(SKIP_OPTION, True) is False:
+        return
+    slow_query_log.record(conn, statement, parameters, elapsed, executemany)
+
+def _explain(engine, statement, parameters, fp):
+    """Runs in the task pool: EXPLAIN the statement with its real parameters, log the plan."""
+    prefix = "EXPLAIN QUERY PLAN " if engine.dialect.name == "sqlite" else "EXPLAIN "
+    with engine.connect() as conn:
+        result = conn.exec_driver_sql(prefix + statement, parameters,
+                                      execution_options={SKIP_OPTION: False})
+        columns = list(result.keys())
+        plan = [dict(zip(columns, row)) for row in result]
+        conn.rollback()
+    slow_query_log._append({"at": datetime.utcnow().isoformat(timespec="seconds"), "fp": fp, "plan": plan})
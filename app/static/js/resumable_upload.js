@@ -0,0 +1,99 @@
+/*
+ * Resumable upload for the activity submit form.
+ * Files larger than one chunk are sent in chunks (initiate -> PUT chunk N -> finalize).
+ * A failed chunk is retried with backoff; if the connection stays down, pressing
+ * "Save Submission" again with the same file resumes from the chunks the server has.
+ * Falls back to the plain form post where crypto.subtle is unavailable (plain http).
+ */
+(function () {
+  var form = document.querySelector("form[data-resumable-init]");
+  if (!form || !window.fetch || !(window.crypto && window.crypto.subtle)) return;
+
+  var input = form.querySelector("input[type=file]");
+  var threshold = parseInt(form.dataset.chunkThreshold, 10);
+  var token = form.querySelector("input[name=csrf_token]").value;
+  var status = document.getElementById("resumableStatus");
+  var bar = status.querySelector(".progress-bar");
+  var msg = status.querySelector(".resumable-msg");
+
+  function url(action, id, index) {
+    return form.dataset.resumableBase.replace("__id__", id) + action + (index !== undefined ? "/" + index : "");
+  }
+
+  function show(text, pct, cls) {
+    status.classList.remove("d-none");
+    msg.textContent = text;
+    msg.className = "resumable-msg small mt-1 " + (cls || "text-muted");
+    if (pct !== undefined) { bar.style.width = pct + "%"; bar.textContent = pct + "%"; }
+  }
+
+  function hex(buf) {
+    return Array.prototype.map.call(new Uint8Array(buf), function (b) { return ("0" + b.toString(16)).slice(-2); }).join("");
+  }
+
+  function call(method, target, body, type) {
+    var headers = { "X-CSRFToken": token };
+    if (type) headers["Content-Type"] = type;
+    return fetch(target, { method: method, body: body, headers: headers, credentials: "same-origin" }).then(function (r) {
+      return r.json().catch(function () { return {}; }).then(function (data) {
+        if (r.ok) return data;
+        var err = new Error(data.error || ("HTTP " + r.status));
+        err.fatal = r.status >= 400 && r.status < 500;  // validation errors are not retried
+        throw err;
+      });
+    });
+  }
+
+  function retry(fn, attempt) {
+    attempt = attempt || 0;
+    return fn().catch(function (err) {
+      if (err.fatal || attempt >= 6) throw err;
+      var wait = Math.min(30000, 1000 * Math.pow(2, attempt));
+      show("Connection problem, retrying in " + wait / 1000 + "s…", undefined, "text-warning");
+      return new Promise(function (res) { setTimeout(res, wait); }).then(function () { return retry(fn, attempt + 1); });
+    });
+  }
+
+  form.addEventListener("submit", function (e) {
+    var file = input.files[0];
+    if (!file || file.size <= threshold) return;  // small files: normal streamed post
+    e.preventDefault();
+    var button = form.querySelector("button[type=submit]");
+    button.disabled = true;
+    show("Preparing upload…", 0);
+
+    file.arrayBuffer()
+      .then(function (buf) { return crypto.subtle.digest("SHA-256", buf); })
+      .then(function (digest) {
+        var body = JSON.stringify({ filename: file.name, size: file.size, sha256: hex(digest) });
+        return retry(function () { return call("POST", form.dataset.resumableInit, body, "application/json"); });
+      })
+      .then(function (state) {
+        var have = {};
+        state.received.forEach(function (r) { for (var i = r[0]; i <= r[1]; i++) have[i] = true; });
+        var done = Object.keys(have).length;
+        var chain = Promise.resolve();
+        for (var i = 0; i < state.total_chunks; i++) {
+          if (have[i]) continue;
+          (function (i) {
+            chain = chain.then(function () {
+              var blob = file.slice(i * state.chunk_size, (i + 1) * state.chunk_size);
+              return retry(function () { return call("PUT", url("/chunks", state.upload_id, i), blob, "application/octet-stream"); });
+            }).then(function () {
+              done += 1;
+              show("Uploading… (" + done + "/" + state.total_chunks + " parts)", Math.round(done * 100 / state.total_chunks));
+            });
+          })(i);
+        }
+        return chain.then(function () {
+          show("Verifying file…", 100);
+          return retry(function () { return call("POST", url("/finalize", state.upload_id)); });
+        });
+      })
+      .then(function (res) { window.location = res.redirect; })
+      .catch(function (err) {
+        button.disabled = false;
+        show(err.fatal ? err.message : "Upload paused: " + err.message + ". Press Save Submission again to resume.", undefined, "text-danger");
+      });
+  });
+})();
@@ -0,0 +1,148 @@
+"""
+Submission fast path for the submit form and resumable-upload finalize.
+
+In the minutes before a deadline hundreds of groups submit at once. `submit_gate`
+reads everything the rules need in one query: the student's group, the activity,
+whether it targets the group, and the group's current submission. `save_submission`
+then writes the row with one statement in the caller's transaction:
+
+- first submission: INSERT. The unique (activity_id, group_code) key means two
+  members submitting together cannot create two rows; the second one becomes a resubmission;
+- resubmission: UPDATE ... WHERE id = :id AND status = :status_seen, so a
+  submission the supervisor marked in the meantime is never reopened.
+
+These are Core statements, which the after_flush hook in app/counters.py does not
+see, so the Activity counters are moved here in the same transaction. An uploaded
+file goes to the blob store once the row is written, and is recorded as the next
+revision (app/revisions.py); when the row cannot be written the upload is deleted.
+"""
+import os
+from dataclasses import dataclass
+from datetime import datetime
+from sqlalchemy import select, insert, update, exists, and_, or_
+from sqlalchemy.exc import IntegrityError
+
+from .extensions import db
+from .models import StudentAccount, Activity, ActivityTarget, Submission
+from .counters import STATUS_COLUMNS
+from .read_models import Record
+from .revisions import blob_path_of, store_blob, add_revision
+
+class SubmissionClosed(Exception):
+    """The submission cannot be saved; the message is safe to show to the user."""
+
+class ActivityInfo(Record):
+    __slots__ = ("id", "title", "deadline_at", "require_pdf", "max_file_mb")
+
+@dataclass
+class SubmitGate:
+    student_id: str | None
+    group_code: str | None
+    activity: ActivityInfo | None  # None: no such activity (or deleted)
+    eligible: bool
+    submission_id: int | None
+    status: str | None  # of the current submission
+
+    def error(self, now=None):
+        """The message that refuses this submission, or None when it may go ahead."""
+        now = now or datetime.utcnow()
+        if not self.group_code:
+            return "You must be in a group."
+        if not self.eligible:
+            return "This activity is not assigned to your group."
+        if self.status == "Marked":
+            return "This activity is already marked. You cannot resubmit."
+        if self.activity.deadline_at and now > self.activity.deadline_at:
+            return "Deadline has passed. Submission is locked."
+        return None
+
+def submit_gate(user_id, activity_id):
+    """Everything the submission rules need for one student and activity, in one round trip."""
+    targeted = exists().where(ActivityTarget.activity_id == Activity.id,
+                              ActivityTarget.group_code == StudentAccount.group_code)
+    row = db.session.execute(
+        select(StudentAccount.student_id, StudentAccount.group_code,
+               Activity.id, Activity.title, Activity.deadline_at, Activity.require_pdf, Activity.max_file_mb,
+               or_(Activity.scope_all_groups == True, targeted).label("eligible"),
+               Submission.id, Submission.status)
+        .select_from(StudentAccount)
+        .outerjoin(Activity, and_(Activity.id == activity_id, Activity.deleted_at.is_(None)))
+        .outerjoin(Submission, and_(Submission.activity_id == Activity.id,
+                                    Submission.group_code == StudentAccount.group_code))
+        .where(StudentAccount.user_id == user_id)
+        .limit(1)
+        .execution_options(include_deleted=True)  # the join condition already hides deleted activities
+    ).first()
+    if row is None:
+        return SubmitGate(None, None, None, False, None, None)
+    student_id, group_code, act_id, *act, eligible, sub_id, status = row
+    activity = ActivityInfo(act_id, *act) if act_id is not None else None
+    return SubmitGate(student_id, group_code, activity, bool(eligible and group_code), sub_id, status)
+
+def _move_counters(activity_id, old_status, new_status="Pending"):
+    if old_status == new_status:
+        return
+    values = {STATUS_COLUMNS[new_status]: getattr(Activity, STATUS_COLUMNS[new_status]) + 1}
+    if old_status:
+        values[STATUS_COLUMNS[old_status]] = getattr(Activity, STATUS_COLUMNS[old_status]) - 1
+    db.session.execute(update(Activity).where(Activity.id == activity_id).values(**values)
+                       .execution_options(synchronize_session=False))
+
+def save_submission(gate, upload=None, now=None, attempts=3):
+    """
+    Insert or resubmit the group's submission (caller commits). Returns its id.
+    Raises SubmissionClosed when it was marked after the gate was read.
+    """
+    now = now or datetime.utcnow()
+    files = {"file_path": blob_path_of(upload), "file_sha256": upload.sha256} if upload else {}
+    try:
+        sub_id = _write_submission(gate, files, now, attempts)
+    except BaseException:
+        if upload:
+            try:
+                os.remove(upload.path)
+            except FileNotFoundError:
+                pass
+        raise
+    if upload:
+        upload = store_blob(upload)
+        add_revision(sub_id, gate.activity.id, upload, gate.student_id, now)
+    return sub_id
+
+def _write_submission(gate, files, now, attempts):
+    activity_id = gate.activity.id
+    sub_id, status = gate.submission_id, gate.status
+    for _ in range(attempts):
+        if status == "Marked":
+            raise SubmissionClosed("This activity is already marked. You cannot resubmit.")
+        if sub_id is None:
+            try:
+                with db.session.begin_nested():
+                    sub_id = db.session.execute(insert(Submission).values(
+                        activity_id=activity_id, group_code=gate.group_code,
+                        submitted_by_student_id=gate.student_id, submitted_at=now, status="Pending",
+                        resubmission_count=0, **(files or {"file_path": None, "file_sha256": None}),
+                    )).inserted_primary_key[0]
+            except IntegrityError:
+                pass  # another member of the group was first: resubmit over their row
+            else:
+                _move_counters(activity_id, None)
+                return sub_id
+        else:
+            changed = db.session.execute(
+                update(Submission)
+                .where(Submission.id == sub_id, Submission.status == status)
+                .values(submitted_at=now, status="Pending",
+                        resubmission_count=Submission.resubmission_count + 1, **files)
+                .execution_options(synchronize_session=False)
+            ).rowcount
+            if changed:
+                _move_counters(activity_id, status)
+                return sub_id
+        # lost a race: read the row as it is now and try again
+        current = db.session.execute(
+            select(Submission.id, Submission.status)
+            .where(Submission.activity_id == activity_id, Submission.group_code == gate.group_code)
+        ).first()
+        sub_id, status = current if current else (None, None)
+    raise SubmissionClosed("The submission changed while it was being saved. Please try again.")
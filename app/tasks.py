@@ -0,0 +1,79 @@
+import atexit
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from .extensions import db
+from .metrics import TASK_DEPTH
+
+class TaskQueue:
+    """
+    Small in-process background worker pool.
+    submit(fn, *args) runs fn later inside an app context, so views can hand off slow
+    work (image processing, file cleanup) after committing. With TASKS_EAGER the task
+    runs inline instead (CLI, tests). Work is not persisted: anything that must
+    survive a restart also needs a CLI backfill that finds unfinished rows.
+    """
+
+    def __init__(self, app=None):
+        self.app = None
+        self._executor = None
+        self._pid = None
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._atexit_registered = False
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.app = app
+        self.workers = int(app.config.get("TASK_WORKERS", 2))
+        self.eager = bool(app.config.get("TASKS_EAGER", False))
+        app.extensions["tasks"] = self
+        if not self._atexit_registered:
+            atexit.register(self.shutdown)
+            self._atexit_registered = True
+
+    def _get_executor(self):
+        # one pool per process; a forked worker must not reuse the parent's threads
+        if self._executor is None or self._pid != os.getpid():
+            with self._lock:
+                if self._executor is None or self._pid != os.getpid():
+                    self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="task")
+                    self._pid = os.getpid()
+        return self._executor
+
+    def _run(self, fn, args, kwargs):
+        try:
+            with self.app.app_context():
+                try:
+                    return fn(*args, **kwargs)
+                except Exception:
+                    db.session.rollback()
+                    self.app.logger.exception("Background task %s failed", getattr(fn, "__name__", fn))
+                finally:
+                    db.session.remove()
+        finally:
+            with self._lock:
+                self._pending -= 1
+                TASK_DEPTH.set(self._pending)
+
+    def submit(self, fn, *args, **kwargs):
+        with self._lock:
+            self._pending += 1
+            TASK_DEPTH.set(self._pending)
+        if self.eager:
+            return self._run(fn, args, kwargs)
+        return self._get_executor().submit(self._run, fn, args, kwargs)
+
+    def depth(self) -> int:
+        """Tasks queued or running in this process."""
+        with self._lock:
+            return self._pending
+
+    def shutdown(self, wait=True):
+        if self._executor is not None and self._pid == os.getpid():
+            self._executor.shutdown(wait=wait)
+            self._executor = None
+
+tasks = TaskQueue()
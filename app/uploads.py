@@ -0,0 +1,393 @@
+"""
+Streaming upload stage for submissions.
+
+receive_upload() reads the multipart body straight off request.stream instead of
+letting Werkzeug spool the whole file first. Each chunk is validated, hashed and
+written in one pass, and the upload aborts as soon as something is wrong:
+  - Content-Length already above the limit -> rejected before reading anything
+  - fields before the file (csrf_token) are checked before the file is written
+  - PDF magic header must appear in the first 1 KB, an indirect object in the first 8 KB
+  - size limit enforced per chunk; %%EOF checked in the trailing bytes
+Rejected uploads leave nothing on disk. Large files can also use the resumable
+chunked protocol at the bottom of this module.
+"""
+import hashlib
+import os
+import re
+import secrets
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from flask import current_app, request
+from sqlalchemy import func
+from sqlalchemy.exc import IntegrityError
+from werkzeug.http import parse_options_header
+from werkzeug.sansio.multipart import MultipartDecoder, NEED_DATA, Field, File, Data, Epilogue
+from werkzeug.utils import secure_filename
+
+from .extensions import db
+from .models import UploadSession, UploadChunk
+from .tasks import tasks
+from .metrics import observe_upload, UPLOAD_REJECTED
+
+PDF_HEADER_WINDOW = 1024      # readers accept junk before %PDF- up to 1 KB
+PDF_STRUCTURE_WINDOW = 8192   # first "N G obj" must show up this early
+PDF_TAIL_WINDOW = 1024        # %%EOF must be within the last 1 KB
+PDF_HEADER = re.compile(rb"%PDF-[12]\.\d")
+PDF_OBJECT = re.compile(rb"\d+\s+\d+\s+obj\b")
+MULTIPART_OVERHEAD = 64 * 1024  # headers, boundaries and small fields around the file
+
+class UploadRejected(Exception):
+    """Raised while streaming; the message is safe to show to the user."""
+
+@dataclass
+class SavedUpload:
+    path: str
+    sha256: str
+    size: int
+    filename: str
+
+class PDFSniffer:
+    """Incremental PDF checks on the bytes as they arrive."""
+
+    def __init__(self):
+        self.head = b""
+        self.header_ok = False
+        self.structure_ok = False
+        self.tail = b""
+
+    def feed(self, chunk: bytes):
+        if not self.structure_ok:
+            self.head += chunk[:PDF_STRUCTURE_WINDOW]
+            if not self.header_ok:
+                m = PDF_HEADER.search(self.head[:PDF_HEADER_WINDOW + 8])
+                if m:
+                    self.header_ok = True
+                elif len(self.head) >= PDF_HEADER_WINDOW + 8:
+                    raise UploadRejected("File is not a PDF document.")
+            if self.header_ok and PDF_OBJECT.search(self.head):
+                self.structure_ok = True
+                self.head = b""
+            elif len(self.head) >= PDF_STRUCTURE_WINDOW:
+                raise UploadRejected("PDF file appears to be damaged.")
+        self.tail = (self.tail + chunk)[-PDF_TAIL_WINDOW:]
+
+    def finish(self):
+        if not self.header_ok:
+            raise UploadRejected("File is not a PDF document.")
+        if not self.structure_ok or b"%%EOF" not in self.tail:
+            raise UploadRejected("PDF file is incomplete or damaged.")
+
+def unique_path(path: str) -> str:
+    """First free name of the form base.ext, base_1.ext, ... (same rule as utils.secure_save)."""
+    base, ext = os.path.splitext(path)
+    n = 1
+    while os.path.exists(path):
+        path = f"{base}_{n}{ext}"
+        n += 1
+    return path
+
+class _StreamingWriter:
+    """Writes to <name>.part while hashing and counting; finalised by rename."""
+
+    def __init__(self, upload_dir: str, filename_hint: str, max_bytes: int, sniffer=None):
+        os.makedirs(upload_dir, exist_ok=True)
+        self.final_hint = os.path.join(upload_dir, secure_filename(filename_hint) or "upload")
+        self.part_path = self.final_hint + f".{os.getpid()}.{id(self)}.part"
+        self.max_bytes = max_bytes
+        self.sniffer = sniffer
+        self.sha = hashlib.sha256()
+        self.size = 0
+        self.fh = open(self.part_path, "wb")
+
+    def write(self, chunk: bytes):
+        self.size += len(chunk)
+        if self.size > self.max_bytes:
+            raise UploadRejected(f"File is larger than the {self.max_bytes // (1024 * 1024)} MB limit for this activity.")
+        if self.sniffer:
+            self.sniffer.feed(chunk)
+        self.sha.update(chunk)
+        self.fh.write(chunk)
+
+    def commit(self) -> str:
+        self.fh.close()
+        if self.sniffer:
+            self.sniffer.finish()
+        path = unique_path(self.final_hint)
+        os.replace(self.part_path, path)
+        return path.replace("\\", "/")
+
+    def abort(self):
+        self.fh.close()
+        try:
+            os.remove(self.part_path)
+        except OSError:
+            pass
+
+def receive_upload(field_name, upload_dir, filename_hint, max_bytes, require_pdf=False, check_fields=None):
+    """
+    Parse the current multipart request, streaming the file field `field_name` to disk.
+
+    `filename_hint` may contain "{filename}", replaced by the client's file name.
+    `check_fields(fields)` runs once, right before the file is written, with the
+    form fields received so far (use it for CSRF). Returns (fields, SavedUpload|None);
+    raises UploadRejected on validation failure.
+    """
+    started = time.perf_counter()
+    limit = max_bytes + MULTIPART_OVERHEAD
+    if request.content_length is not None and request.content_length > limit:
+        UPLOAD_REJECTED.labels("form").inc()
+        raise UploadRejected(f"File is larger than the {max_bytes // (1024 * 1024)} MB limit for this activity.")
+    mimetype, options = parse_options_header(request.headers.get("Content-Type", ""))
+    if mimetype != "multipart/form-data" or "boundary" not in options:
+        raise UploadRejected("Invalid upload request.")
+
+    chunk_size = int(current_app.config.get("UPLOAD_CHUNK_SIZE", 64 * 1024))
+    decoder = MultipartDecoder(options["boundary"].encode("latin-1"), max_form_memory_size=MULTIPART_OVERHEAD)
+    stream = request.stream
+    fields, saved = {}, None
+    part = None          # ("field", name, bytearray) | ("file", writer or None)
+    writer = None
+    checked = False
+    done = False
+    try:
+        while not done:
+            chunk = stream.read(chunk_size)
+            decoder.receive_data(chunk or None)
+            while True:
+                event = decoder.next_event()
+                if event is NEED_DATA:
+                    break
+                if isinstance(event, Field):
+                    part = ("field", event.name, bytearray())
+                elif isinstance(event, File):
+                    if event.name != field_name or not event.filename or saved or writer:
+                        part = ("file", None)  # ignore stray/empty file parts
+                        continue
+                    if check_fields and not checked:
+                        check_fields(fields)
+                        checked = True
+                    name = event.filename.replace("\\", "/").rsplit("/", 1)[-1]
+                    is_pdf = require_pdf or name.lower().endswith(".pdf")
+                    if require_pdf and not name.lower().endswith(".pdf"):
+                        raise UploadRejected("Only PDF files are allowed.")
+                    writer = _StreamingWriter(upload_dir, filename_hint.replace("{filename}", name), max_bytes,
+                                              PDFSniffer() if is_pdf else None)
+                    writer.client_name = name
+                    part = ("file", writer)
+                elif isinstance(event, Data):
+                    if part and part[0] == "field":
+                        part[2].extend(event.data)
+                        if not event.more_data:
+                            fields[part[1]] = part[2].decode("utf-8", "replace")
+                    elif part and part[1] is not None:
+                        if event.data:
+                            part[1].write(event.data)
+                        if not event.more_data:
+                            if part[1].size == 0:
+                                part[1].abort()  # browsers send an empty part when no file is chosen
+                            else:
+                                saved = SavedUpload(part[1].commit(), part[1].sha.hexdigest(), part[1].size,
+                                                    part[1].client_name)
+                            writer = None
+                elif isinstance(event, Epilogue):
+                    done = True
+                    break
+            if not chunk:
+                break
+        if writer is not None:
+            raise UploadRejected("Upload was interrupted. Please try again.")
+    except Exception as e:
+        if isinstance(e, UploadRejected):
+            UPLOAD_REJECTED.labels("form").inc()
+        if writer is not None:
+            writer.abort()
+        if saved is not None:
+            try:
+                os.remove(saved.path)
+            except OSError:
+                pass
+        raise
+    if check_fields and not checked:
+        check_fields(fields)
+    observe_upload("form", started, saved.size if saved else 0)
+    return fields, saved
+
+
+# --- Resumable (chunked) uploads ---------------------------------------------------
+#
+# initiate -> PUT chunk N (any order, retried freely) -> GET received ranges -> finalize.
+# Chunks are written straight to their offset in a sparse <incoming>/<id>.part file,
+# so nothing is buffered in memory; the whole file is hashed once on finalize and
+# compared with the checksum the client declared up front.
+
+SHA256_HEX = re.compile(r"^[0-9a-f]{64}$")
+
+def _incoming_dir():
+    return os.path.join(current_app.config["UPLOAD_FOLDER"], "incoming")
+
+def session_part_path(sess) -> str:
+    return os.path.join(_incoming_dir(), f"{sess.id}.part")
+
+def create_session(user_id, act, group_code, filename, total_size, sha256, max_bytes):
+    """Validate the declared file and open an UploadSession (not committed)."""
+    name = (filename or "").replace("\\", "/").rsplit("/", 1)[-1]
+    if not name:
+        raise UploadRejected("File name is required.")
+    if act.require_pdf and not name.lower().endswith(".pdf"):
+        raise UploadRejected("Only PDF files are allowed.")
+    try:
+        total_size = int(total_size)
+    except (TypeError, ValueError):
+        raise UploadRejected("File size is required.")
+    if total_size <= 0:
+        raise UploadRejected("File is empty.")
+    if total_size > max_bytes:
+        raise UploadRejected(f"File is larger than the {max_bytes // (1024 * 1024)} MB limit for this activity.")
+    sha256 = (sha256 or "").lower()
+    if not SHA256_HEX.match(sha256):
+        raise UploadRejected("A SHA-256 checksum of the file is required.")
+
+    sess = UploadSession(
+        id=secrets.token_hex(16), user_id=user_id, activity_id=act.id, group_code=group_code,
+        filename=name, total_size=total_size, sha256=sha256,
+        chunk_size=int(current_app.config.get("RESUMABLE_CHUNK_SIZE", 2 * 1024 * 1024)),
+    )
+    os.makedirs(_incoming_dir(), exist_ok=True)
+    with open(session_part_path(sess), "wb") as f:
+        f.truncate(total_size)  # sparse; chunks fill it in at their offsets
+    db.session.add(sess)
+    return sess
+
+def _receive_chunk(sess, index, stream, chunk_sha256, require_pdf):
+    """Write chunk `index` at its offset in the .part file; returns the bytes written."""
+    expected = min(sess.chunk_size, sess.total_size - index * sess.chunk_size)
+    read_size = int(current_app.config.get("UPLOAD_CHUNK_SIZE", 64 * 1024))
+    sniffer = PDFSniffer() if index == 0 and (require_pdf or sess.filename.lower().endswith(".pdf")) else None
+    sha = hashlib.sha256()
+    written = 0
+    with open(session_part_path(sess), "r+b") as f:
+        f.seek(index * sess.chunk_size)
+        while True:
+            data = stream.read(min(read_size, expected - written + 1))
+            if not data:
+                break
+            written += len(data)
+            if written > expected:
+                raise UploadRejected(f"Chunk {index} is larger than {expected} bytes.")
+            if sniffer and not sniffer.structure_ok:
+                sniffer.feed(data)  # reject junk on the first chunk, before the rest is sent
+            sha.update(data)
+            f.write(data)
+    if written != expected:
+        raise UploadRejected(f"Chunk {index} is incomplete ({written} of {expected} bytes).")
+    if sniffer and not sniffer.header_ok:
+        raise UploadRejected("File is not a PDF document.")
+    if chunk_sha256 and chunk_sha256.lower() != sha.hexdigest():
+        raise UploadRejected(f"Chunk {index} checksum mismatch.")
+    return written
+
+def write_chunk(sess, index, stream, chunk_sha256=None, require_pdf=False):
+    """Stream one chunk from `stream` into place and record it. Re-sending a chunk is harmless."""
+    if index < 0 or index >= sess.total_chunks:
+        raise UploadRejected("Chunk index out of range.")
+    started = time.perf_counter()
+    try:
+        written = _receive_chunk(sess, index, stream, chunk_sha256, require_pdf)
+    except UploadRejected:
+        UPLOAD_REJECTED.labels("chunk").inc()
+        raise
+    observe_upload("chunk", started, written)
+
+    if not db.session.get(UploadChunk, (sess.id, index)):
+        db.session.add(UploadChunk(upload_id=sess.id, chunk_index=index, size=written))
+    sess.updated_at = datetime.utcnow()
+    try:
+        db.session.commit()
+    except IntegrityError:
+        db.session.rollback()  # the same chunk arrived twice concurrently; already recorded
+
+def received_ranges(sess):
+    """Received chunk indexes collapsed into inclusive [start, end] ranges."""
+    idx = [i for (i,) in db.session.query(UploadChunk.chunk_index)
+           .filter(UploadChunk.upload_id == sess.id).order_by(UploadChunk.chunk_index)]
+    ranges = []
+    for i in idx:
+        if ranges and ranges[-1][1] == i - 1:
+            ranges[-1][1] = i
+        else:
+            ranges.append([i, i])
+    return ranges
+
+def finalize_session(sess, upload_dir, filename_hint, require_pdf=False):
+    """
+    Verify the assembled file (all chunks, checksum, PDF structure) and move it into
+    upload_dir. Deletes the session (caller commits). Returns SavedUpload.
+    """
+    have = db.session.query(func.count(UploadChunk.chunk_index)).filter(UploadChunk.upload_id == sess.id).scalar()
+    if have != sess.total_chunks:
+        raise UploadRejected(f"Upload incomplete: {have} of {sess.total_chunks} chunks received.")
+
+    started = time.perf_counter()
+    part = session_part_path(sess)
+    sniffer = PDFSniffer() if require_pdf or sess.filename.lower().endswith(".pdf") else None
+    sha = hashlib.sha256()
+    with open(part, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            sha.update(block)
+            if sniffer:
+                sniffer.feed(block)
+    try:
+        if sha.hexdigest() != sess.sha256:
+            raise UploadRejected("Checksum mismatch: the uploaded file is corrupted. Please upload it again.")
+        if sniffer:
+            sniffer.finish()
+    except UploadRejected:
+        UPLOAD_REJECTED.labels("finalize").inc()
+        raise
+
+    os.makedirs(upload_dir, exist_ok=True)
+    hint = os.path.join(upload_dir, secure_filename(filename_hint.replace("{filename}", sess.filename)) or "upload")
+    path = unique_path(hint)
+    os.replace(part, path)
+    db.session.delete(sess)
+    observe_upload("finalize", started)  # bytes were counted per chunk
+    return SavedUpload(path.replace("\\", "/"), sess.sha256, sess.total_size, sess.filename)
+
+def discard_session(sess):
+    try:
+        os.remove(session_part_path(sess))
+    except OSError:
+        pass
+    db.session.delete(sess)
+
+def gc_upload_sessions(ttl_hours=None, now=None):
+    """Delete sessions idle longer than UPLOAD_SESSION_TTL_HOURS and stray .part files. Returns (sessions, files)."""
+    ttl_hours = ttl_hours if ttl_hours is not None else int(current_app.config.get("UPLOAD_SESSION_TTL_HOURS", 24))
+    now = now or datetime.utcnow()
+    cutoff = now - timedelta(hours=ttl_hours)
+    stale = UploadSession.query.filter(UploadSession.updated_at < cutoff).all()
+    for sess in stale:
+        discard_session(sess)
+    db.session.commit()
+
+    # .part files whose session row is gone (crash between rename and commit, manual deletes)
+    files = 0
+    incoming = _incoming_dir()
+    if os.path.isdir(incoming):
+        live = {i for (i,) in db.session.query(UploadSession.id)}
+        for name in os.listdir(incoming):
+            path = os.path.join(incoming, name)
+            if name.endswith(".part") and name[:-5] not in live \
+                    and datetime.utcfromtimestamp(os.path.getmtime(path)) < cutoff:
+                os.remove(path)
+                files += 1
+    return len(stale), files
+
+_last_gc = {"at": 0.0}
+
+def schedule_gc(interval_seconds=3600):
+    """Queue gc_upload_sessions on the task pool at most once per interval (per process)."""
+    if time.time() - _last_gc["at"] >= interval_seconds:
+        _last_gc["at"] = time.time()
+        tasks.submit(gc_upload_sessions)
@@ -35,3 +35,11 @@ def secure_save(file_storage, upload_dir: str, filename_hint: str) -> str:
     file_storage.save(path)
     # return normalized path for DB
     return path.replace("\\", "/")
+
+def parse_max_file_mb(value):
+    """Per-activity upload limit from a form field; blank/invalid means the global default."""
+    try:
+        mb = int(value)
+    except (TypeError, ValueError):
+        return None
+    return mb if mb > 0 else None
@@ -0,0 +1,78 @@
+"""
+A supervisor's work queue: pending submissions on their activities and
+admin-approved titles of their groups still waiting for their decision.
+
+Both come from one UNION ALL of (kind, id, group_code, title, activity_id, since),
+so the page, its total and the per-kind counts on the dashboard each cost one query
+instead of loading assignments/activities first and following up with IN (...) lists.
+"""
+from dataclasses import dataclass
+from datetime import datetime
+from sqlalchemy import select, literal, null, func, Integer, cast
+
+from .extensions import db
+from .models import Activity, Submission, SupervisorAssignment, TitleProposal
+
+QUEUE_PER_PAGE = 50
+
+@dataclass
+class QueueItem:
+    kind: str  # "submission" | "title"
+    id: int
+    group_code: str
+    title: str
+    activity_id: int | None
+    since: datetime
+
+def queue_union(supervisor_user_id):
+    subs = (
+        select(
+            literal("submission").label("kind"),
+            Submission.id.label("id"),
+            Submission.group_code.label("group_code"),
+            Activity.title.label("title"),
+            Activity.id.label("activity_id"),
+            Submission.submitted_at.label("since"),
+        )
+        .join(Activity, Activity.id == Submission.activity_id)
+        .where(
+            Activity.created_by_role == "supervisor",
+            Activity.created_by_user_id == supervisor_user_id,
+            Activity.deleted_at.is_(None),
+            Submission.status == "Pending",
+        )
+    )
+    titles = (
+        select(
+            literal("title").label("kind"),
+            TitleProposal.id,
+            TitleProposal.group_code,
+            TitleProposal.title,
+            cast(null(), Integer),
+            func.coalesce(TitleProposal.last_action_at, TitleProposal.submitted_at),  # forwarded by admin
+        )
+        .join(SupervisorAssignment, SupervisorAssignment.group_code == TitleProposal.group_code)
+        .where(
+            SupervisorAssignment.supervisor_user_id == supervisor_user_id,
+            TitleProposal.status_admin == "Approved",
+            TitleProposal.status_supervisor == "Pending",
+        )
+    )
+    return subs.union_all(titles).subquery("work_queue")
+
+def queue_counts(supervisor_user_id):
+    """{"submission": n, "title": m} for the dashboard."""
+    q = queue_union(supervisor_user_id)
+    rows = db.session.execute(select(q.c.kind, func.count()).group_by(q.c.kind)).all()
+    counts = {"submission": 0, "title": 0}
+    counts.update({kind: n for kind, n in rows})
+    return counts
+
+def queue_page(supervisor_user_id, page=1, per_page=QUEUE_PER_PAGE):
+    """Oldest first. Returns (items, total)."""
+    q = queue_union(supervisor_user_id)
+    total = db.session.execute(select(func.count()).select_from(q)).scalar()
+    rows = db.session.execute(
+        select(q).order_by(q.c.since, q.c.kind, q.c.id).limit(per_page).offset((page - 1) * per_page)
+    ).all()
+    return [QueueItem(*r) for r in rows], total
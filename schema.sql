@@ -15,7 +15,9 @@ CREATE TABLE IF NOT EXISTS users (
   username VARCHAR(64) NOT NULL UNIQUE,
   password_hash VARCHAR(255) NOT NULL,
   active TINYINT(1) NOT NULL DEFAULT 1,
-  created_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP
+  created_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+  deleted_at DATETIME NULL,
+  KEY ix_users_deleted_at (deleted_at)
 ) ENGINE=InnoDB;
 
 -- OFFICIAL STUDENT DATASET
@@ -38,6 +40,10 @@ CREATE TABLE IF NOT EXISTS student_accounts (
   avatar_initials VARCHAR(8) NULL,
   avatar_color VARCHAR(20) NULL,
   group_code VARCHAR(20) NULL,
+  thumb_sm_path VARCHAR(255) NULL,
+  thumb_md_path VARCHAR(255) NULL,
+  thumb_lg_path VARCHAR(255) NULL,
+  thumbs_ready_at DATETIME NULL,
   CONSTRAINT fk_sa_user FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE,
   CONSTRAINT fk_sa_master FOREIGN KEY (student_id) REFERENCES students_master(student_id) ON DELETE RESTRICT
 ) ENGINE=InnoDB;
@@ -54,7 +60,8 @@ CREATE TABLE IF NOT EXISTS supervisor_profiles (
 -- GROUPS
 CREATE TABLE IF NOT EXISTS groups (
   group_code VARCHAR(20) PRIMARY KEY,
-  created_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP
+  created_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+  member_count INT NOT NULL DEFAULT 0
 ) ENGINE=InnoDB;
 
 CREATE TABLE IF NOT EXISTS group_members (
@@ -98,8 +105,14 @@ CREATE TABLE IF NOT EXISTS activities (
   start_at DATETIME NULL,
   deadline_at DATETIME NULL,
   require_pdf TINYINT(1) NOT NULL DEFAULT 0,
+  max_file_mb INT NULL,
   scope_all_groups TINYINT(1) NOT NULL DEFAULT 0,
   created_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+  deleted_at DATETIME NULL,
+  pending_count INT NOT NULL DEFAULT 0,
+  marked_count INT NOT NULL DEFAULT 0,
+  rejected_count INT NOT NULL DEFAULT 0,
+  KEY ix_activities_deleted_at (deleted_at),
   CONSTRAINT fk_act_creator FOREIGN KEY (created_by_user_id) REFERENCES users(id) ON DELETE RESTRICT
 ) ENGINE=InnoDB;
 
@@ -118,12 +131,15 @@ CREATE TABLE IF NOT EXISTS submissions (
   group_code VARCHAR(20) NOT NULL,
   submitted_by_student_id VARCHAR(32) NOT NULL,
   file_path VARCHAR(255) NULL,
+  file_sha256 CHAR(64) NULL,
   submitted_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
   status ENUM('Pending','Marked','Rejected') NOT NULL DEFAULT 'Pending',
   marked_by_user_id INT NULL,
   marked_at DATETIME NULL,
   feedback TEXT NULL,
   resubmission_count INT NOT NULL DEFAULT 0,
+  INDEX ix_sub_activity_status (activity_id, status, submitted_at),
+  UNIQUE KEY uq_submission_group (activity_id, group_code),
   CONSTRAINT fk_sub_activity FOREIGN KEY (activity_id) REFERENCES activities(id) ON DELETE CASCADE,
   CONSTRAINT fk_sub_group FOREIGN KEY (group_code) REFERENCES groups(group_code) ON DELETE CASCADE,
   CONSTRAINT fk_sub_student FOREIGN KEY (submitted_by_student_id) REFERENCES students_master(student_id) ON DELETE RESTRICT,
@@ -163,4 +179,231 @@ CREATE TABLE IF NOT EXISTS titles_archive (
   imported_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP
 ) ENGINE=InnoDB;
 
+-- AUDIT LOG (append-only; written in batches by app/audit.py)
+CREATE TABLE IF NOT EXISTS audit_events (
+  id INT AUTO_INCREMENT PRIMARY KEY,
+  actor_user_id INT NULL,
+  actor_role VARCHAR(20) NULL,
+  action VARCHAR(40) NOT NULL,
+  entity_type VARCHAR(40) NOT NULL,
+  entity_id VARCHAR(64) NOT NULL,
+  detail VARCHAR(255) NULL,
+  created_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+  KEY ix_audit_actor (actor_user_id, created_at),
+  KEY ix_audit_entity (entity_type, entity_id, created_at),
+  KEY ix_audit_created (created_at)
+) ENGINE=InnoDB;
+
+-- RESUMABLE UPLOADS (chunked submission uploads in progress)
+CREATE TABLE IF NOT EXISTS upload_sessions (
+  id VARCHAR(32) PRIMARY KEY,
+  user_id INT NOT NULL,
+  activity_id INT NOT NULL,
+  group_code VARCHAR(20) NOT NULL,
+  filename VARCHAR(255) NOT NULL,
+  total_size BIGINT NOT NULL,
+  chunk_size INT NOT NULL,
+  sha256 CHAR(64) NOT NULL,
+  created_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+  updated_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+  KEY ix_upload_sessions_updated (updated_at),
+  CONSTRAINT fk_us_user FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE,
+  CONSTRAINT fk_us_act FOREIGN KEY (activity_id) REFERENCES activities(id) ON DELETE CASCADE
+) ENGINE=InnoDB;
+
+CREATE TABLE IF NOT EXISTS upload_chunks (
+  upload_id VARCHAR(32) NOT NULL,
+  chunk_index INT NOT NULL,
+  size INT NOT NULL,
+  received_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+  PRIMARY KEY (upload_id, chunk_index),
+  CONSTRAINT fk_uc_session FOREIGN KEY (upload_id) REFERENCES upload_sessions(id) ON DELETE CASCADE
+) ENGINE=InnoDB;
+
+CREATE TABLE IF NOT EXISTS search_tokens (
+  id INT AUTO_INCREMENT PRIMARY KEY,
+  entity_type VARCHAR(20) NOT NULL,
+  entity_id VARCHAR(64) NOT NULL,
+  token VARCHAR(64) NOT NULL,
+  weight SMALLINT NOT NULL,
+  INDEX ix_search_token (token, entity_type),
+  INDEX ix_search_entity (entity_type, entity_id)
+) ENGINE=InnoDB;
+-- fill it after creating: flask search-reindex
+
+CREATE TABLE IF NOT EXISTS deadline_reminders (
+  id INT AUTO_INCREMENT PRIMARY KEY,
+  activity_id INT NOT NULL,
+  student_id VARCHAR(32) NOT NULL,
+  window_hours INT NOT NULL,
+  sent_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+  UNIQUE KEY uq_deadline_reminder (activity_id, student_id, window_hours),
+  CONSTRAINT fk_dr_activity FOREIGN KEY (activity_id) REFERENCES activities(id) ON DELETE CASCADE
+) ENGINE=InnoDB;
+
+-- ACADEMIC-YEAR ARCHIVE (flask archive-years; app/archive.py)
+-- Copies of the live tables for closed academic years: same ids, no foreign keys.
+CREATE TABLE IF NOT EXISTS activities_archive (
+  id INT PRIMARY KEY,
+  created_by_role VARCHAR(20) NOT NULL,
+  created_by_user_id INT NOT NULL,
+  title VARCHAR(200) NOT NULL,
+  description TEXT NULL,
+  start_at DATETIME NULL,
+  deadline_at DATETIME NULL,
+  require_pdf TINYINT(1) NULL,
+  max_file_mb INT NULL,
+  scope_all_groups TINYINT(1) NULL,
+  created_at DATETIME NULL,
+  pending_count INT NOT NULL DEFAULT 0,
+  marked_count INT NOT NULL DEFAULT 0,
+  rejected_count INT NOT NULL DEFAULT 0,
+  academic_year VARCHAR(10) NOT NULL,
+  archived_at DATETIME NOT NULL,
+  KEY ix_activities_archive_academic_year (academic_year)
+) ENGINE=InnoDB;
+
+CREATE TABLE IF NOT EXISTS activity_targets_archive (
+  id INT PRIMARY KEY,
+  activity_id INT NOT NULL,
+  group_code VARCHAR(20) NOT NULL,
+  academic_year VARCHAR(10) NOT NULL,
+  archived_at DATETIME NOT NULL,
+  KEY ix_activity_targets_archive_activity_id (activity_id),
+  KEY ix_activity_targets_archive_academic_year (academic_year)
+) ENGINE=InnoDB;
+
+CREATE TABLE IF NOT EXISTS submissions_archive (
+  id INT PRIMARY KEY,
+  activity_id INT NOT NULL,
+  group_code VARCHAR(20) NOT NULL,
+  submitted_by_student_id VARCHAR(32) NOT NULL,
+  file_path VARCHAR(255) NULL,
+  file_sha256 CHAR(64) NULL,
+  submitted_at DATETIME NULL,
+  status VARCHAR(20) NULL,
+  marked_by_user_id INT NULL,
+  marked_at DATETIME NULL,
+  feedback TEXT NULL,
+  resubmission_count INT NULL,
+  academic_year VARCHAR(10) NOT NULL,
+  archived_at DATETIME NOT NULL,
+  KEY ix_submissions_archive_activity_id (activity_id),
+  KEY ix_submissions_archive_academic_year (academic_year)
+) ENGINE=InnoDB;
+
+CREATE TABLE IF NOT EXISTS title_proposals_archive (
+  id INT PRIMARY KEY,
+  group_code VARCHAR(20) NOT NULL,
+  title VARCHAR(255) NOT NULL,
+  project_type VARCHAR(80) NULL,
+  submitted_at DATETIME NULL,
+  status_admin VARCHAR(20) NULL,
+  status_supervisor VARCHAR(20) NULL,
+  last_action_at DATETIME NULL,
+  academic_year VARCHAR(10) NOT NULL,
+  archived_at DATETIME NOT NULL,
+  KEY ix_title_proposals_archive_group_code (group_code),
+  KEY ix_title_proposals_archive_academic_year (academic_year)
+) ENGINE=InnoDB;
+
+CREATE TABLE IF NOT EXISTS group_members_archive (
+  id INT PRIMARY KEY,
+  group_code VARCHAR(20) NOT NULL,
+  student_id VARCHAR(32) NOT NULL,
+  joined_at DATETIME NULL,
+  academic_year VARCHAR(10) NOT NULL,
+  archived_at DATETIME NOT NULL,
+  KEY ix_group_members_archive_group_code (group_code),
+  KEY ix_group_members_archive_academic_year (academic_year)
+) ENGINE=InnoDB;
+
+CREATE TABLE IF NOT EXISTS team_requests_archive (
+  id INT PRIMARY KEY,
+  requester_student_id VARCHAR(32) NOT NULL,
+  receiver_student_id VARCHAR(32) NOT NULL,
+  status VARCHAR(20) NULL,
+  created_at DATETIME NULL,
+  academic_year VARCHAR(10) NOT NULL,
+  archived_at DATETIME NOT NULL,
+  KEY ix_team_requests_archive_academic_year (academic_year)
+) ENGINE=InnoDB;
+
+-- SUBMISSION SIMILARITY (app/similarity.py; fill with: flask similarity-index)
+-- No FKs: fingerprints of archived submissions keep matching new ones.
+CREATE TABLE IF NOT EXISTS submission_fingerprints (
+  submission_id INT PRIMARY KEY,
+  activity_id INT NOT NULL,
+  file_path VARCHAR(255) NULL,
+  file_sha256 CHAR(64) NULL,
+  signature BLOB NULL,
+  shingles INT NOT NULL DEFAULT 0,
+  error VARCHAR(255) NULL,
+  indexed_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+  KEY ix_submission_fingerprints_activity_id (activity_id)
+) ENGINE=InnoDB;
+
+CREATE TABLE IF NOT EXISTS similarity_buckets (
+  band SMALLINT NOT NULL,
+  bucket BIGINT NOT NULL,
+  submission_id INT NOT NULL,
+  activity_id INT NOT NULL,
+  PRIMARY KEY (band, bucket, submission_id),
+  KEY ix_similarity_bucket_submission (submission_id),
+  KEY ix_similarity_bucket_activity (activity_id)
+) ENGINE=InnoDB;
+
+-- SUBMISSION REVISIONS (app/revisions.py; no FK: kept when submissions are archived)
+CREATE TABLE IF NOT EXISTS submission_revisions (
+  id INT AUTO_INCREMENT PRIMARY KEY,
+  submission_id INT NOT NULL,
+  activity_id INT NOT NULL,
+  revision_no INT NOT NULL,
+  file_path VARCHAR(255) NULL,
+  file_sha256 CHAR(64) NULL,
+  original_name VARCHAR(255) NULL,
+  size_bytes BIGINT NULL,
+  uploaded_by_student_id VARCHAR(32) NULL,
+  uploaded_at DATETIME NOT NULL,
+  marked_at DATETIME NULL,
+  pruned_at DATETIME NULL,
+  UNIQUE KEY uq_submission_revision (submission_id, revision_no),
+  KEY ix_submission_revisions_activity_id (activity_id),
+  KEY ix_submission_revisions_file_path (file_path)
+) ENGINE=InnoDB;
+
+-- UPGRADE: existing installs (MariaDB)
+ALTER TABLE student_accounts
+  ADD COLUMN IF NOT EXISTS thumb_sm_path VARCHAR(255) NULL,
+  ADD COLUMN IF NOT EXISTS thumb_md_path VARCHAR(255) NULL,
+  ADD COLUMN IF NOT EXISTS thumb_lg_path VARCHAR(255) NULL,
+  ADD COLUMN IF NOT EXISTS thumbs_ready_at DATETIME NULL;
+ALTER TABLE activities ADD COLUMN IF NOT EXISTS max_file_mb INT NULL AFTER require_pdf;
+ALTER TABLE submissions ADD COLUMN IF NOT EXISTS file_sha256 CHAR(64) NULL AFTER file_path;
+ALTER TABLE users ADD COLUMN IF NOT EXISTS deleted_at DATETIME NULL, ADD INDEX IF NOT EXISTS ix_users_deleted_at (deleted_at);
+ALTER TABLE activities ADD COLUMN IF NOT EXISTS deleted_at DATETIME NULL, ADD INDEX IF NOT EXISTS ix_activities_deleted_at (deleted_at);
+ALTER TABLE groups ADD COLUMN IF NOT EXISTS member_count INT NOT NULL DEFAULT 0;
+ALTER TABLE activities
+  ADD COLUMN IF NOT EXISTS pending_count INT NOT NULL DEFAULT 0,
+  ADD COLUMN IF NOT EXISTS marked_count INT NOT NULL DEFAULT 0,
+  ADD COLUMN IF NOT EXISTS rejected_count INT NOT NULL DEFAULT 0;
+-- then fill the counters: flask recount
+ALTER TABLE submissions ADD INDEX IF NOT EXISTS ix_sub_activity_status (activity_id, status, submitted_at);
+-- one submission per (activity, group): of any duplicates keep a Marked row first, then the newest,
+-- then run `flask recount`. Similarity fingerprints of the deleted ids go stale:
+-- `flask similarity-index --rebuild` drops them.
+DELETE s FROM submissions s
+  JOIN submissions better ON better.activity_id = s.activity_id AND better.group_code = s.group_code
+   AND ((better.status <=> 'Marked') > (s.status <=> 'Marked')
+        OR ((better.status <=> 'Marked') = (s.status <=> 'Marked') AND better.id > s.id));
+ALTER TABLE submissions ADD UNIQUE KEY IF NOT EXISTS uq_submission_group (activity_id, group_code);
+-- existing files become revision 1 of their submission
+INSERT INTO submission_revisions (submission_id, activity_id, revision_no, file_path, file_sha256,
+                                  uploaded_by_student_id, uploaded_at, marked_at)
+  SELECT s.id, s.activity_id, 1, s.file_path, s.file_sha256, s.submitted_by_student_id,
+         COALESCE(s.submitted_at, NOW()), IF(s.status = 'Marked', s.marked_at, NULL)
+  FROM submissions s
+  WHERE s.file_path IS NOT NULL
+    AND NOT EXISTS (SELECT 1 FROM submission_revisions r WHERE r.submission_id = s.id);
+
 SET FOREIGN_KEY_CHECKS=1;